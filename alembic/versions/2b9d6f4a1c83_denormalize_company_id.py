@@ -0,0 +1,69 @@
+"""Denormalize company_id onto posts, comments, ledger and likes
+
+Revision ID: 2b9d6f4a1c83
+Revises: 7c3e5b1d8f20
+Create Date: 2026-10-19 18:05:27.114290
+
+Adds a nullable company_id (no table rewrite) with NOT VALID foreign keys
+and builds the tenant feed indexes concurrently. Partitioned tables can't
+take NOT VALID foreign keys, so the ledger's are added to each partition
+instead. Existing rows are filled by
+``python -m app.commands.backfill_company_ids``, which also validates the
+foreign keys (and then adds the ledger's on the parent, attaching the
+validated partition ones without a scan); run it right after this
+migration.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9d6f4a1c83'
+down_revision: Union[str, None] = '7c3e5b1d8f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['posts', 'comments', 'points_transactions', 'post_likes', 'comment_likes']
+INDEXED_TABLES = ['posts', 'comments', 'points_transactions']
+PARTITIONED_TABLES = ['points_transactions']
+
+
+def _partitions(table: str) -> Sequence[str]:
+    return op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": table}).scalars().all()
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('company_id', sa.Integer(), nullable=True))
+        constrained = _partitions(table) if table in PARTITIONED_TABLES else [table]
+        for name in constrained:
+            op.execute(
+                f"ALTER TABLE {name} ADD CONSTRAINT {name}_company_id_fkey "
+                "FOREIGN KEY (company_id) REFERENCES companies (id) NOT VALID"
+            )
+
+    with op.get_context().autocommit_block():
+        for table in INDEXED_TABLES:
+            name = f"ix_{table}_company_id_created_at"
+            columns = "(company_id, created_at DESC, id)"
+            if table not in PARTITIONED_TABLES:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {columns}")
+                continue
+            # Partitioned: an invalid parent index, built concurrently per
+            # partition and attached; it turns valid once all are attached
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {columns}")
+            for partition in _partitions(table):
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_company_id_created_at_idx ON {partition} {columns}")
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition}_company_id_created_at_idx")
+
+
+def downgrade() -> None:
+    for table in INDEXED_TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_company_id_created_at")
+    for table in TABLES:
+        op.drop_column(table, 'company_id')
@@ -0,0 +1,35 @@
+"""Add post like_count counter
+
+Revision ID: 3f1c7a9e2b40
+Revises: d45fb9be8521
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c7a9e2b40'
+down_revision: Union[str, None] = 'd45fb9be8521'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE posts SET like_count = counts.n
+        FROM (SELECT post_id, count(*) AS n FROM post_likes GROUP BY post_id) AS counts
+        WHERE posts.id = counts.post_id
+        """
+    )
+    op.create_check_constraint('non_negative_like_count', 'posts', 'like_count >= 0')
+
+
+def downgrade() -> None:
+    op.drop_constraint('non_negative_like_count', 'posts', type_='check')
+    op.drop_column('posts', 'like_count')
@@ -0,0 +1,36 @@
+"""Add revoked_tokens table
+
+Revision ID: 5a7f3c2d9e14
+Revises: c41e9d07b5a2
+Create Date: 2026-10-19 13:02:50.772310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7f3c2d9e14'
+down_revision: Union[str, None] = 'c41e9d07b5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('revoked_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('jti', sa.String(length=32), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.CheckConstraint('jti IS NOT NULL OR user_id IS NOT NULL', name='revocation_target'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('jti')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('revoked_tokens')
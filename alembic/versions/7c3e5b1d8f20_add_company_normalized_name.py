@@ -0,0 +1,44 @@
+"""Add unique normalized company name
+
+Revision ID: 7c3e5b1d8f20
+Revises: e8a91f4c6d27
+Create Date: 2026-10-19 16:41:12.508114
+
+Signup upserts companies on normalized_name. Existing companies whose names
+normalize to the same value keep a NULL normalized_name except the oldest,
+so no tenants are merged; new signups join the oldest one.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5b1d8f20'
+down_revision: Union[str, None] = 'e8a91f4c6d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('companies', sa.Column('normalized_name', sa.Text(), nullable=True))
+    # Must match app.api.v1.endpoints.auth.normalize_company_name
+    op.execute(
+        """
+        UPDATE companies c SET normalized_name = n.normalized_name
+        FROM (
+            SELECT DISTINCT ON (lower(btrim(regexp_replace(name, '\\s+', ' ', 'g'))))
+                id, lower(btrim(regexp_replace(name, '\\s+', ' ', 'g'))) AS normalized_name
+            FROM companies
+            ORDER BY lower(btrim(regexp_replace(name, '\\s+', ' ', 'g'))), id
+        ) n
+        WHERE n.id = c.id
+        """
+    )
+    op.create_unique_constraint('uq_companies_normalized_name', 'companies', ['normalized_name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_companies_normalized_name', 'companies', type_='unique')
+    op.drop_column('companies', 'normalized_name')
@@ -0,0 +1,35 @@
+"""Add comment like_count counter
+
+Revision ID: 8b2d4e6f1a93
+Revises: 3f1c7a9e2b40
+Create Date: 2026-10-19 10:03:27.540917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a93'
+down_revision: Union[str, None] = '3f1c7a9e2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('comments', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE comments SET like_count = counts.n
+        FROM (SELECT comment_id, count(*) AS n FROM comment_likes GROUP BY comment_id) AS counts
+        WHERE comments.id = counts.comment_id
+        """
+    )
+    op.create_check_constraint('non_negative_comment_like_count', 'comments', 'like_count >= 0')
+
+
+def downgrade() -> None:
+    op.drop_constraint('non_negative_comment_like_count', 'comments', type_='check')
+    op.drop_column('comments', 'like_count')
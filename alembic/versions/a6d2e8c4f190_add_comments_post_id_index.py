@@ -0,0 +1,32 @@
+"""Index comments by post
+
+Revision ID: a6d2e8c4f190
+Revises: 9f4a2c7e6b15
+Create Date: 2026-10-19 21:14:08.203117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2e8c4f190'
+down_revision: Union[str, None] = '9f4a2c7e6b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A post's comments, newest first: the comment list and the feed's
+    # latest-comments window both scanned the whole table without it
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_comments_post_id_created_at "
+            "ON comments (post_id, created_at DESC, id DESC)"
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_comments_post_id_created_at")
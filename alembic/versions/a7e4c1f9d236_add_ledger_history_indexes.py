@@ -0,0 +1,64 @@
+"""Add keyset indexes for points history
+
+Revision ID: a7e4c1f9d236
+Revises: f6b3d9a2c475
+Create Date: 2026-10-20 03:26:08.417753
+
+History pages are read newest first with (created_at, id) keysets, so the
+sender and recipient indexes gain the sort columns (replacing the single
+column ones) and company history filtered by type gets its own index.
+Recipients are looked up by transaction with the created_at bound, and the
+covering index answers those lookups (history pages, as-of balances)
+without visiting the heap. As
+in 2b9d6f4a1c83, each partition's index is built concurrently and attached
+to an index created ON ONLY the parent.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e4c1f9d236'
+down_revision: Union[str, None] = 'f6b3d9a2c475'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, index name, partition index suffix, columns, replaced index)
+INDEXES = [
+    ('points_transactions', 'ix_points_transactions_sender_id_created_at', 'sender_id_created_at',
+     '(sender_id, created_at DESC, id DESC)', ('ix_points_transactions_sender_id', 'sender_id')),
+    ('points_transactions', 'ix_points_transactions_company_id_type_created_at', 'company_id_type_created_at',
+     '(company_id, transaction_type, created_at DESC, id DESC)', None),
+    ('points_recipients', 'ix_points_recipients_recipient_id_created_at', 'recipient_id_created_at',
+     '(recipient_id, created_at DESC, transaction_id DESC)', ('ix_points_recipients_recipient_id', 'recipient_id')),
+    ('points_recipients', 'ix_points_recipients_transaction_id_created_at', 'transaction_id_created_at',
+     '(transaction_id, created_at) INCLUDE (recipient_id, points_amount)',
+     ('ix_points_recipients_transaction_id', 'transaction_id')),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, name, suffix, columns, _ in INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {columns}")
+            partitions = op.get_bind().execute(sa.text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:table AS regclass)"
+            ), {"table": table}).scalars().all()
+            for partition in partitions:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_{suffix}_idx ON {partition} {columns}")
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition}_{suffix}_idx")
+
+    # The new indexes lead with the same column
+    for _, _, _, _, replaced in INDEXES:
+        if replaced:
+            op.execute(f"DROP INDEX IF EXISTS {replaced[0]}")
+
+
+def downgrade() -> None:
+    for table, name, _, _, replaced in INDEXES:
+        if replaced:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {replaced[0]} ON {table} ({replaced[1]})")
+        op.execute(f"DROP INDEX IF EXISTS {name}")
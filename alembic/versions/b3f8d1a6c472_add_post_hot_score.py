@@ -0,0 +1,35 @@
+"""Add post engagement and hot_score for the trending feed
+
+Revision ID: b3f8d1a6c472
+Revises: a6d2e8c4f190
+Create Date: 2026-10-19 22:05:51.618340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8d1a6c472'
+down_revision: Union[str, None] = 'a6d2e8c4f190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing posts rank last until app.commands.rescore_posts scores them
+    op.add_column('posts', sa.Column('engagement', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('hot_score', sa.Float(), server_default='0', nullable=False))
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_company_id_hot_score "
+            "ON posts (company_id, hot_score DESC, id DESC)"
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_posts_company_id_hot_score")
+    op.drop_column('posts', 'hot_score')
+    op.drop_column('posts', 'engagement')
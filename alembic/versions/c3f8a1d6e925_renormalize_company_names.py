@@ -0,0 +1,52 @@
+"""Renormalize company names
+
+Revision ID: c3f8a1d6e925
+Revises: a7e4c1f9d236
+Create Date: 2026-10-20 09:12:44.301562
+
+7c3e5b1d8f20 trimmed names before collapsing whitespace, and btrim only
+strips spaces, so names with leading or trailing tabs or newlines got a
+key with a stray space that signups never produce. Recompute every key
+with the signup expression, again keeping it only on the oldest company
+of each group. Keys are cleared before they are set, so moving a key
+between companies never trips the unique constraint.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1d6e925'
+down_revision: Union[str, None] = 'a7e4c1f9d236'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.api.v1.endpoints.auth.normalize_company_name
+KEYS = """
+    SELECT id, CASE WHEN row_number() OVER (PARTITION BY normalized_name ORDER BY id) = 1
+        THEN normalized_name END AS normalized_name
+    FROM (SELECT id, lower(btrim(regexp_replace(name, '\\s+', ' ', 'g'))) AS normalized_name FROM companies) n
+"""
+
+
+def upgrade() -> None:
+    op.execute(
+        f"""
+        UPDATE companies c SET normalized_name = NULL
+        FROM ({KEYS}) k
+        WHERE k.id = c.id AND c.normalized_name IS DISTINCT FROM k.normalized_name
+        """
+    )
+    op.execute(
+        f"""
+        UPDATE companies c SET normalized_name = k.normalized_name
+        FROM ({KEYS}) k
+        WHERE k.id = c.id AND c.normalized_name IS NULL AND k.normalized_name IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    # The corrected keys are what signups produce either way
+    pass
@@ -0,0 +1,46 @@
+"""Add user_stats aggregate table
+
+Revision ID: c41e9d07b5a2
+Revises: 8b2d4e6f1a93
+Create Date: 2026-10-19 11:26:05.301447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e9d07b5a2'
+down_revision: Union[str, None] = '8b2d4e6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('points_given', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('points_received', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('posts_authored', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('recognitions_received', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('likes_received', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Lookup indexes used by the backfill and the history endpoints
+    op.create_index('ix_points_transactions_sender_id', 'points_transactions', ['sender_id'])
+    op.create_index('ix_points_recipients_recipient_id', 'points_recipients', ['recipient_id'])
+    op.create_index('ix_posts_author_id', 'posts', ['author_id'])
+    op.create_index('ix_comments_author_id', 'comments', ['author_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_author_id', table_name='comments')
+    op.drop_index('ix_posts_author_id', table_name='posts')
+    op.drop_index('ix_points_recipients_recipient_id', table_name='points_recipients')
+    op.drop_index('ix_points_transactions_sender_id', table_name='points_transactions')
+    op.drop_table('user_stats')
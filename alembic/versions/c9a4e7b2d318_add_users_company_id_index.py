@@ -0,0 +1,31 @@
+"""Index active users by company
+
+Revision ID: c9a4e7b2d318
+Revises: b3f8d1a6c472
+Create Date: 2026-10-19 23:12:40.775209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9a4e7b2d318'
+down_revision: Union[str, None] = 'b3f8d1a6c472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Roster loads, member lists and digests read a company's active users
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_company_id_active "
+            "ON users (company_id) WHERE deleted_at IS NULL"
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_users_company_id_active")
@@ -0,0 +1,163 @@
+"""Partition points ledger tables by month
+
+Revision ID: e8a91f4c6d27
+Revises: 5a7f3c2d9e14
+Create Date: 2026-10-19 14:40:12.905561
+
+Converts points_transactions and points_recipients into tables range
+partitioned by created_at without copying history: the existing table is
+renamed to <table>_legacy and attached as the partition holding everything
+before a boundary two months out. A validated CHECK constraint lets the
+attach skip its scan and the supporting indexes are built concurrently
+beforehand, so writes are only blocked for the metadata-only swap. Monthly
+partitions after the boundary are then kept ahead by
+``python -m app.commands.ledger_partitions ensure``.
+
+points_recipients.transaction_id loses its foreign key: a partitioned
+points_transactions can only be referenced through (id, created_at).
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a91f4c6d27'
+down_revision: Union[str, None] = '5a7f3c2d9e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+TABLES = {
+    'points_transactions': {
+        'columns': """
+            id integer NOT NULL DEFAULT nextval('points_transactions_id_seq'::regclass),
+            sender_id integer,
+            transaction_type varchar(20) NOT NULL,
+            post_id integer,
+            comment_id integer,
+            points integer NOT NULL,
+            admin_notes text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT points_transactions_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT valid_transaction_type CHECK (transaction_type IN ('recognition', 'admin_adjustment', 'initial_allocation', 'comment_recognition')),
+            CONSTRAINT positive_points CHECK (points > 0),
+            CONSTRAINT points_transactions_sender_id_fkey FOREIGN KEY (sender_id) REFERENCES users (id),
+            CONSTRAINT points_transactions_post_id_fkey FOREIGN KEY (post_id) REFERENCES posts (id),
+            CONSTRAINT points_transactions_comment_id_fkey FOREIGN KEY (comment_id) REFERENCES comments (id)
+        """,
+        # name -> column; existing ones are renamed on the legacy table,
+        # new ones are pre-built there concurrently
+        'indexes': {
+            'ix_points_transactions_sender_id': 'sender_id',
+            'ix_points_transactions_post_id': 'post_id',
+        },
+        'existing_indexes': ['ix_points_transactions_sender_id'],
+    },
+    'points_recipients': {
+        'columns': """
+            id integer NOT NULL DEFAULT nextval('points_recipients_id_seq'::regclass),
+            transaction_id integer,
+            recipient_id integer,
+            points_amount integer NOT NULL,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT points_recipients_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT positive_points_amount CHECK (points_amount > 0),
+            CONSTRAINT points_recipients_recipient_id_fkey FOREIGN KEY (recipient_id) REFERENCES users (id)
+        """,
+        'indexes': {
+            'ix_points_recipients_recipient_id': 'recipient_id',
+            'ix_points_recipients_transaction_id': 'transaction_id',
+        },
+        'existing_indexes': ['ix_points_recipients_recipient_id'],
+    },
+}
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bound(moment: datetime) -> str:
+    return moment.strftime("'%Y-%m-%d 00:00:00+00'")
+
+
+def upgrade() -> None:
+    boundary = _add_months(_month_start(datetime.now(timezone.utc)), 2)
+
+    # Build everything that needs a scan while writes keep flowing
+    with op.get_context().autocommit_block():
+        for table, spec in TABLES.items():
+            op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {table}_legacy_id_created_at_idx ON {table} (id, created_at)")
+            for name, column in spec['indexes'].items():
+                if name not in spec['existing_indexes']:
+                    op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_legacy_{column}_idx ON {table} ({column})")
+            # Re-runnable: an interrupted upgrade leaves this block applied
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_legacy_range")
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_range CHECK (created_at < {_bound(boundary)}) NOT VALID")
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_legacy_range")
+
+    # Metadata-only swap
+    op.drop_constraint('points_recipients_transaction_id_fkey', 'points_recipients', type_='foreignkey')
+    for table, spec in TABLES.items():
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        # The partition's primary key has to match the parent's (id, created_at)
+        op.execute(
+            f"ALTER TABLE {table}_legacy DROP CONSTRAINT {table}_pkey, "
+            f"ADD CONSTRAINT {table}_legacy_pkey PRIMARY KEY USING INDEX {table}_legacy_id_created_at_idx"
+        )
+        for name in spec['existing_indexes']:
+            op.execute(f"ALTER INDEX {name} RENAME TO {table}_legacy_{spec['indexes'][name]}_idx")
+
+        op.execute(f"CREATE TABLE {table} ({spec['columns']}) PARTITION BY RANGE (created_at)")
+        for name, column in spec['indexes'].items():
+            op.execute(f"CREATE INDEX {name} ON {table} ({column})")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.execute(f"ALTER TABLE {table} ATTACH PARTITION {table}_legacy FOR VALUES FROM (MINVALUE) TO ({_bound(boundary)})")
+
+        for offset in range(MONTHS_AHEAD):
+            start = _add_months(boundary, offset)
+            end = _add_months(start, 1)
+            op.execute(
+                f"CREATE TABLE {table}_y{start:%Y}m{start:%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ({_bound(start)}) TO ({_bound(end)})"
+            )
+
+
+def downgrade() -> None:
+    for table, spec in TABLES.items():
+        columns = ", ".join(
+            line.strip().split()[0]
+            for line in spec['columns'].strip().splitlines()
+            if not line.strip().startswith('CONSTRAINT')
+        )
+        op.execute(f"ALTER TABLE {table} DETACH PARTITION {table}_legacy")
+        op.execute(f"ALTER TABLE {table}_legacy DROP CONSTRAINT {table}_legacy_range")
+        op.execute(f"INSERT INTO {table}_legacy ({columns}) SELECT {columns} FROM {table}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}_legacy.id")
+        op.execute(f"DROP TABLE {table}")
+
+        op.execute(f"ALTER TABLE {table}_legacy RENAME TO {table}")
+        op.execute(
+            f"ALTER TABLE {table} DROP CONSTRAINT {table}_legacy_pkey, "
+            f"ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)"
+        )
+        for name, column in spec['indexes'].items():
+            if name in spec['existing_indexes']:
+                op.execute(f"ALTER INDEX {table}_legacy_{column}_idx RENAME TO {name}")
+            else:
+                op.execute(f"DROP INDEX {table}_legacy_{column}_idx")
+    op.create_foreign_key(
+        'points_recipients_transaction_id_fkey', 'points_recipients',
+        'points_transactions', ['transaction_id'], ['id'],
+    )
@@ -0,0 +1,42 @@
+"""Add balance snapshot tables
+
+Revision ID: f6b3d9a2c475
+Revises: e4c1a8f7b926
+Create Date: 2026-10-20 02:11:52.830164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b3d9a2c475'
+down_revision: Union[str, None] = 'e4c1a8f7b926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('balance_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'taken_at', name='uq_balance_snapshots_company_id_taken_at')
+    )
+    op.create_table('balance_snapshot_entries',
+    sa.Column('snapshot_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('redeemable_points', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['snapshot_id'], ['balance_snapshots.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('snapshot_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('balance_snapshot_entries')
+    op.drop_table('balance_snapshots')
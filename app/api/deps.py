@@ -1,76 +1,66 @@
-from typing import AsyncGenerator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, List, Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import get_settings
+from app.core.constants import API_V1_STR, MAX_BATCH_IDS
 from app.db.session import get_db
-from app.core.security import pwd_context
+from app.core.security import ACCESS_TOKEN_TYPE, decode_token
 from app.models.models import User
-from app.schemas.schemas import TokenPayload
+from app.schemas.schemas import TokenPayload, Principal
+from app.services.loaders import Loaders
+from app.services.token_revocation import revocation_list
 from datetime import datetime
 from sqlalchemy import select
 
-settings = get_settings()
-
 reusable_oauth2 = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/auth/login"
+    tokenUrl=f"{API_V1_STR}/auth/login"
 )
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> User:
+def decode_token_payload(token: str, token_type: str = ACCESS_TOKEN_TYPE) -> TokenPayload:
+    """
+    Verify a token's signature, type and revocation status.
+    """
     try:
-        # Debug: Print token
-        print(f"Received token: {token[:10]}...")
-        
-        # Decode without verification first to check the token structure
-        unverified_payload = jwt.get_unverified_claims(token)
-        print(f"Unverified payload: {unverified_payload}")
-        
-        # Now decode with verification
-        try:
-            payload = jwt.decode(
-                token, 
-                settings.SECRET_KEY, 
-                algorithms=["HS256"]
-            )
-            print(f"Verified payload: {payload}")
-        except Exception as e:
-            print(f"JWT decode error: {str(e)}")
-            raise
-
+        payload = decode_token(token)
         token_data = TokenPayload(**payload)
-        print(f"Token data: {token_data}")
-        
     except JWTError as e:
-        print(f"JWT Error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Could not validate credentials: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        raise
-        
+
+    if token_data.type != token_type or revocation_list.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+def _user_id(token_data: TokenPayload) -> int:
+    # Convert string subject back to integer for database lookup
     try:
-        # Convert string subject back to integer for database lookup
-        user_id = int(token_data.sub)
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        print(f"Found user: {user is not None}")
+        return int(token_data.sub)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid user ID format",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except Exception as e:
-        print(f"Database error: {str(e)}")
-        raise
-    
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(reusable_oauth2)
+) -> User:
+    token_data = decode_token_payload(token)
+    user_id = _user_id(token_data)
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,4 +86,68 @@ def get_current_admin_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+async def get_current_principal(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(reusable_oauth2),
+) -> Principal:
+    """
+    Resolve the caller for endpoints that only need tenant and role checks.
+
+    With self-contained tokens the company and role claims are trusted as
+    is (deleted users are cut off through the revocation list), so no user
+    lookup happens. Otherwise, and for tokens issued without claims, this
+    falls back to loading the active user.
+    """
+    token_data = decode_token_payload(token)
+    user_id = _user_id(token_data)
+
+    if get_settings().SELF_CONTAINED_TOKENS and token_data.cid is not None and token_data.role is not None:
+        return Principal(id=user_id, company_id=token_data.cid, role=token_data.role)
+
+    result = await db.execute(
+        select(User.company_id, User.role, User.deleted_at).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    company_id, role, deleted_at = row
+    if deleted_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return Principal(id=user_id, company_id=company_id, role=role)
+
+def get_current_admin_principal(
+    principal: Principal = Depends(get_current_principal),
+) -> Principal:
+    if principal.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return principal
+
+def get_loaders(db: AsyncSession = Depends(get_db)) -> Loaders:
+    """
+    Batching, memoizing row loaders sharing the request's session.
+    """
+    return Loaders(db)
+
+def batch_ids(
+    ids: str = Query(..., description=f"Comma-separated ids, at most {MAX_BATCH_IDS}"),
+) -> List[int]:
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    # Keep the first occurrence of each id, in request order
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed or len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BATCH_IDS} ids are allowed")
+    return parsed
@@ -0,0 +1,83 @@
+from functools import lru_cache
+from typing import Any, Callable, FrozenSet, List, Optional, Sequence, Type
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql import Select
+
+
+@lru_cache(maxsize=256)
+def _trimmed_list(schema: Type[BaseModel], fields: FrozenSet[str]) -> TypeAdapter:
+    # Keep the schema's field order so trimmed payloads read like full ones
+    model = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (info.annotation, info) for name, info in schema.model_fields.items() if name in fields},
+    )
+    return TypeAdapter(List[model])
+
+
+class FieldSelection:
+    """
+    The ``?fields=`` subset requested for a list endpoint; ``fields`` is
+    None when the client wants the full schema.
+    """
+
+    def __init__(self, schema: Type[BaseModel], model: Any, fields: Optional[FrozenSet[str]]) -> None:
+        self.schema = schema
+        self.model = model
+        self.fields = fields
+
+    def apply(self, query: Select) -> Select:
+        """
+        Restrict the SELECT list to the requested columns (the primary key is
+        always loaded).
+        """
+        if self.fields is None:
+            return query
+        columns = inspect(self.model).column_attrs.keys()
+        if not self.fields <= set(columns):
+            # Something computed: the full row is needed
+            return query
+        return query.options(load_only(*(getattr(self.model, name) for name in self.fields)))
+
+    def respond(self, rows: Sequence[Any]) -> Any:
+        """
+        Return ``rows`` for the endpoint's response model, or a ready JSON
+        response of the trimmed schema.
+        """
+        if self.fields is None:
+            return rows
+        adapter = _trimmed_list(self.schema, self.fields)
+        return Response(
+            content=adapter.dump_json(adapter.validate_python(rows, from_attributes=True)),
+            media_type="application/json",
+        )
+
+
+def sparse_fields(schema: Type[BaseModel], model: Any) -> Callable[..., FieldSelection]:
+    """
+    Build a dependency parsing ``?fields=a,b,c`` against ``schema`` for
+    endpoints returning ``List[schema]`` of ``model`` rows.
+    """
+    available = list(schema.model_fields)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None,
+            description=f"Comma-separated subset of the fields to return: {', '.join(available)}",
+        ),
+    ) -> FieldSelection:
+        if not fields:
+            return FieldSelection(schema, model, None)
+        requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+        unknown = sorted(requested - set(available))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        if not requested:
+            raise HTTPException(status_code=400, detail="fields must name at least one field")
+        return FieldSelection(schema, model, requested)
+
+    return dependency
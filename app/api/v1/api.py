@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, posts, comments, points
+from app.api.v1.endpoints import auth, users, posts, comments, points, metrics, attachments
 
 api_router = APIRouter()
 
@@ -7,4 +7,6 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(posts.router, prefix="/posts", tags=["posts"])
 api_router.include_router(comments.router, prefix="/comments", tags=["comments"])
-api_router.include_router(points.router, prefix="/points", tags=["points"]) 
\ No newline at end of file
+api_router.include_router(attachments.router, prefix="/attachments", tags=["attachments"])
+api_router.include_router(points.router, prefix="/points", tags=["points"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
\ No newline at end of file
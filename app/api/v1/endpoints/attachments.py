@@ -0,0 +1,180 @@
+import re
+from typing import Any, Optional, Tuple
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
+from app.api import deps
+from app.core.config import get_settings
+from app.db.session import get_db
+from app.models.models import Attachment
+from app.schemas.schemas import Attachment as AttachmentSchema, Principal
+from app.services import thumbnails
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.uploads import UploadError, UploadTooLarge, receive_file
+
+router = APIRouter()
+
+# The body is parsed by hand so it can be streamed; describe it for the docs
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    },
+}
+
+@router.post("", response_model=AttachmentSchema, status_code=201, openapi_extra=_UPLOAD_BODY)
+async def upload_attachment(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Upload a file to attach to a post. It is streamed to storage as it
+    arrives; identical files are stored once, and images get a thumbnail.
+    """
+    # Uploads can take a while; don't hold a database connection meanwhile
+    await db.close()
+    try:
+        received = await receive_file(request, store, "file", get_settings().ATTACHMENT_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnect:
+        raise HTTPException(status_code=400, detail="Upload interrupted")
+
+    thumbnail_sha256 = None
+    if received.content_type.startswith("image/"):
+        # Identical images were thumbnailed on their first upload
+        thumbnail_sha256 = await db.scalar(
+            select(Attachment.thumbnail_sha256)
+            .where(Attachment.sha256 == received.blob.sha256)
+            .where(Attachment.thumbnail_sha256.is_not(None))
+            .limit(1)
+        )
+        if thumbnail_sha256 is None:
+            await db.close()
+            thumbnail = await thumbnails.make_thumbnail(await store.local_path(received.blob.sha256))
+            if thumbnail:
+                thumbnail_sha256 = (await store.put(thumbnail)).sha256
+
+    attachment = Attachment(
+        company_id=current_user.company_id,
+        uploader_id=current_user.id,
+        filename=received.filename,
+        content_type=received.content_type[:100],
+        size=received.blob.size,
+        sha256=received.blob.sha256,
+        thumbnail_sha256=thumbnail_sha256,
+    )
+    db.add(attachment)
+    await db.commit()
+    await db.refresh(attachment)
+    return attachment
+
+_BYTE_RANGE = re.compile(r"^bytes=\s*(\d*)-(\d*)\s*$")
+
+def _byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The ``[start, end)`` span asked for by a single-range ``Range`` header,
+    or None to send the whole file (no header, several ranges or one that
+    does not parse, all of which may be answered in full).
+    """
+    match = _BYTE_RANGE.match(header or "")
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last) + 1, size) if last else size
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size
+    if start >= end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _send_blob(
+    request: Request, store: BlobStore, sha256: str, size: int, content_type: str, disposition: str,
+) -> Response:
+    # Blobs are named by their content, so the digest is a strong validator
+    etag = f'"{sha256}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": disposition,
+        "X-Content-Type-Options": "nosniff",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    span = None
+    if request.headers.get("if-range", etag) == etag:
+        span = _byte_range(request.headers.get("range"), size)
+    start, end = span or (0, size)
+    if span:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    headers["Content-Length"] = str(end - start)
+    return StreamingResponse(
+        store.read(sha256, start, end),
+        status_code=206 if span else 200,
+        media_type=content_type,
+        headers=headers,
+    )
+
+async def _company_attachment(db: AsyncSession, attachment_id: int, current_user: Principal) -> Attachment:
+    attachment = await db.get(Attachment, attachment_id)
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    if attachment.company_id != current_user.company_id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    # The response streams after this returns; hand the connection back first
+    await db.close()
+    return attachment
+
+@router.get("/{attachment_id}")
+async def download_attachment(
+    attachment_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Download an attachment; supports single-range requests for resuming and seeking.
+    """
+    attachment = await _company_attachment(db, attachment_id, current_user)
+    # Only images Pillow could read (and thumbnailed) are shown inline
+    kind = "inline" if attachment.thumbnail_sha256 else "attachment"
+    return _send_blob(
+        request, store, attachment.sha256, attachment.size, attachment.content_type,
+        f"{kind}; filename*=UTF-8''{quote(attachment.filename)}",
+    )
+
+@router.get("/{attachment_id}/thumbnail")
+async def download_attachment_thumbnail(
+    attachment_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Download the JPEG thumbnail of an image attachment.
+    """
+    attachment = await _company_attachment(db, attachment_id, current_user)
+    if not attachment.thumbnail_sha256:
+        raise HTTPException(status_code=404, detail="Attachment has no thumbnail")
+    size = await store.size(attachment.thumbnail_sha256)
+    return _send_blob(request, store, attachment.thumbnail_sha256, size, "image/jpeg", "inline")
@@ -2,18 +2,31 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import case, exists, func, literal, select, update
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.dialects.postgresql import insert
 from app.api import deps
-from app.core import security
+from app.core import metrics, security
 from app.core.config import get_settings
+from app.core.constants import AuditAction, UserRole, INITIAL_GIVEABLE_POINTS, INITIAL_REDEEMABLE_POINTS
 from app.models.models import User, Company
-from app.schemas.schemas import Token, UserCreate, User as UserSchema
-from app.core.security import get_password_hash, verify_password
+from app.schemas.schemas import Token, TokenPayload, TokenRefresh, UserCreate, User as UserSchema
+from app.core.security import get_password_hash, verify_and_update_password, REFRESH_TOKEN_TYPE
 from app.db.session import get_db
+from app.services import audit
+from app.services.roster import roster_cache
+from app.services.token_revocation import revocation_list
 
 router = APIRouter()
-settings = get_settings()
+
+def normalize_company_name(name: str) -> ColumnElement:
+    # Case- and whitespace-insensitive. Evaluated by Postgres with the same
+    # expression as the backfills in migrations 7c3e5b1d8f20 and
+    # c3f8a1d6e925, so keys match exactly (Python's str.split() and lower()
+    # disagree with \s and lower() on some characters)
+    return func.lower(func.btrim(func.regexp_replace(name, r"\s+", " ", "g")))
 
 @router.post("/signup", response_model=UserSchema)
 async def create_user(
@@ -22,43 +35,88 @@ async def create_user(
     user_in: UserCreate,
 ) -> Any:
     """
-    Create new user with company.
+    Create new user with company, in a single transaction.
     """
-    # Check if user exists
-    result = await db.execute(select(User).where(User.email == user_in.email))
-    if result.scalar_one_or_none():
+    # Hash before touching the database so no connection is held meanwhile
+    password_hash = await run_in_threadpool(get_password_hash, user_in.password)
+    
+    # Create or get company. The no-op update makes RETURNING yield the
+    # existing row and row-locks it until commit, which serializes signups
+    # into the same company.
+    company_insert = insert(Company).values(
+        name=user_in.company_name.strip(),
+        normalized_name=normalize_company_name(user_in.company_name),
+    )
+    result = await db.execute(
+        company_insert
+        .on_conflict_do_update(
+            index_elements=[Company.normalized_name],
+            set_={"normalized_name": company_insert.excluded.normalized_name},
+        )
+        .returning(Company.id)
+    )
+    company_id = result.scalar_one()
+    
+    # Create user. First user of company is admin; this statement runs after
+    # the company lock is held, so it sees any user a concurrent signup
+    # committed first.
+    role = case(
+        (exists().where(User.company_id == company_id), UserRole.MEMBER.value),
+        else_=UserRole.ADMIN.value,
+    )
+    result = await db.execute(
+        insert(User)
+        .from_select(
+            ["email", "full_name", "password_hash", "company_id", "role", "giveable_points", "redeemable_points"],
+            select(
+                literal(user_in.email),
+                literal(user_in.full_name),
+                literal(password_hash),
+                literal(company_id),
+                role,
+                literal(INITIAL_GIVEABLE_POINTS),
+                literal(INITIAL_REDEEMABLE_POINTS),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(*User.__table__.columns)
+    )
+    user = result.mappings().one_or_none()
+    if not user:
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-    
-    # Create or get company
-    result = await db.execute(select(Company).where(Company.name == user_in.company_name))
-    company = result.scalar_one_or_none()
-    
-    if not company:
-        company = Company(name=user_in.company_name)
-        db.add(company)
-        await db.commit()
-        await db.refresh(company)
-    
-    # Create user
-    # Check if there are any existing users in the company
-    existing_users_result = await db.execute(select(User).where(User.company_id == company.id))
-    is_first_user = existing_users_result.first() is None
-
-    user = User(
-        email=user_in.email,
-        full_name=user_in.full_name,
-        password_hash=get_password_hash(user_in.password),
-        company_id=company.id,
-        role="admin" if is_first_user else "member"  # First user of company is admin
-    )
-    db.add(user)
+    if INITIAL_GIVEABLE_POINTS > 0:
+        audit.record(
+            db, company_id, AuditAction.INITIAL_ALLOCATION, None,
+            [(user["id"], "giveable_points", INITIAL_GIVEABLE_POINTS)],
+        )
     await db.commit()
-    await db.refresh(user)
+    roster_cache.invalidate(company_id)
     return user
 
+def _issue_tokens(user: User) -> dict:
+    settings = get_settings()
+    if settings.SELF_CONTAINED_TOKENS:
+        access_token_expires = timedelta(minutes=settings.SELF_CONTAINED_TOKEN_EXPIRE_MINUTES)
+    else:
+        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    
+    # Create token with numeric user ID plus the claims principal checks need
+    token = security.create_access_token(
+        user.id,  # Pass the numeric ID directly
+        expires_delta=access_token_expires,
+        claims={"cid": user.company_id, "role": user.role},
+    )
+    
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "refresh_token": security.create_refresh_token(user.id),
+    }
+
 @router.post("/login", response_model=Token)
 async def login(
     db: AsyncSession = Depends(get_db),
@@ -70,7 +128,14 @@ async def login(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if user:
+        valid, new_hash = await run_in_threadpool(
+            verify_and_update_password, form_data.password, user.password_hash
+        )
+    else:
+        valid = False
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -82,19 +147,59 @@ async def login(
             detail="Inactive user",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Upgrade hashes made with a lower bcrypt cost than this host's
+    if new_hash:
+        await db.execute(update(User).where(User.id == user.id).values(password_hash=new_hash))
+        await db.commit()
+        metrics.increment("auth.password_rehashes")
         
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return _issue_tokens(user)
+
+async def _revoke_refresh_token(db: AsyncSession, token_data: TokenPayload) -> None:
+    # The in-memory check in decode_token_payload can lag other workers;
+    # the insert is what decides which of two uses of a token wins
+    if not await revocation_list.revoke_token(db, token_data.jti, token_data.exp):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(
+    token_in: TokenRefresh,
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    Exchange a refresh token for a new access/refresh token pair.
+    The presented refresh token is revoked (rotation).
+    """
+    token_data = deps.decode_token_payload(token_in.refresh_token, REFRESH_TOKEN_TYPE)
     
-    # Create token with numeric user ID
-    token = security.create_access_token(
-        user.id,  # Pass the numeric ID directly
-        expires_delta=access_token_expires
-    )
+    result = await db.execute(select(User).where(User.id == int(token_data.sub)))
+    user = result.scalar_one_or_none()
+    if not user or user.deleted_at:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-    }
+    await _revoke_refresh_token(db, token_data)
+    return _issue_tokens(user)
+
+@router.post("/logout")
+async def logout(
+    token_in: TokenRefresh,
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    Revoke a refresh token. Access tokens lapse on their own expiry.
+    """
+    token_data = deps.decode_token_payload(token_in.refresh_token, REFRESH_TOKEN_TYPE)
+    await _revoke_refresh_token(db, token_data)
+    return {"detail": "Logged out"}
 
 @router.post("/test-token", response_model=UserSchema)
 async def test_token(current_user: User = Depends(deps.get_current_user)) -> Any:
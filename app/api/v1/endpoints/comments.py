@@ -1,39 +1,44 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.api import deps
+from app.api.fields import FieldSelection, sparse_fields
 from app.models.models import Comment, User, Post, CommentLike, PointsTransaction, PointsRecipient
-from app.schemas.schemas import Comment as CommentSchema, CommentTransactionCreate
-from app.core.constants import TransactionType
+from app.schemas.schemas import Comment as CommentSchema, CommentTransactionCreate, Principal
+from app.core.constants import AuditAction, TransactionType
 from app.db.session import get_db
+from app.services.likes import toggle_like
+from app.services.loaders import Loaders
+from app.services.points import credit_recipients, debit_giveable
+from app.services.roster import roster_cache
+from app.services import audit, trending, user_stats
 
 router = APIRouter()
 
+comment_fields = sparse_fields(CommentSchema, Comment)
+
+async def _check_post_access(db: AsyncSession, post_id: int, company_id: int) -> None:
+    result = await db.execute(select(Post.company_id).where(Post.id == post_id))
+    post_company_id = result.scalar_one_or_none()
+    if post_company_id is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if post_company_id != company_id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
 @router.post("", response_model=CommentSchema)
 async def create_comment(
     *,
     db: AsyncSession = Depends(get_db),
     comment_in: CommentTransactionCreate,
+    loaders: Loaders = Depends(deps.get_loaders),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
     """
     Create new comment with optional points distribution.
     """
     # Validate post exists and is from same company
-    result = await db.execute(
-        select(Post)
-        .join(User, Post.author_id == User.id)
-        .where(Post.id == comment_in.post_id)
-    )
-    post = result.scalar_one_or_none()
-    
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    
-    post_author = await db.get(User, post.author_id)
-    if post_author.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    await _check_post_access(db, comment_in.post_id, current_user.company_id)
     
     # Calculate total points if any
     total_points = sum(recipient.points for recipient in comment_in.recipients)
@@ -46,59 +51,79 @@ async def create_comment(
                 detail="Not enough points available"
             )
         
-        # Validate recipients are from same company
-        for recipient in comment_in.recipients:
-            result = await db.execute(select(User).where(User.id == recipient.user_id))
-            user = result.scalar_one_or_none()
-            if not user or user.company_id != current_user.company_id:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid recipient: {recipient.user_id}"
-                )
+        # Validate recipients are from same company (from the cached roster)
+        invalid = await roster_cache.non_members(
+            db, loaders, current_user.company_id, [recipient.user_id for recipient in comment_in.recipients]
+        )
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid recipient: {invalid[0]}"
+            )
     
+    # The whole comment is one transaction; the conditional debit is what
+    # stops concurrent recognitions by the sender from overdrawing
+    if total_points > 0:
+        result = await db.execute(debit_giveable(current_user.id, total_points))
+        if result.first() is None:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail="Not enough points available"
+            )
+
     # Create comment
     comment = Comment(
         content=comment_in.content,
         post_id=comment_in.post_id,
         author_id=current_user.id,
+        company_id=current_user.company_id,
         total_points=total_points
     )
     db.add(comment)
-    await db.commit()
-    await db.refresh(comment)
+    posts = Post.__table__
+    await db.execute(
+        update(posts)
+        .where(posts.c.id == comment_in.post_id)
+        .values(**trending.engagement_bump(posts, trending.comment_engagement(total_points)))
+    )
+    await db.flush()
     
     # Handle points distribution if any
     if total_points > 0:
         # Create transaction
         transaction = PointsTransaction(
             sender_id=current_user.id,
+            company_id=current_user.company_id,
             transaction_type=TransactionType.COMMENT_RECOGNITION,
             points=total_points,
             comment_id=comment.id
         )
         db.add(transaction)
-        await db.commit()
-        await db.refresh(transaction)
+        await db.flush()
         
         # Create recipients and update points
         for recipient_data in comment_in.recipients:
             recipient = PointsRecipient(
                 transaction_id=transaction.id,
                 recipient_id=recipient_data.user_id,
-                points_amount=recipient_data.points
+                points_amount=recipient_data.points,
+                created_at=transaction.created_at,
             )
             db.add(recipient)
-            
-            result = await db.execute(select(User).where(User.id == recipient_data.user_id))
-            user = result.scalar_one_or_none()
-            user.redeemable_points += recipient_data.points
-            db.add(user)
-        
-        # Update sender's points
-        current_user.giveable_points -= total_points
-        db.add(current_user)
+        await db.execute(credit_recipients((r.user_id, r.points) for r in comment_in.recipients))
         
-        await db.commit()
+        user_stats.enqueue_recognition(
+            db,
+            current_user.id,
+            [(r.user_id, r.points) for r in comment_in.recipients],
+        )
+        audit.record(
+            db, current_user.company_id, AuditAction.COMMENT_RECOGNITION, current_user.id,
+            audit.recognition_changes(current_user.id, [(r.user_id, r.points) for r in comment_in.recipients]),
+            comment_id=comment.id, transaction_id=transaction.id,
+        )
+    await db.commit()
     
     return comment
 
@@ -107,105 +132,72 @@ async def read_post_comments(
     post_id: int,
     skip: int = 0,
     limit: int = 100,
+    fields: FieldSelection = Depends(comment_fields),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get all comments for a post.
     """
     # Verify post exists and user has access
-    result = await db.execute(
-        select(Post)
-        .join(User, Post.author_id == User.id)
-        .where(Post.id == post_id)
-    )
-    post = result.scalar_one_or_none()
-    
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    
-    post_author = await db.get(User, post.author_id)
-    if post_author.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    await _check_post_access(db, post_id, current_user.company_id)
     
     result = await db.execute(
-        select(Comment)
+        fields.apply(select(Comment))
         .where(Comment.post_id == post_id)
         .order_by(Comment.created_at.desc())
         .offset(skip)
         .limit(limit)
     )
-    return result.scalars().all()
+    return fields.respond(result.scalars().all())
+
+def _like_target(comment_id: int, company_id: int):
+    return (
+        select(Comment.id, Comment.company_id, (Comment.company_id == company_id).label("same_company"))
+        .where(Comment.id == comment_id)
+        .cte("target")
+    )
+
+async def _toggle_comment_like(db: AsyncSession, comment_id: int, current_user: Principal, liked: bool) -> CommentSchema:
+    result = await db.execute(
+        toggle_like(
+            Comment, CommentLike, "comment_id", "unique_comment_like",
+            _like_target(comment_id, current_user.company_id), current_user.id, liked,
+        )
+    )
+    row = result.one_or_none()
+    await db.commit()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    comment, same_company, like_count = row
+    if not same_company:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if like_count is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Comment already liked" if liked else "Comment not liked"
+        )
+    return CommentSchema.model_validate(comment).model_copy(update={"like_count": like_count})
 
 @router.post("/{comment_id}/like", response_model=CommentSchema)
 async def like_comment(
     comment_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Like a comment.
     """
-    # Check if comment exists and is from same company
-    result = await db.execute(
-        select(Comment)
-        .join(Post, Comment.post_id == Post.id)
-        .join(User, Post.author_id == User.id)
-        .where(Comment.id == comment_id)
-    )
-    comment = result.scalar_one_or_none()
-    
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    
-    post = await db.get(Post, comment.post_id)
-    post_author = await db.get(User, post.author_id)
-    if post_author.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Check if already liked
-    result = await db.execute(
-        select(CommentLike)
-        .where(CommentLike.comment_id == comment_id)
-        .where(CommentLike.user_id == current_user.id)
-    )
-    if result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=400,
-            detail="Comment already liked"
-        )
-    
-    # Create like
-    like = CommentLike(comment_id=comment_id, user_id=current_user.id)
-    db.add(like)
-    await db.commit()
-    
-    return comment
+    return await _toggle_comment_like(db, comment_id, current_user, liked=True)
 
 @router.delete("/{comment_id}/like", response_model=CommentSchema)
 async def unlike_comment(
     comment_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Unlike a comment.
     """
-    result = await db.execute(
-        select(CommentLike)
-        .where(CommentLike.comment_id == comment_id)
-        .where(CommentLike.user_id == current_user.id)
-    )
-    like = result.scalar_one_or_none()
-    
-    if not like:
-        raise HTTPException(
-            status_code=400,
-            detail="Comment not liked"
-        )
-    
-    await db.delete(like)
-    await db.commit()
-    
-    result = await db.execute(select(Comment).where(Comment.id == comment_id))
-    return result.scalar_one_or_none() 
\ No newline at end of file
+    return await _toggle_comment_like(db, comment_id, current_user, liked=False)
@@ -0,0 +1,16 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+from app.api import deps
+from app.core import metrics
+from app.schemas.schemas import Principal
+
+router = APIRouter()
+
+@router.get("", response_model=dict)
+async def read_metrics(
+    current_user: Principal = Depends(deps.get_current_admin_principal),
+) -> Any:
+    """
+    Get in-process performance metrics of the worker serving this request (admin only).
+    """
+    return metrics.snapshot()
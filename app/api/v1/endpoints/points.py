@@ -1,15 +1,47 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import inspect, select, and_, tuple_
+from sqlalchemy.sql import Select
 from app.api import deps
+from app.api.fields import FieldSelection, sparse_fields
 from app.models.models import User, PointsTransaction, PointsRecipient
-from app.schemas.schemas import Transaction
-from app.core.constants import TransactionType
+from app.schemas.schemas import CompanyBalancesAsOf, Transaction, Principal
+from app.core.constants import AuditAction, TransactionType
+from app.core.config import get_settings
 from app.db.session import get_db
+from app.services import audit, balance_snapshots
+from app.services.ledger_partitions import read_archived_transactions
 
 router = APIRouter()
 
+transaction_fields = sparse_fields(Transaction, PointsTransaction)
+
+def _archived_month(month: str) -> datetime:
+    try:
+        return datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="archived_month must be YYYY-MM")
+
+def _utc(moment: Optional[datetime]) -> Optional[datetime]:
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+# Opaque to clients: the keyset (time, transaction id) of a page's last row
+def _encode_cursor(moment: datetime, transaction_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{moment.isoformat()}|{transaction_id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        moment, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(moment), int(transaction_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/balance", response_model=dict)
 async def get_points_balance(
     current_user: User = Depends(deps.get_current_active_user),
@@ -22,52 +54,206 @@ async def get_points_balance(
         "redeemable_points": current_user.redeemable_points
     }
 
+class HistoryFilters:
+    """
+    Filters and keyset position shared by the history endpoints.
+    """
+
+    def __init__(
+        self,
+        transaction_type: Optional[TransactionType] = None,
+        since: Optional[datetime] = Query(None, description="Only transactions at or after this time"),
+        until: Optional[datetime] = Query(None, description="Only transactions before this time"),
+        cursor: Optional[str] = Query(None, description="The X-Next-Cursor header of the previous page"),
+    ) -> None:
+        self.transaction_type = transaction_type
+        self.since = _utc(since)
+        self.until = _utc(until)
+        self.cursor = _decode_cursor(cursor) if cursor else None
+
+def _history_query(
+    fields: FieldSelection,
+    filters: HistoryFilters,
+    company_id: Optional[int] = None,
+    sender_id: Optional[int] = None,
+    recipient_id: Optional[int] = None,
+) -> Select:
+    """
+    Newest first (transaction, keyset time) rows matching the filters. With
+    a recipient the (recipient_id, created_at, transaction_id) index is
+    walked and rows are keyed on when the points were received; otherwise
+    on the transaction's (created_at, id).
+    """
+    query = fields.apply(select(PointsTransaction))
+    if recipient_id is not None:
+        query = query.join(
+            PointsRecipient,
+            and_(
+                PointsRecipient.transaction_id == PointsTransaction.id,
+                # Recipients are written with or just after their transaction
+                PointsRecipient.created_at >= PointsTransaction.created_at,
+            ),
+        ).where(PointsRecipient.recipient_id == recipient_id)
+        key_at, key_id = PointsRecipient.created_at, PointsRecipient.transaction_id
+    else:
+        key_at, key_id = PointsTransaction.created_at, PointsTransaction.id
+
+    if company_id is not None:
+        query = query.where(PointsTransaction.company_id == company_id)
+    if sender_id is not None:
+        query = query.where(PointsTransaction.sender_id == sender_id)
+    if filters.transaction_type:
+        query = query.where(PointsTransaction.transaction_type == filters.transaction_type)
+    if filters.since:
+        query = query.where(key_at >= filters.since)
+    if filters.until:
+        query = query.where(key_at < filters.until)
+    if filters.cursor:
+        moment, transaction_id = filters.cursor
+        # The plain bound is what the index range and partition pruning use
+        query = query.where(key_at <= moment).where(tuple_(key_at, key_id) < tuple_(moment, transaction_id))
+    return query.add_columns(key_at).order_by(key_at.desc(), key_id.desc())
+
+def _transaction_row(transaction: PointsTransaction, recipients: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # The loaded columns only, so the recipients relationship is never lazy loaded
+    state = inspect(transaction)
+    row = {key: getattr(transaction, key) for key in state.mapper.column_attrs.keys() if key not in state.unloaded}
+    row["recipients"] = recipients
+    return row
+
+async def _with_recipients(
+    db: AsyncSession, transactions: Sequence[PointsTransaction], fields: FieldSelection,
+) -> List[Dict[str, Any]]:
+    """
+    Response rows for a page of transactions with their recipients embedded,
+    loaded in one query for the whole page (none if they weren't asked for).
+    """
+    recipients: Dict[int, List[Dict[str, Any]]] = {transaction.id: [] for transaction in transactions}
+    if transactions and (fields.fields is None or "recipients" in fields.fields):
+        result = await db.execute(
+            select(
+                PointsRecipient.transaction_id,
+                PointsRecipient.recipient_id,
+                PointsRecipient.points_amount,
+                User.full_name,
+            )
+            .join(User, PointsRecipient.recipient_id == User.id)
+            .where(PointsRecipient.transaction_id.in_(list(recipients)))
+            .where(PointsRecipient.created_at >= min(transaction.created_at for transaction in transactions))
+            .order_by(PointsRecipient.id)
+        )
+        for transaction_id, recipient_id, points_amount, full_name in result.all():
+            recipients[transaction_id].append({"user_id": recipient_id, "full_name": full_name, "points": points_amount})
+
+    return [_transaction_row(transaction, recipients[transaction.id]) for transaction in transactions]
+
+async def _history_page(
+    db: AsyncSession, query: Select, skip: int, limit: int, fields: FieldSelection, response: Response,
+) -> Any:
+    result = await db.execute(query.offset(skip).limit(limit))
+    keyed = result.all()
+    body = fields.respond(await _with_recipients(db, [transaction for transaction, _ in keyed], fields))
+    if keyed and len(keyed) == limit:
+        transaction, moment = keyed[-1]
+        # A trimmed response is already a Response of its own
+        (body if isinstance(body, Response) else response).headers["X-Next-Cursor"] = _encode_cursor(
+            moment, transaction.id
+        )
+    return body
+
+async def _archived_history(
+    db: AsyncSession,
+    month: str,
+    filters: HistoryFilters,
+    skip: int,
+    limit: int,
+    fields: FieldSelection,
+    company_id: Optional[int] = None,
+    sender_id: Optional[int] = None,
+    recipient_id: Optional[int] = None,
+) -> Any:
+    if filters.since or filters.until or filters.cursor:
+        raise HTTPException(status_code=400, detail="since, until and cursor can't be combined with archived_month")
+    rows = await run_in_threadpool(
+        read_archived_transactions,
+        get_settings().LEDGER_ARCHIVE_DIR,
+        _archived_month(month),
+        company_id=company_id,
+        sender_id=sender_id,
+        recipient_id=recipient_id,
+    )
+    if filters.transaction_type:
+        rows = [row for row in rows if row["transaction_type"] == filters.transaction_type.value]
+    rows = rows[skip:skip + limit]
+
+    # Archives keep ids only; names come from the users table
+    user_ids = {recipient["user_id"] for row in rows for recipient in row["recipients"]}
+    names: Dict[int, str] = {}
+    if user_ids:
+        result = await db.execute(select(User.id, User.full_name).where(User.id.in_(user_ids)))
+        names = dict(result.all())
+    for row in rows:
+        for recipient in row["recipients"]:
+            recipient["full_name"] = names.get(recipient["user_id"])
+    return fields.respond(rows)
+
 @router.get("/history/sent", response_model=List[Transaction])
 async def get_sent_points_history(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    recipient_id: Optional[int] = None,
+    archived_month: Optional[str] = Query(None, description="Read an archived month (YYYY-MM)"),
+    filters: HistoryFilters = Depends(),
+    fields: FieldSelection = Depends(transaction_fields),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get points transactions history where current user is sender.
     """
-    result = await db.execute(
-        select(PointsTransaction)
-        .where(PointsTransaction.sender_id == current_user.id)
-        .order_by(PointsTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
+    if archived_month:
+        return await _archived_history(
+            db, archived_month, filters, skip, limit, fields, sender_id=current_user.id, recipient_id=recipient_id,
+        )
+    query = _history_query(fields, filters, sender_id=current_user.id, recipient_id=recipient_id)
+    return await _history_page(db, query, skip, limit, fields, response)
 
 @router.get("/history/received", response_model=List[Transaction])
 async def get_received_points_history(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    sender_id: Optional[int] = None,
+    archived_month: Optional[str] = Query(None, description="Read an archived month (YYYY-MM)"),
+    filters: HistoryFilters = Depends(),
+    fields: FieldSelection = Depends(transaction_fields),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get points transactions history where current user is recipient.
     """
-    result = await db.execute(
-        select(PointsTransaction)
-        .join(PointsRecipient)
-        .where(PointsRecipient.recipient_id == current_user.id)
-        .order_by(PointsTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
+    if archived_month:
+        return await _archived_history(
+            db, archived_month, filters, skip, limit, fields, sender_id=sender_id, recipient_id=current_user.id,
+        )
+    query = _history_query(fields, filters, sender_id=sender_id, recipient_id=current_user.id)
+    return await _history_page(db, query, skip, limit, fields, response)
 
 @router.get("/company/{company_id}/transactions", response_model=List[Transaction])
 async def get_company_transactions(
     company_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    sender_id: Optional[int] = None,
+    recipient_id: Optional[int] = None,
+    archived_month: Optional[str] = Query(None, description="Read an archived month (YYYY-MM)"),
+    filters: HistoryFilters = Depends(),
+    fields: FieldSelection = Depends(transaction_fields),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_admin_user),
+    current_user: Principal = Depends(deps.get_current_admin_principal),
 ) -> Any:
     """
     Get all points transactions in a company (admin only).
@@ -77,16 +263,30 @@ async def get_company_transactions(
             status_code=403,
             detail="Not enough permissions to access transactions from other companies"
         )
-    
-    result = await db.execute(
-        select(PointsTransaction)
-        .join(User, PointsTransaction.sender_id == User.id)
-        .where(User.company_id == company_id)
-        .order_by(PointsTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
+    if archived_month:
+        return await _archived_history(
+            db, archived_month, filters, skip, limit, fields,
+            company_id=company_id, sender_id=sender_id, recipient_id=recipient_id,
+        )
+    query = _history_query(fields, filters, company_id=company_id, sender_id=sender_id, recipient_id=recipient_id)
+    return await _history_page(db, query, skip, limit, fields, response)
+
+@router.get("/company/{company_id}/balances", response_model=CompanyBalancesAsOf)
+async def get_company_balances_as_of(
+    company_id: int,
+    as_of: datetime = Query(..., description="ISO timestamp; UTC unless it has an offset"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_admin_principal),
+) -> Any:
+    """
+    Get every member's redeemable balance at a point in time (admin only).
+    """
+    if current_user.company_id != company_id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    try:
+        return (await balance_snapshots.balances_as_of(await db.connection(), company_id, _utc(as_of)))._asdict()
+    except balance_snapshots.LedgerArchived as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/admin-adjustment", response_model=Transaction)
 async def create_admin_adjustment(
@@ -111,29 +311,37 @@ async def create_admin_adjustment(
     # Create transaction
     transaction = PointsTransaction(
         sender_id=current_user.id,
+        company_id=current_user.company_id,
         transaction_type=TransactionType.ADMIN_ADJUSTMENT,
         points=abs(points),
         admin_notes=notes
     )
     db.add(transaction)
-    await db.commit()
-    await db.refresh(transaction)
+    await db.flush()
     
     # Create recipient and update points
     recipient = PointsRecipient(
         transaction_id=transaction.id,
         recipient_id=user_id,
-        points_amount=abs(points)
+        points_amount=abs(points),
+        created_at=transaction.created_at,
     )
     db.add(recipient)
     
-    # Update user's points
+    # Update user's points; locked and reloaded so the audited change is the applied one
+    await db.refresh(user, with_for_update=True)
+    previous = user.giveable_points
     if points > 0:
         user.giveable_points += points
     else:
         user.giveable_points = max(0, user.giveable_points + points)
     
     db.add(user)
+    audit.record(
+        db, current_user.company_id, AuditAction.ADMIN_ADJUSTMENT, current_user.id,
+        [(user_id, "giveable_points", user.giveable_points - previous)],
+        transaction_id=transaction.id, requested=points, notes=notes,
+    )
     await db.commit()
     
-    return transaction 
\ No newline at end of file
+    return _transaction_row(transaction, [{"user_id": user.id, "full_name": user.full_name, "points": abs(points)}]) 
\ No newline at end of file
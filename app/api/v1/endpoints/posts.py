@@ -1,20 +1,36 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List, Sequence, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import exists, select, func, update
 from app.api import deps
-from app.models.models import Post, User, PointsTransaction, PointsRecipient, PostLike
-from app.schemas.schemas import Post as PostSchema, PostTransactionCreate
-from app.core.constants import TransactionType
+from app.api.fields import FieldSelection, sparse_fields
+from app.models.models import Post, User, PointsTransaction, PointsRecipient, PostLike, Comment, Attachment
+from app.schemas.schemas import (
+    Post as PostSchema, Comment as CommentSchema, PostTransactionCreate, FeedPost, FeedUser, FeedRecipient, FeedComment,
+    Attachment as AttachmentSchema, Principal,
+)
+from app.core.constants import (
+    AuditAction, TransactionType, PostSort, FEED_COMMENTS_PER_POST, MAX_FEED_COMMENTS_PER_POST, TRENDING_LIKE_WEIGHT,
+    TRENDING_POINT_WEIGHT,
+)
 from app.db.session import get_db
+from app.services.like_buffer import like_buffer
+from app.services.likes import toggle_like
+from app.services.loaders import Loaders
+from app.services.points import credit_recipients, debit_giveable
+from app.services.roster import roster_cache
+from app.services import audit, trending, user_stats
 
 router = APIRouter()
 
+post_fields = sparse_fields(PostSchema, Post)
+
 @router.post("", response_model=PostSchema)
 async def create_post(
     *,
     db: AsyncSession = Depends(get_db),
     post_in: PostTransactionCreate,
+    loaders: Loaders = Depends(deps.get_loaders),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
     """
@@ -28,65 +44,127 @@ async def create_post(
             detail="Not enough points available"
         )
     
-    # Validate recipients are from same company
-    for recipient in post_in.recipients:
-        result = await db.execute(select(User).where(User.id == recipient.user_id))
-        user = result.scalar_one_or_none()
-        if not user or user.company_id != current_user.company_id:
+    # Validate recipients are from same company (from the cached roster)
+    invalid = await roster_cache.non_members(
+        db, loaders, current_user.company_id, [recipient.user_id for recipient in post_in.recipients]
+    )
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid recipient: {invalid[0]}"
+        )
+
+    # Attachments must be the author's own uploads, not yet on a post
+    attachment_ids = list(dict.fromkeys(post_in.attachment_ids))
+    if attachment_ids:
+        result = await db.execute(
+            select(Attachment.id)
+            .where(Attachment.id.in_(attachment_ids))
+            .where(Attachment.uploader_id == current_user.id)
+            .where(Attachment.post_id.is_(None))
+        )
+        available = set(result.scalars())
+        unavailable = [attachment_id for attachment_id in attachment_ids if attachment_id not in available]
+        if unavailable:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid recipient: {recipient.user_id}"
+                detail=f"Invalid attachment: {unavailable[0]}"
             )
     
+    # The whole recognition is one transaction; the conditional debit is
+    # what stops concurrent recognitions by the sender from overdrawing
+    result = await db.execute(debit_giveable(current_user.id, total_points))
+    if result.first() is None:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Not enough points available"
+        )
+
     # Create post
+    engagement = total_points * TRENDING_POINT_WEIGHT
     post = Post(
         content=post_in.content,
         author_id=current_user.id,
-        total_points=total_points
+        company_id=current_user.company_id,
+        total_points=total_points,
+        engagement=engagement,
+        # created_at defaults to the same transaction timestamp
+        hot_score=trending.hot_score(engagement, func.now()),
     )
     db.add(post)
-    await db.commit()
-    await db.refresh(post)
+    await db.flush()
     
     # Create transaction
     transaction = PointsTransaction(
         sender_id=current_user.id,
+        company_id=current_user.company_id,
         transaction_type=TransactionType.RECOGNITION,
         points=total_points,
         post_id=post.id
     )
     db.add(transaction)
-    await db.commit()
-    await db.refresh(transaction)
+    await db.flush()
     
     # Create recipients and update points
     for recipient_data in post_in.recipients:
         recipient = PointsRecipient(
             transaction_id=transaction.id,
             recipient_id=recipient_data.user_id,
-            points_amount=recipient_data.points
+            points_amount=recipient_data.points,
+            created_at=transaction.created_at,
         )
         db.add(recipient)
-        
-        result = await db.execute(select(User).where(User.id == recipient_data.user_id))
-        user = result.scalar_one_or_none()
-        user.redeemable_points += recipient_data.points
-        db.add(user)
-    
-    # Update sender's points
-    current_user.giveable_points -= total_points
-    db.add(current_user)
+    await db.execute(credit_recipients((r.user_id, r.points) for r in post_in.recipients))
+    if attachment_ids:
+        await db.execute(
+            update(Attachment)
+            .where(Attachment.id.in_(attachment_ids))
+            .where(Attachment.post_id.is_(None))
+            .values(post_id=post.id)
+        )
     
+    user_stats.enqueue_recognition(
+        db,
+        current_user.id,
+        [(r.user_id, r.points) for r in post_in.recipients],
+        authored_post=True,
+    )
+    audit.record(
+        db, current_user.company_id, AuditAction.RECOGNITION, current_user.id,
+        audit.recognition_changes(current_user.id, [(r.user_id, r.points) for r in post_in.recipients]),
+        post_id=post.id, transaction_id=transaction.id,
+    )
     await db.commit()
     return post
 
+@router.get("/batch", response_model=List[PostSchema])
+async def read_posts_batch(
+    ids: List[int] = Depends(deps.batch_ids),
+    loaders: Loaders = Depends(deps.get_loaders),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Get posts by id, in request order; unknown ids and other companies' posts are left out.
+    """
+    posts = await loaders.posts.load_many(ids)
+    return [post for post in posts if post and post.company_id == current_user.company_id]
+
+def _post_order(sort: PostSort):
+    # Both orders are served by a (company_id, <order>) index
+    if sort == PostSort.TOP:
+        return (Post.hot_score.desc(), Post.id.desc())
+    return (Post.created_at.desc(), Post.id.desc())
+
 @router.get("/company/{company_id}", response_model=List[PostSchema])
 async def read_company_posts(
     company_id: int,
     skip: int = 0,
     limit: int = 100,
+    sort: PostSort = Query(PostSort.RECENT, description="recent: newest first; top: trending by time-decayed engagement"),
+    fields: FieldSelection = Depends(post_fields),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get all posts in a company.
@@ -98,82 +176,223 @@ async def read_company_posts(
         )
     
     result = await db.execute(
-        select(Post)
-        .join(User, Post.author_id == User.id)
-        .where(User.company_id == company_id)
-        .order_by(Post.created_at.desc())
+        fields.apply(select(Post))
+        .where(Post.company_id == company_id)
+        .order_by(*_post_order(sort))
         .offset(skip)
         .limit(limit)
     )
-    return result.scalars().all()
+    return fields.respond(result.scalars().all())
 
-@router.post("/{post_id}/like", response_model=PostSchema)
-async def like_post(
-    post_id: int,
+async def _build_feed_cards(
+    db: AsyncSession,
+    rows: Sequence[Tuple[Post, User]],
+    current_user: Principal,
+    comments_per_post: int,
+) -> List[FeedPost]:
+    """
+    Hydrate (post, author) rows into feed cards with four batched queries,
+    independent of the page size.
+    """
+    if not rows:
+        return []
+    post_ids = [post.id for post, _ in rows]
+
+    # Tagged recipients of each post's recognition transaction
+    recipients: Dict[int, List[FeedRecipient]] = {post_id: [] for post_id in post_ids}
+    result = await db.execute(
+        select(
+            PointsTransaction.post_id,
+            PointsRecipient.recipient_id,
+            PointsRecipient.points_amount,
+            User.full_name,
+        )
+        .join(PointsRecipient, PointsRecipient.transaction_id == PointsTransaction.id)
+        .join(User, PointsRecipient.recipient_id == User.id)
+        .where(PointsTransaction.post_id.in_(post_ids))
+        .where(PointsTransaction.transaction_type == TransactionType.RECOGNITION)
+        .order_by(PointsRecipient.id)
+    )
+    for post_id, recipient_id, points_amount, full_name in result.all():
+        recipients[post_id].append(
+            FeedRecipient(user_id=recipient_id, full_name=full_name, points=points_amount)
+        )
+
+    # Which of the posts the current user liked; like counts are the
+    # denormalized posts.like_count
+    result = await db.execute(
+        select(PostLike.post_id)
+        .where(PostLike.post_id.in_(post_ids))
+        .where(PostLike.user_id == current_user.id)
+    )
+    liked = set(result.scalars())
+
+    # Latest comments per post plus the total comment count, in one windowed query.
+    # At least the newest comment is fetched so the count is known even when
+    # no comments are requested.
+    ranked = (
+        select(
+            Comment.id.label("id"),
+            func.row_number().over(
+                partition_by=Comment.post_id,
+                order_by=(Comment.created_at.desc(), Comment.id.desc()),
+            ).label("rank"),
+            func.count(Comment.id).over(partition_by=Comment.post_id).label("total"),
+        )
+        .where(Comment.post_id.in_(post_ids))
+        .subquery()
+    )
+    comments: Dict[int, List[FeedComment]] = {post_id: [] for post_id in post_ids}
+    comment_counts: Dict[int, int] = {}
+    result = await db.execute(
+        select(Comment, User, ranked.c.rank, ranked.c.total)
+        .join(ranked, ranked.c.id == Comment.id)
+        .join(User, Comment.author_id == User.id)
+        .where(ranked.c.rank <= max(comments_per_post, 1))
+        .order_by(Comment.post_id, ranked.c.rank)
+    )
+    for comment, author, rank, total in result.all():
+        comment_counts[comment.post_id] = total
+        if rank <= comments_per_post:
+            comments[comment.post_id].append(
+                FeedComment(
+                    **CommentSchema.model_validate(comment).model_dump(),
+                    author=FeedUser.model_validate(author),
+                )
+            )
+
+    # Attachments, in upload order
+    attachments: Dict[int, List[AttachmentSchema]] = {post_id: [] for post_id in post_ids}
+    result = await db.execute(
+        select(Attachment).where(Attachment.post_id.in_(post_ids)).order_by(Attachment.id)
+    )
+    for attachment in result.scalars():
+        attachments[attachment.post_id].append(AttachmentSchema.model_validate(attachment))
+
+    cards = []
+    for post, author in rows:
+        card = PostSchema.model_validate(post).model_dump()
+        card.update(comment_count=comment_counts.get(post.id, 0))
+        cards.append(
+            FeedPost(
+                **card,
+                author=FeedUser.model_validate(author),
+                recipients=recipients[post.id],
+                liked_by_me=post.id in liked,
+                latest_comments=comments[post.id],
+                attachments=attachments[post.id],
+            )
+        )
+    return cards
+
+@router.get("/company/{company_id}/feed", response_model=List[FeedPost])
+async def read_company_feed(
+    company_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    comments_per_post: int = Query(FEED_COMMENTS_PER_POST, ge=0, le=MAX_FEED_COMMENTS_PER_POST),
+    sort: PostSort = Query(PostSort.RECENT, description="recent: newest first; top: trending by time-decayed engagement"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
-    Like a post.
+    Get company posts as full feed cards: author, tagged recipients, like
+    count, liked_by_me and the latest comments, loaded in a fixed number of queries.
     """
-    # Check if post exists and is from same company
+    if current_user.company_id != company_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Not enough permissions to access posts from other companies"
+        )
+
     result = await db.execute(
-        select(Post)
+        select(Post, User)
         .join(User, Post.author_id == User.id)
+        .where(Post.company_id == company_id)
+        .order_by(*_post_order(sort))
+        .offset(skip)
+        .limit(limit)
+    )
+    return await _build_feed_cards(db, result.all(), current_user, comments_per_post)
+
+def _like_target(post_id: int, company_id: int):
+    return (
+        select(Post.id, Post.company_id, (Post.company_id == company_id).label("same_company"))
         .where(Post.id == post_id)
+        .cte("target")
     )
-    post = result.scalar_one_or_none()
-    
+
+async def _company_post(db: AsyncSession, post_id: int, current_user: Principal) -> Post:
+    post = await db.get(Post, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    
-    post_author = await db.get(User, post.author_id)
-    if post_author.company_id != current_user.company_id:
+    if post.company_id != current_user.company_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Check if already liked
+    return post
+
+async def _buffer_post_like(db: AsyncSession, post_id: int, current_user: Principal, liked: bool) -> PostSchema:
+    post = await _company_post(db, post_id, current_user)
+    if liked:
+        like_buffer.like(post_id, current_user.id)
+    else:
+        like_buffer.unlike(post_id, current_user.id)
+    # The stored count, adjusted for the toggle this request just buffered
     result = await db.execute(
-        select(PostLike)
-        .where(PostLike.post_id == post_id)
-        .where(PostLike.user_id == current_user.id)
+        select(Post.like_count, exists().where(PostLike.post_id == post_id).where(PostLike.user_id == current_user.id))
+        .where(Post.id == post_id)
     )
-    if result.scalar_one_or_none():
+    like_count, stored_like = result.one()
+    like_count += int(liked) - int(stored_like)
+    return PostSchema.model_validate(post).model_copy(update={"like_count": max(0, like_count)})
+
+async def _toggle_post_like(db: AsyncSession, post_id: int, current_user: Principal, liked: bool) -> PostSchema:
+    result = await db.execute(
+        toggle_like(
+            Post, PostLike, "post_id", "unique_post_like",
+            _like_target(post_id, current_user.company_id), current_user.id, liked,
+            engagement_weight=TRENDING_LIKE_WEIGHT,
+        )
+    )
+    row = result.one_or_none()
+    await db.commit()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Post not found")
+    post, same_company, like_count = row
+    if not same_company:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if like_count is None:
         raise HTTPException(
             status_code=400,
-            detail="Post already liked"
+            detail="Post already liked" if liked else "Post not liked"
         )
-    
-    # Create like
-    like = PostLike(post_id=post_id, user_id=current_user.id)
-    db.add(like)
-    await db.commit()
-    
-    return post
+    return PostSchema.model_validate(post).model_copy(update={"like_count": like_count})
+
+@router.post("/{post_id}/like", response_model=PostSchema)
+async def like_post(
+    post_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Like a post.
+    """
+    # Buffered mode acknowledges right away; liking twice is a no-op there
+    if like_buffer.running:
+        return await _buffer_post_like(db, post_id, current_user, liked=True)
+
+    return await _toggle_post_like(db, post_id, current_user, liked=True)
 
 @router.delete("/{post_id}/like", response_model=PostSchema)
 async def unlike_post(
     post_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Unlike a post.
     """
-    result = await db.execute(
-        select(PostLike)
-        .where(PostLike.post_id == post_id)
-        .where(PostLike.user_id == current_user.id)
-    )
-    like = result.scalar_one_or_none()
-    
-    if not like:
-        raise HTTPException(
-            status_code=400,
-            detail="Post not liked"
-        )
-    
-    await db.delete(like)
-    await db.commit()
-    
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    return result.scalar_one_or_none() 
\ No newline at end of file
+    if like_buffer.running:
+        return await _buffer_post_like(db, post_id, current_user, liked=False)
+
+    return await _toggle_post_like(db, post_id, current_user, liked=False)
@@ -1,16 +1,27 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.api import deps
-from app.models.models import User
-from app.schemas.schemas import User as UserSchema, UserUpdate
+from app.api.fields import FieldSelection, sparse_fields
+from app.models.models import User, UserStats
+from app.schemas.schemas import (
+    User as UserSchema, UserUpdate, UserStats as UserStatsSchema, Principal, InviteReport, UserSearchResult,
+)
+from app.core.constants import AuditAction, MAX_INVITES_PER_REQUEST, USER_SEARCH_LIMIT, MAX_USER_SEARCH_LIMIT
 from app.core.security import get_password_hash
 from app.db.session import get_db
+from app.services import audit
+from app.services.invites import InviteFileError, invite_users, parse_invites
+from app.services.loaders import Loaders
+from app.services.roster import roster_cache
+from app.services.token_revocation import revocation_list
 from datetime import datetime
 
 router = APIRouter()
 
+user_fields = sparse_fields(UserSchema, User)
+
 @router.get("/me", response_model=UserSchema)
 async def read_user_me(
     current_user: User = Depends(deps.get_current_active_user),
@@ -47,14 +58,45 @@ async def update_user_me(
     
     db.add(current_user)
     await db.commit()
+    roster_cache.invalidate(current_user.company_id)
     await db.refresh(current_user)
     return current_user
 
+@router.get("/batch", response_model=List[UserSchema])
+async def read_users_batch(
+    ids: List[int] = Depends(deps.batch_ids),
+    loaders: Loaders = Depends(deps.get_loaders),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Get users by id, in request order; unknown, deleted and other companies' users are left out.
+    """
+    users = await loaders.users.load_many(ids)
+    return [
+        user for user in users
+        if user and user.company_id == current_user.company_id and not user.deleted_at
+    ]
+
+@router.get("/search", response_model=List[UserSearchResult])
+async def search_users(
+    q: str = Query(..., min_length=1, description="Prefix of a colleague's name, any word of it, or email"),
+    limit: int = Query(USER_SEARCH_LIMIT, ge=1, le=MAX_USER_SEARCH_LIMIT),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Typeahead over the active users of the current user's company, served
+    from the in-memory roster.
+    """
+    roster = await roster_cache.get(db, current_user.company_id)
+    return roster.search(q, limit)
+
 @router.get("/company/{company_id}", response_model=List[UserSchema])
 async def read_users_by_company(
     company_id: int,
+    fields: FieldSelection = Depends(user_fields),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get all users in a company.
@@ -66,11 +108,63 @@ async def read_users_by_company(
         )
     
     result = await db.execute(
-        select(User)
+        fields.apply(select(User))
         .where(User.company_id == company_id)
         .where(User.deleted_at.is_(None))
     )
-    return result.scalars().all()
+    return fields.respond(result.scalars().all())
+
+@router.post("/invite", response_model=InviteReport)
+async def invite_company_users(
+    file: UploadFile = File(..., description="CSV with email,full_name[,role][,password] columns"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_admin_principal),
+) -> Any:
+    """
+    Invite users into the admin's company from a CSV file (admin only).
+    """
+    try:
+        invites, invalid = parse_invites((await file.read()).decode("utf-8-sig"))
+    except (UnicodeDecodeError, InviteFileError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid invite file: {e}")
+    if len(invites) + len(invalid) > MAX_INVITES_PER_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_INVITES_PER_REQUEST} invites per request"
+        )
+    
+    results = await invite_users(db, current_user.company_id, invites, invited_by=current_user.id)
+    results = sorted(results + invalid, key=lambda r: r.row)
+    created = sum(1 for r in results if r.status == "created")
+    if created:
+        roster_cache.invalidate(current_user.company_id)
+    return InviteReport(created=created, skipped=len(results) - created, results=results)
+
+@router.get("/{user_id}/stats", response_model=UserStatsSchema)
+async def read_user_stats(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Get a user's recognition totals from the user_stats aggregate.
+    """
+    result = await db.execute(
+        select(User.company_id, UserStats)
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    company_id, stats = row
+    if company_id != current_user.company_id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    if stats is None:
+        return UserStatsSchema(user_id=user_id)
+    return UserStatsSchema.model_validate(stats, from_attributes=True)
 
 @router.delete("/{user_id}", response_model=UserSchema)
 async def delete_user(
@@ -93,7 +187,9 @@ async def delete_user(
     
     user.deleted_at = datetime.utcnow()
     db.add(user)
-    await db.commit()
+    # Cut off tokens the user still holds, including self-contained ones
+    await revocation_list.revoke_user(db, user.id)
+    roster_cache.invalidate(user.company_id)
     await db.refresh(user)
     return user
 
@@ -121,8 +217,16 @@ async def update_user_points(
     if user.company_id != current_user.company_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    # Locked and reloaded so the audited previous value is the one overwritten
+    await db.refresh(user, with_for_update=True)
+    previous = user.giveable_points
     user.giveable_points = points
     db.add(user)
+    audit.record(
+        db, current_user.company_id, AuditAction.GIVEABLE_POINTS_SET, current_user.id,
+        [(user_id, "giveable_points", points - previous)],
+        previous=previous, new=points,
+    )
     await db.commit()
     await db.refresh(user)
     return user 
\ No newline at end of file
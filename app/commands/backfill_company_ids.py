@@ -0,0 +1,123 @@
+"""
+Fill the denormalized company_id on posts, comments, ledger transactions
+and likes, then validate the company foreign keys.
+
+    python -m app.commands.backfill_company_ids [--batch-size 5000] [--pause-ms 0]
+
+Rows are updated in id ranges, one short transaction per batch, and only
+where company_id is still NULL, so the command can run against live
+traffic and be re-run after an interruption. New rows get company_id on
+write, so run it once right after deploying the migration.
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.db.session import dispose_engine, get_engine
+from app.services.ledger_partitions import list_partitions
+
+# Each statement fills rows with lo <= id < hi
+BACKFILL_BATCHES = {
+    "posts": """
+        UPDATE posts p SET company_id = u.company_id
+        FROM users u
+        WHERE u.id = p.author_id AND p.id >= :lo AND p.id < :hi AND p.company_id IS NULL
+    """,
+    "comments": """
+        UPDATE comments c SET company_id = u.company_id
+        FROM users u
+        WHERE u.id = c.author_id AND c.id >= :lo AND c.id < :hi AND c.company_id IS NULL
+    """,
+    # Bulk initial allocations may have no sender; their recipients share
+    # the company
+    "points_transactions": """
+        UPDATE points_transactions t SET company_id = COALESCE(
+            (SELECT u.company_id FROM users u WHERE u.id = t.sender_id),
+            (SELECT u.company_id FROM points_recipients r JOIN users u ON u.id = r.recipient_id
+             WHERE r.transaction_id = t.id LIMIT 1)
+        )
+        WHERE t.id >= :lo AND t.id < :hi AND t.company_id IS NULL
+    """,
+    "post_likes": """
+        UPDATE post_likes l SET company_id = u.company_id
+        FROM posts p JOIN users u ON u.id = p.author_id
+        WHERE p.id = l.post_id AND l.id >= :lo AND l.id < :hi AND l.company_id IS NULL
+    """,
+    "comment_likes": """
+        UPDATE comment_likes l SET company_id = u.company_id
+        FROM comments c JOIN users u ON u.id = c.author_id
+        WHERE c.id = l.comment_id AND l.id >= :lo AND l.id < :hi AND l.company_id IS NULL
+    """,
+}
+
+# Added NOT VALID by the migration
+UNVALIDATED_TABLES = ["posts", "comments", "post_likes", "comment_likes"]
+# Partitioned tables, whose foreign key the migration added NOT VALID on
+# each partition. Once those are validated, adding it to the parent
+# attaches them instead of scanning the partitions again.
+PARTITIONED_TABLES = ["points_transactions"]
+
+HAS_CONSTRAINT = text("SELECT 1 FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND conname = :name")
+
+
+async def _validate_partitioned(engine: AsyncEngine, table: str) -> None:
+    async with engine.connect() as conn:
+        partitions = await list_partitions(conn, table)
+    for partition in partitions:
+        constraint = f"{partition.name}_company_id_fkey"
+        async with engine.begin() as conn:
+            # Partitions created after the migration don't have it yet
+            if not await conn.scalar(HAS_CONSTRAINT, {"table": partition.name, "name": constraint}):
+                await conn.execute(text(
+                    f"ALTER TABLE {partition.name} ADD CONSTRAINT {constraint} "
+                    "FOREIGN KEY (company_id) REFERENCES companies (id) NOT VALID"
+                ))
+            await conn.execute(text(f"ALTER TABLE {partition.name} VALIDATE CONSTRAINT {constraint}"))
+    async with engine.begin() as conn:
+        if not await conn.scalar(HAS_CONSTRAINT, {"table": table, "name": f"{table}_company_id_fkey"}):
+            await conn.execute(text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_company_id_fkey "
+                "FOREIGN KEY (company_id) REFERENCES companies (id)"
+            ))
+
+
+async def backfill(batch_size: int, pause_ms: int) -> None:
+    engine = get_engine()
+    for table, statement in BACKFILL_BATCHES.items():
+        async with engine.connect() as conn:
+            result = await conn.execute(text(f"SELECT min(id), max(id) FROM {table} WHERE company_id IS NULL"))
+            first_id, last_id = result.one()
+        if first_id is None:
+            print(f"{table}: nothing to backfill")
+            continue
+
+        started = time.perf_counter()
+        updated = 0
+        for lo in range(first_id, last_id + 1, batch_size):
+            async with engine.begin() as conn:
+                result = await conn.execute(text(statement), {"lo": lo, "hi": lo + batch_size})
+                updated += result.rowcount
+            if pause_ms:
+                await asyncio.sleep(pause_ms / 1000)
+        print(f"{table}: {updated} rows in {time.perf_counter() - started:.1f}s")
+
+    for table in UNVALIDATED_TABLES:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_company_id_fkey"))
+    for table in PARTITIONED_TABLES:
+        await _validate_partitioned(engine, table)
+    print("Foreign keys validated")
+    await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill denormalized company_id columns")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--pause-ms", type=int, default=0, help="sleep between batches to spare live traffic")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.pause_ms))
+
+
+if __name__ == "__main__":
+    main()
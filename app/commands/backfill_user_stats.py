@@ -0,0 +1,164 @@
+"""
+Rebuild the user_stats aggregate from ledger, post and like history.
+
+    python -m app.commands.backfill_user_stats [--chunk-size 1000]
+
+Users are processed in id ranges, one transaction per chunk, and each row is
+overwritten with totals recomputed from history. Recognitions whose outbox
+events are still pending are left out: the outbox worker adds them when it
+applies the events. A chunk locks its rows before reading history, so stat
+updates committing meanwhile either are in what it reads or wait for it.
+The command is safe to re-run, also while the API is serving traffic. Run it
+once after deploying the user_stats migration.
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal, dispose_engine
+from app.models.models import User
+from app.services.user_stats import RECOGNITION_TOPIC
+
+# Creates the rows stats writers would otherwise insert concurrently, then
+# locks the chunk in the order writers lock rows (see user_stats.apply_deltas)
+LOCK_CHUNK = (
+    text(
+        """
+        INSERT INTO user_stats (user_id)
+        SELECT id FROM users WHERE id >= :lo AND id < :hi ORDER BY id
+        ON CONFLICT (user_id) DO NOTHING
+        """
+    ),
+    text(
+        """
+        SELECT user_id FROM user_stats
+        WHERE user_id >= :lo AND user_id < :hi
+        ORDER BY user_id
+        FOR UPDATE
+        """
+    ),
+)
+
+# Runs after LOCK_CHUNK, so its snapshot holds every committed stat update
+# of the chunk; pending recognition events are subtracted since the outbox
+# worker applies them afterwards
+BACKFILL_CHUNK = text(
+    """
+    WITH pending AS (
+        SELECT payload FROM outbox_events WHERE topic = :topic
+    ),
+    pending_sent AS (
+        SELECT
+            (p.payload->>'sender_id')::int AS user_id,
+            sum((SELECT sum((r->>1)::int) FROM jsonb_array_elements(p.payload->'recipients') r)) AS points,
+            count(*) FILTER (WHERE (p.payload->>'authored_post')::boolean) AS posts
+        FROM pending p
+        WHERE (p.payload->>'sender_id')::int >= :lo AND (p.payload->>'sender_id')::int < :hi
+        GROUP BY 1
+    ),
+    pending_received AS (
+        SELECT (r->>0)::int AS user_id, sum((r->>1)::int) AS points, count(*) AS recognitions
+        FROM pending p, jsonb_array_elements(p.payload->'recipients') r
+        WHERE (r->>0)::int >= :lo AND (r->>0)::int < :hi
+        GROUP BY 1
+    )
+    INSERT INTO user_stats (
+        user_id, points_given, points_received, posts_authored,
+        recognitions_received, likes_received
+    )
+    SELECT
+        u.id,
+        COALESCE(given.points, 0) - COALESCE(pending_sent.points, 0),
+        COALESCE(received.points, 0) - COALESCE(pending_received.points, 0),
+        COALESCE(authored.posts, 0) - COALESCE(pending_sent.posts, 0),
+        COALESCE(received.recognitions, 0) - COALESCE(pending_received.recognitions, 0),
+        COALESCE(post_likes.likes, 0) + COALESCE(comment_likes.likes, 0)
+    FROM users u
+    LEFT JOIN (
+        SELECT t.sender_id AS user_id, sum(t.points) AS points
+        FROM points_transactions t
+        WHERE t.sender_id >= :lo AND t.sender_id < :hi
+          AND t.transaction_type IN ('recognition', 'comment_recognition')
+        GROUP BY t.sender_id
+    ) given ON given.user_id = u.id
+    LEFT JOIN (
+        SELECT r.recipient_id AS user_id, sum(r.points_amount) AS points, count(*) AS recognitions
+        FROM points_recipients r
+        JOIN points_transactions t ON t.id = r.transaction_id
+        WHERE r.recipient_id >= :lo AND r.recipient_id < :hi
+          AND t.transaction_type IN ('recognition', 'comment_recognition')
+        GROUP BY r.recipient_id
+    ) received ON received.user_id = u.id
+    LEFT JOIN (
+        SELECT p.author_id AS user_id, count(*) AS posts
+        FROM posts p
+        WHERE p.author_id >= :lo AND p.author_id < :hi
+        GROUP BY p.author_id
+    ) authored ON authored.user_id = u.id
+    LEFT JOIN (
+        SELECT p.author_id AS user_id, count(*) AS likes
+        FROM post_likes l
+        JOIN posts p ON p.id = l.post_id
+        WHERE p.author_id >= :lo AND p.author_id < :hi
+        GROUP BY p.author_id
+    ) post_likes ON post_likes.user_id = u.id
+    LEFT JOIN (
+        SELECT c.author_id AS user_id, count(*) AS likes
+        FROM comment_likes l
+        JOIN comments c ON c.id = l.comment_id
+        WHERE c.author_id >= :lo AND c.author_id < :hi
+        GROUP BY c.author_id
+    ) comment_likes ON comment_likes.user_id = u.id
+    LEFT JOIN pending_sent ON pending_sent.user_id = u.id
+    LEFT JOIN pending_received ON pending_received.user_id = u.id
+    WHERE u.id >= :lo AND u.id < :hi
+    ON CONFLICT (user_id) DO UPDATE SET
+        points_given = excluded.points_given,
+        points_received = excluded.points_received,
+        posts_authored = excluded.posts_authored,
+        recognitions_received = excluded.recognitions_received,
+        likes_received = excluded.likes_received,
+        updated_at = now()
+    """
+)
+
+
+async def rebuild_chunk(db: AsyncSession, lo: int, hi: int) -> int:
+    """
+    Rebuild the stats of users ``lo`` to ``hi - 1`` in the caller's
+    transaction; commit it to release the rows. Returns the rows written.
+    """
+    for statement in LOCK_CHUNK:
+        await db.execute(statement, {"lo": lo, "hi": hi})
+    result = await db.execute(BACKFILL_CHUNK, {"lo": lo, "hi": hi, "topic": RECOGNITION_TOPIC})
+    return result.rowcount
+
+
+async def backfill(chunk_size: int) -> None:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(func.min(User.id), func.max(User.id)))
+        first_id, last_id = result.one()
+        if first_id is None:
+            print("No users to backfill")
+            return
+
+        started = time.perf_counter()
+        for lo in range(first_id, last_id + 1, chunk_size):
+            hi = lo + chunk_size
+            rows = await rebuild_chunk(db, lo, hi)
+            await db.commit()
+            print(f"users {lo}..{hi - 1}: {rows} rows")
+        print(f"Backfill finished in {time.perf_counter() - started:.1f}s")
+    await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the user_stats aggregate table")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="users per transaction")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Take and compact per-user balance snapshots.
+
+    python -m app.commands.balance_snapshots take [--at 2026-09-30T23:59:59+00:00] [--company-id 1 ...]
+    python -m app.commands.balance_snapshots compact [--keep-days 35]
+
+``take`` records every member's redeemable balance at ``--at`` (default:
+the most recent midnight UTC at least a few minutes old), one transaction
+per company, computed from the previous snapshot plus the ledger since
+then; existing snapshots are skipped, so it is safe to schedule daily and
+to re-run. As-of balance queries start from the nearest earlier snapshot,
+so they only replay the ledger since it. ``compact`` deletes snapshots
+older than ``--keep-days`` except the first of each month.
+
+Take snapshots before archiving ledger partitions: balances inside an
+archived month can only come from a snapshot.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import select
+from app.core.config import get_settings
+from app.db.session import dispose_engine, get_engine
+from app.models.models import Company
+from app.services import balance_snapshots
+
+
+async def take(at: datetime, company_ids: Optional[List[int]]) -> None:
+    engine = get_engine()
+    if not company_ids:
+        async with engine.connect() as conn:
+            company_ids = list(await conn.scalars(select(Company.id).order_by(Company.id)))
+    for company_id in company_ids:
+        async with engine.begin() as conn:
+            members = await balance_snapshots.take_snapshot(conn, company_id, at)
+        status = "already taken" if members is None else f"{members} members"
+        print(f"company {company_id}: snapshot at {at.isoformat()}, {status}")
+    await dispose_engine()
+
+
+async def compact(keep_days: int) -> None:
+    async with get_engine().begin() as conn:
+        deleted = await balance_snapshots.compact(conn, keep_days)
+    print(f"Deleted {deleted} snapshots")
+    await dispose_engine()
+
+
+def _moment(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Take and compact balance snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    take_parser = commands.add_parser("take", help="snapshot every member's balance")
+    take_parser.add_argument(
+        "--at", type=_moment,
+        default=balance_snapshots.settled().replace(hour=0, minute=0, second=0, microsecond=0),
+        help="ISO timestamp (UTC unless given); default the last midnight UTC",
+    )
+    take_parser.add_argument("--company-id", type=int, action="append", dest="company_ids", help="repeatable; default all")
+
+    compact_parser = commands.add_parser("compact", help="thin out old snapshots")
+    compact_parser.add_argument("--keep-days", type=int, default=settings.BALANCE_SNAPSHOT_KEEP_DAYS)
+
+    args = parser.parse_args()
+    if args.command == "take" and args.at > balance_snapshots.settled():
+        parser.error("--at must be a few minutes in the past, so recognitions in flight are included")
+    if args.command == "take":
+        asyncio.run(take(args.at, args.company_ids))
+    else:
+        asyncio.run(compact(args.keep_days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+Generate a synthetic dataset for load and scale testing.
+
+    python -m app.commands.generate_data [--companies 10] [--users 1000]
+        [--posts 10000] [--comments-per-post 2] [--likes-per-post 5]
+        [--comment-recognition-rate 0.2] [--days 180] [--jobs N]
+        [--chunk-size 20000] [--seed 1] [--password loadtest-password]
+
+Company sizes follow a power law, and within a company a few users write
+most posts while a different few receive most recognitions. Post
+popularity is Pareto distributed, so a handful of posts go viral with
+hundreds of likes and comments. Every post and a share of the comments
+carry a recognition in the ledger. Senders who give away more than their
+initial allocation get an admin top-up first. User balances and user_stats
+are computed from the generated ledger, so both agree with it, and posts
+get their trending scores.
+
+Companies are spread over ``--jobs`` processes (default: one per CPU).
+Each process streams its rows with COPY on its own connection, one
+transaction per ``--chunk-size`` posts. Ids are reserved from the table
+sequences, so data can be added to a database that already has rows, but
+nothing else should write to it while the command runs. Every generated
+user can log in with ``--password``.
+
+About 10M ledger transactions, for example:
+
+    python -m app.commands.generate_data --companies 200 --users 200000 \\
+        --posts 7000000 --comments-per-post 2 --comment-recognition-rate 0.2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import get_settings
+from app.core.constants import ID_RESERVATION_LOCK_KEY, INITIAL_GIVEABLE_POINTS, INITIAL_REDEEMABLE_POINTS, TransactionType, UserRole
+from app.core.security import get_password_hash
+from app.db.session import dispose_engine, get_engine
+from app.models.models import Post
+from app.services import trending
+from app.services.ledger_partitions import ensure_partitions
+
+# Shape of the generated activity
+COMPANY_SKEW = 0.8  # Zipf exponent of company sizes
+AUTHOR_SKEW = 1.1  # Zipf exponent of posts and comments written per user
+RECIPIENT_SKEW = 1.3  # Zipf exponent of recognitions received per user
+POPULARITY_ALPHA = 1.5  # Pareto shape of post popularity; mean is alpha / (alpha - 1)
+MAX_COMMENTS_PER_POST = 500
+COMMENT_LIKES_MEAN = 0.5
+REACTION_DELAY_HOURS = 6.0  # mean delay of comments and likes after their post
+RECIPIENT_COUNTS = ([1, 2, 3, 4], [60, 25, 10, 5])
+POINT_AMOUNTS = ([1, 2, 3, 5, 10], [35, 25, 20, 15, 5])
+
+PHRASES = [
+    "Thanks for jumping in on the release", "Great job on the customer demo",
+    "Huge help with the onboarding docs", "Saved the day during the outage",
+    "Amazing attention to detail", "Always happy to pair on the hard bugs",
+    "Brilliant work on the quarterly report", "Made the offsite a blast",
+    "Kept the project on track", "Went above and beyond for the client",
+]
+
+
+# Columns written by COPY, in record order
+COLUMNS = {
+    "companies": ["id", "name", "normalized_name", "created_at", "updated_at"],
+    "users": [
+        "id", "full_name", "email", "password_hash", "company_id", "role",
+        "giveable_points", "redeemable_points", "created_at", "updated_at",
+    ],
+    "posts": ["id", "author_id", "company_id", "content", "total_points", "like_count", "created_at", "updated_at"],
+    "comments": [
+        "id", "post_id", "author_id", "company_id", "content", "total_points", "like_count", "created_at", "updated_at",
+    ],
+    "points_transactions": [
+        "id", "sender_id", "company_id", "transaction_type", "post_id", "comment_id", "points", "admin_notes",
+        "created_at", "updated_at",
+    ],
+    "points_recipients": ["transaction_id", "recipient_id", "points_amount", "created_at", "updated_at"],
+    "post_likes": ["post_id", "user_id", "company_id", "created_at", "updated_at"],
+    "comment_likes": ["comment_id", "user_id", "company_id", "created_at", "updated_at"],
+    "user_stats": [
+        "user_id", "points_given", "points_received", "posts_authored", "recognitions_received", "likes_received",
+        "created_at", "updated_at",
+    ],
+}
+
+
+class Options(NamedTuple):
+    now: datetime
+    days: int
+    chunk_size: int
+    comments_per_post: float
+    likes_per_post: float
+    comment_recognition_rate: float
+    password_hash: str
+    seed: int
+
+
+class CompanyPlan(NamedTuple):
+    index: int
+    company_id: int
+    users: int
+    posts: int
+
+
+def zipf_cum_weights(n: int, skew: float) -> List[float]:
+    return list(accumulate(1 / rank ** skew for rank in range(1, n + 1)))
+
+
+def split(total: int, parts: int, skew: float, minimum: int) -> List[int]:
+    """
+    Split ``total`` into ``parts`` power-law sized shares of at least ``minimum``.
+    """
+    weights = [1 / rank ** skew for rank in range(1, parts + 1)]
+    scale = total / sum(weights)
+    return [max(minimum, round(weight * scale)) for weight in weights]
+
+
+async def reserve_ids(conn: AsyncConnection, table: str, count: int) -> int:
+    """
+    Take ``count`` consecutive ids from ``table``'s sequence; returns the first.
+    """
+    if count == 0:
+        return 0
+    # nextval + setval is not atomic; serialize the loader processes
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ID_RESERVATION_LOCK_KEY})
+    result = await conn.execute(
+        text("SELECT setval(CAST(:seq AS regclass), nextval(CAST(:seq AS regclass)) + :count - 1)"),
+        {"seq": f"{table}_id_seq", "count": count},
+    )
+    return result.scalar_one() - count + 1
+
+
+async def copy_rows(conn: AsyncConnection, table: str, rows: Sequence[tuple]) -> int:
+    if rows:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table, records=rows, columns=COLUMNS[table])
+    return len(rows)
+
+
+async def begin_bulk(conn: AsyncConnection) -> None:
+    # Also opens the transaction, which starts lazily on the first statement
+    await conn.execute(text("SET LOCAL synchronous_commit = off"))
+
+
+def _scaled_count(rng: random.Random, mean: float, popularity: float, cap: int) -> int:
+    # Popularity averages alpha / (alpha - 1); round stochastically to keep the mean
+    expected = mean * popularity * (POPULARITY_ALPHA - 1) / POPULARITY_ALPHA
+    return min(cap, int(expected + rng.random()))
+
+
+def _recipients(rng: random.Random, cum_weights: List[float], ranked: List[int], author: int) -> List[Tuple[int, int]]:
+    count = rng.choices(*RECIPIENT_COUNTS)[0]
+    picked = {ranked[i] for i in rng.choices(range(len(ranked)), cum_weights=cum_weights, k=count)}
+    picked.discard(author)
+    if not picked:
+        picked = {ranked[0] if ranked[0] != author else ranked[1]}
+    return [(user, rng.choices(*POINT_AMOUNTS)[0]) for user in sorted(picked)]
+
+
+async def load_company(plan: CompanyPlan, options: Options) -> Counter:
+    rng = random.Random(options.seed * 1_000_003 + plan.index)
+    engine = get_engine()
+    span = timedelta(days=options.days).total_seconds()
+    start = options.now - timedelta(days=options.days)
+    counts: Counter = Counter()
+
+    def at(offset_seconds: float) -> datetime:
+        return min(options.now, start + timedelta(seconds=offset_seconds))
+
+    async with engine.begin() as conn:
+        first_user = await reserve_ids(conn, "users", plan.users)
+    user_ids = list(range(first_user, first_user + plan.users))
+    async with engine.begin() as conn:
+        await begin_bulk(conn)
+        counts["users"] += await copy_rows(conn, "users", [
+            (
+                user_id, f"Synthetic User {user_id}", f"user{user_id}@company{plan.company_id}.example.com",
+                options.password_hash, plan.company_id,
+                (UserRole.ADMIN if i == 0 else UserRole.MEMBER).value,
+                INITIAL_GIVEABLE_POINTS, INITIAL_REDEEMABLE_POINTS, start, start,
+            )
+            for i, user_id in enumerate(user_ids)
+        ])
+
+    # Activity ranks: who writes most and who is recognized most differ
+    authors = user_ids[:]
+    rng.shuffle(authors)
+    receivers = user_ids[:]
+    rng.shuffle(receivers)
+    author_weights = zipf_cum_weights(plan.users, AUTHOR_SKEW)
+    receiver_weights = zipf_cum_weights(plan.users, RECIPIENT_SKEW)
+    sent: Counter = Counter()
+    received: Counter = Counter()
+    recognitions: Counter = Counter()
+    authored: Counter = Counter()
+    likes_received: Counter = Counter()
+
+    for chunk_start in range(0, plan.posts, options.chunk_size):
+        chunk = min(options.chunk_size, plan.posts - chunk_start)
+        # Generated with chunk-local indexes first; ids are known once reserved
+        posts, comments = [], []
+        for i in range(chunk):
+            author = authors[rng.choices(range(plan.users), cum_weights=author_weights)[0]]
+            created = at(span * (chunk_start + i + rng.random()) / plan.posts)
+            popularity = rng.paretovariate(POPULARITY_ALPHA)
+            recipients = _recipients(rng, receiver_weights, receivers, author)
+            likers = rng.sample(user_ids, _scaled_count(rng, options.likes_per_post, popularity, plan.users - 1))
+            posts.append((author, created, recipients, likers))
+            for _ in range(_scaled_count(rng, options.comments_per_post, popularity, MAX_COMMENTS_PER_POST)):
+                commenter = authors[rng.choices(range(plan.users), cum_weights=author_weights)[0]]
+                commented = min(options.now, created + timedelta(hours=rng.expovariate(1 / REACTION_DELAY_HOURS)))
+                recognized = rng.random() < options.comment_recognition_rate
+                comment_recipients = _recipients(rng, receiver_weights, receivers, commenter)[:1] if recognized else []
+                comment_likers = rng.sample(user_ids, min(plan.users - 1, int(rng.expovariate(1 / COMMENT_LIKES_MEAN))))
+                comments.append((i, commenter, commented, comment_recipients, comment_likers))
+
+        recognized_comments = sum(1 for comment in comments if comment[3])
+        async with engine.begin() as conn:
+            first_post = await reserve_ids(conn, "posts", len(posts))
+            first_comment = await reserve_ids(conn, "comments", len(comments))
+            first_transaction = await reserve_ids(conn, "points_transactions", len(posts) + recognized_comments)
+
+        post_rows, comment_rows, transaction_rows, recipient_rows, like_rows, comment_like_rows = [], [], [], [], [], []
+        transaction_id = first_transaction
+
+        def recognize(sender: int, recipients: List[Tuple[int, int]], kind: TransactionType, created: datetime,
+                      post_id: Optional[int] = None, comment_id: Optional[int] = None) -> int:
+            nonlocal transaction_id
+            total = sum(points for _, points in recipients)
+            transaction_rows.append((
+                transaction_id, sender, plan.company_id, kind.value, post_id, comment_id, total, None, created, created,
+            ))
+            for recipient, points in recipients:
+                recipient_rows.append((transaction_id, recipient, points, created, created))
+                received[recipient] += points
+                recognitions[recipient] += 1
+            sent[sender] += total
+            transaction_id += 1
+            return total
+
+        for i, (author, created, recipients, likers) in enumerate(posts):
+            post_id = first_post + i
+            total = recognize(author, recipients, TransactionType.RECOGNITION, created, post_id=post_id)
+            post_rows.append((
+                post_id, author, plan.company_id, rng.choice(PHRASES), total, len(likers), created, created,
+            ))
+            authored[author] += 1
+            likes_received[author] += len(likers)
+            for liker in likers:
+                liked = min(options.now, created + timedelta(hours=rng.expovariate(1 / REACTION_DELAY_HOURS)))
+                like_rows.append((post_id, liker, plan.company_id, liked, liked))
+
+        for j, (post_index, commenter, commented, recipients, likers) in enumerate(comments):
+            comment_id = first_comment + j
+            total = 0
+            if recipients:
+                total = recognize(
+                    commenter, recipients, TransactionType.COMMENT_RECOGNITION, commented, comment_id=comment_id,
+                )
+            comment_rows.append((
+                comment_id, first_post + post_index, commenter, plan.company_id, rng.choice(PHRASES), total,
+                len(likers), commented, commented,
+            ))
+            likes_received[commenter] += len(likers)
+            for liker in likers:
+                comment_like_rows.append((comment_id, liker, plan.company_id, commented, commented))
+
+        async with engine.begin() as conn:
+            await begin_bulk(conn)
+            counts["posts"] += await copy_rows(conn, "posts", post_rows)
+            counts["comments"] += await copy_rows(conn, "comments", comment_rows)
+            counts["points_transactions"] += await copy_rows(conn, "points_transactions", transaction_rows)
+            counts["points_recipients"] += await copy_rows(conn, "points_recipients", recipient_rows)
+            counts["post_likes"] += await copy_rows(conn, "post_likes", like_rows)
+            counts["comment_likes"] += await copy_rows(conn, "comment_likes", comment_like_rows)
+
+    # Allocations dated before any activity: everyone's initial points plus an
+    # admin top-up for whoever gave away more than that
+    top_ups = {
+        user_id: sent[user_id] - INITIAL_GIVEABLE_POINTS + rng.randint(0, max(INITIAL_GIVEABLE_POINTS, 10))
+        for user_id in user_ids
+        if sent[user_id] > INITIAL_GIVEABLE_POINTS
+    }
+    allocations = (1 if INITIAL_GIVEABLE_POINTS > 0 else 0) + len(top_ups)
+    async with engine.begin() as conn:
+        transaction_id = await reserve_ids(conn, "points_transactions", allocations)
+
+    transaction_rows, recipient_rows = [], []
+    if INITIAL_GIVEABLE_POINTS > 0:
+        transaction_rows.append((
+            transaction_id, None, plan.company_id, TransactionType.INITIAL_ALLOCATION.value, None, None,
+            INITIAL_GIVEABLE_POINTS * plan.users, None, start, start,
+        ))
+        recipient_rows.extend((transaction_id, user_id, INITIAL_GIVEABLE_POINTS, start, start) for user_id in user_ids)
+        transaction_id += 1
+    topped_up = start + timedelta(seconds=1)
+    for user_id, points in top_ups.items():
+        transaction_rows.append((
+            transaction_id, user_ids[0], plan.company_id, TransactionType.ADMIN_ADJUSTMENT.value, None, None,
+            points, "Synthetic data top-up", topped_up, topped_up,
+        ))
+        recipient_rows.append((transaction_id, user_id, points, topped_up, topped_up))
+        transaction_id += 1
+
+    async with engine.begin() as conn:
+        await begin_bulk(conn)
+        counts["points_transactions"] += await copy_rows(conn, "points_transactions", transaction_rows)
+        counts["points_recipients"] += await copy_rows(conn, "points_recipients", recipient_rows)
+        await conn.execute(text(
+            "CREATE TEMP TABLE synthetic_balances (id integer, giveable integer, redeemable integer) ON COMMIT DROP"
+        ))
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table("synthetic_balances", records=[
+            (
+                user_id,
+                INITIAL_GIVEABLE_POINTS + top_ups.get(user_id, 0) - sent[user_id],
+                INITIAL_REDEEMABLE_POINTS + received[user_id],
+            )
+            for user_id in user_ids
+        ])
+        await conn.execute(text(
+            """
+            UPDATE users u SET giveable_points = b.giveable, redeemable_points = b.redeemable
+            FROM synthetic_balances b WHERE u.id = b.id
+            """
+        ))
+        counts["user_stats"] += await copy_rows(conn, "user_stats", [
+            (
+                user_id, sent[user_id], received[user_id], authored[user_id], recognitions[user_id],
+                likes_received[user_id], options.now, options.now,
+            )
+            for user_id in user_ids
+        ])
+        await trending.rescore(conn, Post.company_id == plan.company_id)
+    return counts
+
+
+def _load_company_job(job: Tuple[CompanyPlan, Options]) -> Counter:
+    # Each job runs its own event loop, so it gets its own engine too
+    async def run() -> Counter:
+        try:
+            return await load_company(*job)
+        finally:
+            await dispose_engine()
+    return asyncio.run(run())
+
+
+async def prepare(args: argparse.Namespace) -> Tuple[Options, List[CompanyPlan]]:
+    now = datetime.now(timezone.utc)
+    options = Options(
+        now=now,
+        days=args.days,
+        chunk_size=args.chunk_size,
+        comments_per_post=args.comments_per_post,
+        likes_per_post=args.likes_per_post,
+        comment_recognition_rate=args.comment_recognition_rate,
+        password_hash=get_password_hash(args.password),
+        seed=args.seed,
+    )
+    users = split(args.users, args.companies, COMPANY_SKEW, minimum=2)
+    posts = [round(args.posts * company_users / sum(users)) for company_users in users]
+    run_tag = f"{now:%Y%m%d%H%M%S}"
+
+    engine = get_engine()
+    try:
+        async with engine.begin() as conn:
+            # History months need ledger partitions unless an older one covers them
+            months_back = args.days // 28 + 1
+            await ensure_partitions(
+                conn, months_back + get_settings().LEDGER_PARTITION_MONTHS_AHEAD, now=now - timedelta(days=args.days),
+            )
+            first_company = await reserve_ids(conn, "companies", args.companies)
+            await begin_bulk(conn)
+            names = [f"Synthetic {run_tag} Company {i + 1}" for i in range(args.companies)]
+            await copy_rows(conn, "companies", [
+                (first_company + i, name, name.lower(), now, now) for i, name in enumerate(names)
+            ])
+    finally:
+        await dispose_engine()
+
+    plans = [
+        CompanyPlan(index=i, company_id=first_company + i, users=users[i], posts=posts[i])
+        for i in range(args.companies)
+    ]
+    return options, plans
+
+
+async def analyze() -> None:
+    try:
+        async with get_engine().begin() as conn:
+            await conn.execute(text(f"ANALYZE {', '.join(table for table in COLUMNS)}"))
+    finally:
+        await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic data for load testing")
+    parser.add_argument("--companies", type=int, default=10)
+    parser.add_argument("--users", type=int, default=1000, help="users over all companies")
+    parser.add_argument("--posts", type=int, default=10000, help="posts over all companies")
+    parser.add_argument("--comments-per-post", type=float, default=2.0, help="mean comments per post")
+    parser.add_argument("--likes-per-post", type=float, default=5.0, help="mean likes per post")
+    parser.add_argument("--comment-recognition-rate", type=float, default=0.2, help="share of comments giving points")
+    parser.add_argument("--days", type=int, default=180, help="history spanned by the activity")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="parallel loader processes")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="posts per COPY transaction")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password", default="loadtest-password", help="password of every generated user")
+    args = parser.parse_args()
+
+    options, plans = asyncio.run(prepare(args))
+    started = time.perf_counter()
+    totals: Counter = Counter()
+    # Biggest companies first so the processes finish together
+    jobs = [(plan, options) for plan in sorted(plans, key=lambda plan: plan.posts, reverse=True)]
+    if args.jobs > 1:
+        with multiprocessing.get_context("spawn").Pool(args.jobs) as pool:
+            for done, counts in enumerate(pool.imap_unordered(_load_company_job, jobs), 1):
+                totals += counts
+                print(f"{done}/{len(jobs)} companies loaded")
+    else:
+        for done, job in enumerate(jobs, 1):
+            totals += _load_company_job(job)
+            print(f"{done}/{len(jobs)} companies loaded")
+    asyncio.run(analyze())
+
+    elapsed = time.perf_counter() - started
+    for table, rows in sorted(totals.items()):
+        print(f"{table}: {rows} rows")
+    print(f"{sum(totals.values())} rows in {elapsed:.1f}s ({sum(totals.values()) / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Bulk-invite users into a company from a CSV file.
+
+    python -m app.commands.invite_users --company-id 1 users.csv [--invited-by 7] [--report report.csv]
+
+The CSV needs an ``email,full_name`` header and may add ``role`` (admin or
+member, default member) and ``password`` columns. Users without a password
+get a generated temporary one, listed in the report. Existing emails are
+skipped, so the command can be re-run with the same file.
+"""
+import argparse
+import asyncio
+import csv
+import sys
+import time
+from typing import Optional
+from sqlalchemy import select
+from app.db.session import AsyncSessionLocal, dispose_engine
+from app.models.models import Company
+from app.schemas.schemas import InviteResult
+from app.services import password_hasher
+from app.services.invites import invite_users, parse_invites
+
+
+async def invite(company_id: int, path: str, invited_by: Optional[int], report: Optional[str]) -> None:
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        invites, invalid = parse_invites(handle.read())
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        if not (await db.execute(select(Company.id).where(Company.id == company_id))).scalar_one_or_none():
+            sys.exit(f"Company {company_id} not found")
+        results = await invite_users(db, company_id, invites, invited_by=invited_by)
+    await dispose_engine()
+    password_hasher.shutdown()
+
+    results = sorted(results + invalid, key=lambda r: r.row)
+    created = sum(1 for r in results if r.status == "created")
+    print(f"{created} created, {len(results) - created} skipped in {time.perf_counter() - started:.1f}s")
+
+    out = open(report, "w", newline="") if report else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=list(InviteResult.model_fields))
+        writer.writeheader()
+        writer.writerows(r.model_dump() for r in results)
+    finally:
+        if report:
+            out.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-invite users from a CSV file")
+    parser.add_argument("csv", help="CSV with email,full_name[,role][,password] columns")
+    parser.add_argument("--company-id", type=int, required=True)
+    parser.add_argument("--invited-by", type=int, help="admin user recorded as sender of the initial allocation")
+    parser.add_argument("--report", help="write the per-row report here instead of stdout")
+    args = parser.parse_args()
+    asyncio.run(invite(args.company_id, args.csv, args.invited_by, args.report))
+
+
+if __name__ == "__main__":
+    main()
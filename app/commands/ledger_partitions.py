@@ -0,0 +1,73 @@
+"""
+Maintain the monthly partitions of the points ledger.
+
+    python -m app.commands.ledger_partitions ensure [--months-ahead 3]
+    python -m app.commands.ledger_partitions archive --before 2025-01 [--archive-dir DIR]
+
+``ensure`` creates partitions for the current and upcoming months; the API
+also runs it at startup, so scheduling it daily is enough to never insert
+into a missing partition. ``archive`` exports every partition that ends on
+or before the first day of ``--before`` to ``<dir>/<table>/<YYYY-MM>.jsonl.gz``
+and then detaches and drops it, one partition at a time. Archived
+months stay readable through the points history endpoints.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from app.core.config import get_settings
+from app.db.session import dispose_engine, get_engine
+from app.services import ledger_partitions
+
+
+async def ensure(months_ahead: int) -> None:
+    async with get_engine().begin() as conn:
+        created = await ledger_partitions.ensure_partitions(conn, months_ahead)
+    print(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+    await dispose_engine()
+
+
+async def archive(before: datetime, archive_dir: str) -> None:
+    engine = get_engine()
+    for table in ledger_partitions.LEDGER_TABLES:
+        async with engine.connect() as conn:
+            partitions = await ledger_partitions.list_partitions(conn, table)
+        for partition in partitions:
+            if partition.end is None or partition.end > before:
+                continue
+            # Export on its own connection: the streaming cursor keeps the
+            # partition in use until its transaction ends
+            async with engine.connect() as conn:
+                rows = await ledger_partitions.export_partition(conn, table, partition, archive_dir)
+            async with engine.begin() as conn:
+                await ledger_partitions.drop_partition(conn, table, partition, rows)
+            print(f"{partition.name}: archived {rows} rows")
+    await dispose_engine()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Maintain points ledger partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure_parser = commands.add_parser("ensure", help="create upcoming monthly partitions")
+    ensure_parser.add_argument(
+        "--months-ahead", type=int, default=settings.LEDGER_PARTITION_MONTHS_AHEAD,
+        help="months after the current one to create",
+    )
+
+    archive_parser = commands.add_parser("archive", help="export and drop old partitions")
+    archive_parser.add_argument(
+        "--before", required=True, type=lambda value: datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc),
+        help="archive partitions ending on or before this month (YYYY-MM)",
+    )
+    archive_parser.add_argument("--archive-dir", default=settings.LEDGER_ARCHIVE_DIR)
+
+    args = parser.parse_args()
+    if args.command == "ensure":
+        asyncio.run(ensure(args.months_ahead))
+    else:
+        asyncio.run(archive(args.before, args.archive_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Recompute the trending engagement and hot_score of every post.
+
+    python -m app.commands.rescore_posts [--batch-size 5000] [--pause-ms 0]
+
+Likes, comments and points move a post's score as they happen; this
+batch job recomputes it from the like counters, points and comments,
+which repairs any drift and re-ranks history after the trending weights
+or half-life change. Run it once after deploying the migration that adds
+the column, then on a schedule (daily is plenty). Posts are processed in
+id ranges, one short transaction per batch, and only rows whose score
+changed are written.
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy import func, select
+from app.db.session import dispose_engine, get_engine
+from app.models.models import Post
+from app.services import trending
+
+
+async def rescore(batch_size: int, pause_ms: int) -> None:
+    engine = get_engine()
+    async with engine.connect() as conn:
+        first_id, last_id = (await conn.execute(select(func.min(Post.id), func.max(Post.id)))).one()
+    if first_id is None:
+        print("No posts to rescore")
+        await dispose_engine()
+        return
+
+    started = time.perf_counter()
+    updated = 0
+    for lo in range(first_id, last_id + 1, batch_size):
+        async with engine.begin() as conn:
+            updated += await trending.rescore(conn, Post.id >= lo, Post.id < lo + batch_size)
+        if pause_ms:
+            await asyncio.sleep(pause_ms / 1000)
+    print(f"Rescored {updated} posts in {time.perf_counter() - started:.1f}s")
+    await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute trending scores of posts")
+    parser.add_argument("--batch-size", type=int, default=5000, help="posts per transaction")
+    parser.add_argument("--pause-ms", type=int, default=0, help="sleep between batches to spare live traffic")
+    args = parser.parse_args()
+    asyncio.run(rescore(args.batch_size, args.pause_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Verify the hash chains of the points audit log.
+
+    python -m app.commands.verify_audit_log [--company-id 1 ...] [--batch-size 10000]
+
+Every balance change (recognitions, comment recognitions, admin
+adjustments, direct sets and initial allocations) is recorded in
+``audit_log`` as one entry of its company's chain, whose hash covers the
+entry and the hash before it. This walks the log in chain order with a
+server-side cursor, so millions of entries are checked in constant memory,
+and reports the first broken entry of each company: a gap in the sequence,
+a broken link or an entry that no longer matches its hash. The printed
+head hashes can be kept elsewhere; a later run showing a different head
+for the same entry count means history was rewritten.
+
+Exits with status 1 when a chain is broken.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import List, Optional
+from app.db.session import dispose_engine, get_engine
+from app.services import audit
+
+
+async def verify(company_ids: Optional[List[int]], batch_size: int) -> int:
+    started = time.perf_counter()
+    entries = broken = 0
+    async with get_engine().connect() as conn:
+        async for report in audit.verify_chains(conn, company_ids, batch_size):
+            entries += report.entries
+            status = "ok" if report.error is None else f"BROKEN: {report.error}"
+            print(f"company {report.company_id}: {report.entries} entries, head {report.head_hash} {status}")
+            broken += report.error is not None
+    elapsed = time.perf_counter() - started
+    print(f"Verified {entries} entries in {elapsed:.1f}s ({entries / max(elapsed, 1e-9):.0f}/s), {broken} broken chains")
+    await dispose_engine()
+    return broken
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify the audit log hash chains")
+    parser.add_argument("--company-id", type=int, action="append", dest="company_ids", help="repeatable; default all")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows fetched per round trip")
+    args = parser.parse_args()
+    broken = asyncio.run(verify(args.company_ids, args.batch_size))
+    sys.exit(1 if broken else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Spool every employee's weekly recognition digest for the mailer.
+
+    python -m app.commands.weekly_digests [--week 2026-10-12] [--company-id 1 ...]
+        [--chunk-size 1000] [--outbox-dir DIR]
+
+A digest covers one Monday-to-Monday UTC week (by default the last full
+one): recognitions and points received, the leaderboard position among
+colleagues and the company's most liked posts of the week. Each company
+takes two set-based queries however many members it has, and its digests
+are written as ``<dir>/<week>/company-<id>/chunk-NNNNN.jsonl`` files next
+to a ``checkpoint.json``. Re-running the same week resumes interrupted
+companies after their last written chunk and skips finished ones.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import select
+from app.core.config import get_settings
+from app.core.constants import DIGEST_CHUNK_SIZE
+from app.db.session import dispose_engine, get_engine
+from app.models.models import Company
+from app.services import digests
+
+
+async def spool(week: datetime, company_ids: Optional[List[int]], chunk_size: int, outbox_dir: str) -> None:
+    engine = get_engine()
+    if not company_ids:
+        async with engine.connect() as conn:
+            company_ids = list((await conn.execute(select(Company.id).order_by(Company.id))).scalars())
+
+    total = 0
+    for company_id in company_ids:
+        started = time.perf_counter()
+        previous = digests.read_checkpoint(digests.company_dir(outbox_dir, week, company_id))
+        if previous.complete:
+            print(f"company {company_id}: already spooled ({previous.digests} digests)")
+            continue
+        async with engine.connect() as conn:
+            checkpoint = await digests.write_company_digests(conn, company_id, week, outbox_dir, chunk_size)
+        resumed = f", resumed after chunk {previous.chunks}" if previous.chunks else ""
+        print(
+            f"company {company_id}: {checkpoint.digests - previous.digests} digests in "
+            f"{time.perf_counter() - started:.1f}s{resumed}"
+        )
+        total += checkpoint.digests - previous.digests
+    print(f"{total} digests for the week of {week.date()} in {outbox_dir}")
+    await dispose_engine()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Spool weekly recognition digests")
+    parser.add_argument(
+        "--week", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+        help="any day of the week to digest (default: last full week)",
+    )
+    parser.add_argument("--company-id", type=int, action="append", dest="company_ids", help="repeatable; default all")
+    parser.add_argument("--chunk-size", type=int, default=DIGEST_CHUNK_SIZE, help="digests per chunk file")
+    parser.add_argument("--outbox-dir", default=settings.DIGEST_OUTBOX_DIR)
+    args = parser.parse_args()
+
+    day = args.week or datetime.now(timezone.utc).date() - timedelta(days=7)
+    asyncio.run(spool(digests.week_start(day), args.company_ids, args.chunk_size, args.outbox_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, List
 from functools import lru_cache
+from app.core.constants import API_V1_STR, DB_CONNECTION_POOL_SIZE, DB_MAX_OVERFLOW, DBConnectionMode
 import os
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Recognition Platform"
     VERSION: str = "1.0.0"
-    API_V1_STR: str = "/api/v1"
+    API_V1_STR: str = API_V1_STR
     
     # Database
     DATABASE_URL: str
@@ -33,7 +34,78 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Self-contained tokens carry company and role claims that read endpoints
+    # trust without loading the user; they are kept short-lived and renewed
+    # through the refresh flow.
+    SELF_CONTAINED_TOKENS: bool = False
+    SELF_CONTAINED_TOKEN_EXPIRE_MINUTES: int = 5
+    # How often each worker reloads the token revocation list
+    REVOCATION_SYNC_SECONDS: int = 15
+    # Processes used for bulk password hashing (0 = one per CPU)
+    PASSWORD_HASH_WORKERS: int = 0
+    # bcrypt cost is calibrated at startup to the highest value hashing
+    # within this budget; BCRYPT_ROUNDS pins it instead
+    PASSWORD_HASH_BUDGET_MS: int = 250
+    BCRYPT_ROUNDS: Optional[int] = None
     
+    # Connection budget shared by all workers of one server; app.server
+    # splits it into per-worker DB_POOL_SIZE / DB_POOL_MAX_OVERFLOW
+    DB_MAX_CONNECTIONS: int = DB_CONNECTION_POOL_SIZE + DB_MAX_OVERFLOW
+    DB_POOL_SIZE: int = DB_CONNECTION_POOL_SIZE
+    DB_POOL_MAX_OVERFLOW: int = DB_MAX_OVERFLOW
+
+    # TLS to the database; turn off for a local Postgres without it
+    DB_SSL: bool = True
+
+    # "direct" keeps up to DB_STATEMENT_CACHE_SIZE prepared statements per
+    # connection; "pgbouncer" is safe behind a transaction-pooling PgBouncer
+    # and prepares every statement afresh under a unique name
+    DB_CONNECTION_MODE: DBConnectionMode = DBConnectionMode.DIRECT
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    # Number of pooled connections opened before a worker reports ready
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+
+    # Likes - opt-in write-coalescing buffer for high-traffic posts
+    LIKE_BUFFER_ENABLED: bool = False
+    LIKE_BUFFER_FLUSH_MS: int = 5
+    LIKE_BUFFER_MAX_BATCH: int = 500
+    # Buffered likes whose flushes keep failing are dropped after this long
+    LIKE_BUFFER_MAX_RETRY_SECONDS: int = 60
+
+    # Points ledger - monthly partitions created ahead of time, old ones
+    # exported here as gzipped JSON lines by app.commands.ledger_partitions
+    LEDGER_PARTITION_MONTHS_AHEAD: int = 3
+    LEDGER_ARCHIVE_DIR: str = "archive/ledger"
+
+    # Outbox - post-commit side effects drained by in-process workers
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_MS: int = 500
+    OUTBOX_MAX_ATTEMPTS: int = 8
+
+    # Roster cache - per-process company member lists behind user search and
+    # recipient checks; other workers' changes show up after the TTL
+    ROSTER_CACHE_TTL_SECONDS: int = 60
+    ROSTER_CACHE_MAX_COMPANIES: int = 1000
+
+    # Attachments - content-addressed blobs kept under BLOB_STORE_DIR;
+    # uploads are streamed there and refused beyond ATTACHMENT_MAX_BYTES
+    BLOB_STORE_DIR: str = "storage/blobs"
+    ATTACHMENT_MAX_BYTES: int = 25 * 1024 * 1024
+    # Processes rendering image thumbnails
+    THUMBNAIL_WORKERS: int = 2
+
+    # Balance snapshots - app.commands.balance_snapshots compact keeps every
+    # snapshot of the last BALANCE_SNAPSHOT_KEEP_DAYS and the first of each
+    # month before that
+    BALANCE_SNAPSHOT_KEEP_DAYS: int = 35
+
+    # Weekly digests - chunk files written here by app.commands.weekly_digests
+    # for the mailer to pick up
+    DIGEST_OUTBOX_DIR: str = "outbox/digests"
+
     # CORS - Allow all origins
     ALLOW_ALL_ORIGINS: bool = True
 
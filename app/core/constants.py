@@ -1,5 +1,7 @@
 from enum import Enum
 
+API_V1_STR = "/api/v1"
+
 # User related constants
 INITIAL_GIVEABLE_POINTS = 50
 INITIAL_REDEEMABLE_POINTS = 0
@@ -14,6 +16,13 @@ class TransactionType(str, Enum):
     INITIAL_ALLOCATION = "initial_allocation"
     COMMENT_RECOGNITION = "comment_recognition"
 
+class AuditAction(str, Enum):
+    RECOGNITION = "recognition"
+    COMMENT_RECOGNITION = "comment_recognition"
+    ADMIN_ADJUSTMENT = "admin_adjustment"
+    GIVEABLE_POINTS_SET = "giveable_points_set"
+    INITIAL_ALLOCATION = "initial_allocation"
+
 # Authentication constants
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 ALGORITHM = "HS256"
@@ -25,12 +34,61 @@ RATE_LIMIT_PER_MINUTE = 100
 # Performance constants
 MAX_CONCURRENT_USERS = 1000
 PAGE_SIZE = 20
+MAX_BATCH_IDS = 100
+USER_SEARCH_LIMIT = 10
+MAX_USER_SEARCH_LIMIT = 50
+FEED_COMMENTS_PER_POST = 3
+MAX_FEED_COMMENTS_PER_POST = 20
+
+# Trending ("top") feed: engagement weights and how fast it decays.
+# Changing them needs app.commands.rescore_posts to re-rank existing posts.
+TRENDING_LIKE_WEIGHT = 1
+TRENDING_COMMENT_WEIGHT = 3
+TRENDING_POINT_WEIGHT = 1
+TRENDING_HALF_LIFE_HOURS = 24
+
+class PostSort(str, Enum):
+    RECENT = "recent"
+    TOP = "top"
 
 # Database constants
 DB_CONNECTION_POOL_SIZE = 20
 DB_MAX_OVERFLOW = 10
 DB_POOL_TIMEOUT = 30
 
+class DBConnectionMode(str, Enum):
+    DIRECT = "direct"
+    PGBOUNCER = "pgbouncer"
+
+# Advisory lock keys (Postgres), one per purpose; keep them distinct
+# Transaction-scoped, so concurrent workers don't race on partition DDL
+PARTITION_LOCK_KEY = 7_340_211
+# Transaction-scoped, with the company id as second key, so one company's
+# audit entries are chained by one writer at a time
+AUDIT_CHAIN_LOCK_KEY = 7_340_212
+# Transaction-scoped, around synthetic data sequence block reservations
+ID_RESERVATION_LOCK_KEY = 7_340_213
+
+# Bulk invite constants
+MAX_INVITES_PER_REQUEST = 5000
+INVITE_INSERT_CHUNK = 1000
+
+# Attachment constants
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+MAX_ATTACHMENTS_PER_POST = 10
+THUMBNAIL_SIZE = 320
+# Larger images are stored but not thumbnailed (decompression-bomb guard)
+THUMBNAIL_MAX_PIXELS = 40_000_000
+
+# Balance snapshot constants
+# Snapshots only cover ledger rows at least this old, so recognitions still
+# being written when one is taken are not left out of it
+SNAPSHOT_SETTLE_SECONDS = 300
+
+# Weekly digest constants
+DIGEST_CHUNK_SIZE = 1000
+DIGEST_TOP_POSTS = 5
+
 # Points system constants
 MIN_POINTS_PER_RECOGNITION = 1
 MAX_POINTS_PER_RECOGNITION = 100
@@ -0,0 +1,64 @@
+from threading import Lock
+from typing import Any, Dict
+
+
+class Summary:
+    """
+    Running count/total/min/max/last of an observed value (e.g. a latency in ms).
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float) -> None:
+        self.min = value if self.count == 0 else min(self.min, value)
+        self.max = max(self.max, value)
+        self.count += 1
+        self.total += value
+        self.last = value
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+_lock = Lock()
+_counters: Dict[str, int] = {}
+_gauges: Dict[str, float] = {}
+_summaries: Dict[str, Summary] = {}
+
+
+def increment(name: str, value: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    with _lock:
+        _summaries.setdefault(name, Summary()).observe(value)
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Point-in-time copy of all metrics recorded by this process.
+    """
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "summaries": {name: s.snapshot() for name, s in _summaries.items()},
+        }
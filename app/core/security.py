@@ -1,31 +1,92 @@
+import time
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Dict, Optional, Tuple, Union
+from uuid import uuid4
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import get_settings
 
-settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    
+# bcrypt cost bounds for startup calibration; the cost doubles per round
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+def _encode_token(subject: Union[str, Any], expire: datetime, token_type: str, claims: Optional[Dict[str, Any]] = None) -> str:
     # JWT standard uses timestamps in seconds
     to_encode = {
         "exp": expire,  # JWT library will handle datetime conversion
         "iat": datetime.utcnow(),  # Issued at
-        "sub": str(subject)  # Always convert subject to string
+        "sub": str(subject),  # Always convert subject to string
+        "jti": uuid4().hex,  # Token id, used for revocation
+        "type": token_type,
     }
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
+    if claims:
+        to_encode.update(claims)
+    return jwt.encode(to_encode, get_settings().SECRET_KEY, algorithm="HS256")
+
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    claims: Optional[Dict[str, Any]] = None,
+) -> str:
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(
+            minutes=get_settings().ACCESS_TOKEN_EXPIRE_MINUTES
+        )
+    return _encode_token(subject, expire, ACCESS_TOKEN_TYPE, claims)
+
+def create_refresh_token(subject: Union[str, Any]) -> str:
+    expire = datetime.utcnow() + timedelta(days=get_settings().REFRESH_TOKEN_EXPIRE_DAYS)
+    return _encode_token(subject, expire, REFRESH_TOKEN_TYPE)
+
+def decode_token(token: str) -> Dict[str, Any]:
+    return jwt.decode(token, get_settings().SECRET_KEY, algorithms=["HS256"])
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, when its hash is below the configured cost,
+    return a fresh hash to store in its place.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def bcrypt_rounds() -> int:
+    return pwd_context.handler("bcrypt").default_rounds
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    # New hashes use ``rounds``; hashes below it are upgraded on login
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+def _time_hash(rounds: int, samples: int = 3) -> float:
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash("calibration-password")
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def calibrate_bcrypt_rounds(budget_ms: float) -> Tuple[int, float]:
+    """
+    Pick the highest bcrypt cost whose hash fits ``budget_ms`` on this host
+    (never below BCRYPT_MIN_ROUNDS). Returns the cost and its measured hash
+    time in milliseconds.
+    """
+    base_ms = _time_hash(BCRYPT_MIN_ROUNDS)
+    rounds = BCRYPT_MIN_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and base_ms * 2 ** (rounds + 1 - BCRYPT_MIN_ROUNDS) <= budget_ms:
+        rounds += 1
+    if rounds == BCRYPT_MIN_ROUNDS:
+        return rounds, base_ms
+    return rounds, _time_hash(rounds, samples=1)
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
@@ -1,44 +1,129 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import ssl
+import uuid
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import get_settings
-from app.core.constants import DB_CONNECTION_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
-import ssl
+from app.core.constants import DB_POOL_TIMEOUT, DBConnectionMode
+
+# The engine and session factory are created on first use rather than at
+# import, so importing models or CLI modules needs no database settings.
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[sessionmaker] = None
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4().hex}__"
 
-settings = get_settings()
-
-# Create SSL context for secure database connections
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
-
-# Configure engine with SSL and other production settings
-engine = create_async_engine(
-    settings.async_database_url,
-    pool_size=DB_CONNECTION_POOL_SIZE,
-    max_overflow=DB_MAX_OVERFLOW,
-    pool_timeout=DB_POOL_TIMEOUT,
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=300,    # Recycle connections every 5 minutes
-    echo=False,
-    connect_args={
-        "ssl": ssl_context,
-        "server_settings": {
-            "application_name": "recognition_platform"
+def statement_cache_args(mode: DBConnectionMode, cache_size: int) -> Dict[str, Any]:
+    """
+    asyncpg connect arguments controlling prepared statements.
+
+    Direct connections keep up to ``cache_size`` prepared statements each
+    (SQLAlchemy's cache for ORM/Core statements, asyncpg's for its own
+    introspection queries), so repeated queries skip parse and plan.
+
+    Behind a transaction-pooling PgBouncer consecutive transactions may run
+    on different server connections, where a cached statement does not
+    exist, and several clients share one server connection, where
+    asyncpg's per-connection statement names collide. There nothing is
+    cached across transactions and every statement gets a unique name;
+    SQL compilation is still cached in the process.
+    """
+    if mode == DBConnectionMode.PGBOUNCER:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _unique_statement_name,
         }
+    return {
+        "statement_cache_size": cache_size,
+        "prepared_statement_cache_size": cache_size,
     }
-)
 
-AsyncSessionLocal = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+def get_engine() -> AsyncEngine:
+    global _engine, _session_factory
+    if _engine is None:
+        settings = get_settings()
+
+        # Create SSL context for secure database connections
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+
+        # Configure engine with SSL and other production settings
+        _engine = create_async_engine(
+            settings.async_database_url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,  # Enable connection health checks
+            pool_recycle=300,    # Recycle connections every 5 minutes
+            echo=False,
+            connect_args={
+                "ssl": ssl_context if settings.DB_SSL else False,
+                "server_settings": {
+                    "application_name": "recognition_platform"
+                },
+                **statement_cache_args(settings.DB_CONNECTION_MODE, settings.DB_STATEMENT_CACHE_SIZE),
+            }
+        )
+        _session_factory = sessionmaker(
+            _engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return _engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_engine()
+    return _session_factory()
+
+async def warm_up_pool(connections: int) -> None:
+    """
+    Open ``connections`` pooled connections at once so the first requests
+    don't pay for TCP/TLS/auth setup.
+    """
+    connections = min(connections, get_settings().DB_POOL_SIZE)
+    if connections <= 0:
+        return
+    engine = get_engine()
+    # Hold every connection until all are open, otherwise the pool would
+    # just hand the same one out again
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(connections))
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+
+async def ping(timeout: float = 2.0) -> bool:
+    """
+    Readiness probe: can a pooled connection run a trivial query in time?
+    """
+    async def _select_one() -> None:
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(_select_one(), timeout)
+    except Exception:
+        return False
+    return True
+
+async def dispose_engine() -> None:
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _session_factory = None
 
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
@@ -1,23 +1,131 @@
-from fastapi import FastAPI
+import time
+
+# Taken before the heavy imports below so startup metrics cover them
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics
 from app.core.config import get_settings
+from app.core.security import bcrypt_rounds, calibrate_bcrypt_rounds, set_bcrypt_rounds
 from app.api.v1.api import api_router
+from app.db.session import AsyncSessionLocal, dispose_engine, get_engine, ping, warm_up_pool
+from app.services.ledger_partitions import ensure_partitions
+from app.services import password_hasher, thumbnails
+from app.services.like_buffer import like_buffer
+from app.services.outbox import outbox_worker
+from app.services.roster import roster_cache
+from app.services.token_revocation import revocation_list
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    settings = get_settings()
+    metrics.set_gauge("startup.import_ms", (started - _import_started) * 1000)
+
+    # Fit the bcrypt cost to this host's speed (app.server calibrates once
+    # for all its workers and passes BCRYPT_ROUNDS)
+    if settings.BCRYPT_ROUNDS:
+        set_bcrypt_rounds(settings.BCRYPT_ROUNDS)
+    else:
+        rounds, hash_ms = await run_in_threadpool(calibrate_bcrypt_rounds, settings.PASSWORD_HASH_BUDGET_MS)
+        set_bcrypt_rounds(rounds)
+        metrics.set_gauge("auth.bcrypt_hash_ms", hash_ms)
+    metrics.set_gauge("auth.bcrypt_rounds", bcrypt_rounds())
+
+    # Open pooled connections before the worker reports ready
+    warmup_started = time.perf_counter()
+    await warm_up_pool(settings.DB_POOL_WARMUP_CONNECTIONS)
+    metrics.set_gauge("startup.pool_warmup_ms", (time.perf_counter() - warmup_started) * 1000)
+
+    # Make sure this month's ledger partitions exist before taking writes
+    async with get_engine().begin() as conn:
+        await ensure_partitions(conn, settings.LEDGER_PARTITION_MONTHS_AHEAD)
+
+    await revocation_list.start(AsyncSessionLocal)
+    roster_cache.ttl = settings.ROSTER_CACHE_TTL_SECONDS
+    roster_cache.max_companies = settings.ROSTER_CACHE_MAX_COMPANIES
+    if settings.LIKE_BUFFER_ENABLED:
+        like_buffer.flush_interval = settings.LIKE_BUFFER_FLUSH_MS / 1000
+        like_buffer.max_batch_size = settings.LIKE_BUFFER_MAX_BATCH
+        like_buffer.max_retry_seconds = settings.LIKE_BUFFER_MAX_RETRY_SECONDS
+        await like_buffer.start(AsyncSessionLocal)
+
+    if settings.OUTBOX_WORKERS > 0:
+        outbox_worker.workers = settings.OUTBOX_WORKERS
+        outbox_worker.batch_size = settings.OUTBOX_BATCH_SIZE
+        outbox_worker.poll_interval = settings.OUTBOX_POLL_MS / 1000
+        outbox_worker.max_attempts = settings.OUTBOX_MAX_ATTEMPTS
+        await outbox_worker.start(AsyncSessionLocal)
+
+    app.state.ready = await ping()
+    metrics.set_gauge("startup.lifespan_ms", (time.perf_counter() - started) * 1000)
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        # Write out buffered likes before the worker exits
+        await like_buffer.stop()
+        await outbox_worker.stop()
+        await revocation_list.stop()
+        password_hasher.shutdown()
+        thumbnails.shutdown()
+        await dispose_engine()
+
+_first_request_seen = False
+
+async def record_first_request(request: Request, call_next):
+    global _first_request_seen
+    if not _first_request_seen:
+        _first_request_seen = True
+        metrics.set_gauge(
+            "startup.import_to_first_request_ms",
+            (time.perf_counter() - _import_started) * 1000,
+        )
+    return await call_next(request)
+
+async def liveness() -> dict:
+    return {"status": "ok"}
+
+async def readiness(request: Request, response: Response) -> dict:
+    if not request.app.state.ready or not await ping():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "unavailable"}
+    return {"status": "ready"}
 
-settings = get_settings()
+def create_app() -> FastAPI:
+    settings = get_settings()
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        version=settings.VERSION,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
+    )
+    app.state.ready = False
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
+    # Set CORS middleware to allow all origins
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allows all origins
+        allow_credentials=True,
+        allow_methods=["*"],  # Allows all methods
+        allow_headers=["*"],  # Allows all headers
+        expose_headers=["X-Next-Cursor"],  # Keyset cursor of the points history pages
+    )
+    app.middleware("http")(record_first_request)
 
-# Set CORS middleware to allow all origins
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"],  # Allows all headers
-)
+    app.add_api_route("/health/live", liveness, methods=["GET"], include_in_schema=False)
+    app.add_api_route("/health/ready", readiness, methods=["GET"], include_in_schema=False)
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+    return app
 
-app.include_router(api_router, prefix=settings.API_V1_STR) 
\ No newline at end of file
+def __getattr__(name: str):
+    # ``app`` is built on first access (uvicorn's app.main:app, imports of
+    # it), so importing this module doesn't need a configured environment
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Text, DateTime, Float, CheckConstraint, UniqueConstraint, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.models.base import Base, TimestampMixin
 from app.core.constants import UserRole, TransactionType, INITIAL_GIVEABLE_POINTS, INITIAL_REDEEMABLE_POINTS
 
@@ -8,8 +10,14 @@ class Company(Base, TimestampMixin):
 
     id = Column(Integer, primary_key=True)
     name = Column(Text, nullable=False)
+    # Signup upsert key, computed in SQL; see auth.normalize_company_name
+    normalized_name = Column(Text)
     users = relationship("User", back_populates="company")
 
+    __table_args__ = (
+        UniqueConstraint("normalized_name", name="uq_companies_normalized_name"),
+    )
+
 class User(Base, TimestampMixin):
     __tablename__ = "users"
 
@@ -32,21 +40,31 @@ class User(Base, TimestampMixin):
         CheckConstraint(f"role IN ('admin', 'member')", name="valid_role"),
         CheckConstraint("giveable_points >= 0", name="positive_giveable_points"),
         CheckConstraint("redeemable_points >= 0", name="positive_redeemable_points"),
+        # Company rosters and member lists only read active users
+        Index("ix_users_company_id_active", "company_id", postgresql_where=text("deleted_at IS NULL")),
     )
 
 class PointsTransaction(Base, TimestampMixin):
     __tablename__ = "points_transactions"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     sender_id = Column(Integer, ForeignKey("users.id"))
+    # Denormalized from the sender so tenant reads skip the users join
+    company_id = Column(Integer, ForeignKey("companies.id"))
     transaction_type = Column(String(20), nullable=False)
     post_id = Column(Integer, ForeignKey("posts.id"))
     comment_id = Column(Integer, ForeignKey("comments.id"))
     points = Column(Integer, nullable=False)
     admin_notes = Column(Text)
+    # Range partition key (monthly), hence part of the primary key
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, primary_key=True)
 
     sender = relationship("User", back_populates="sent_transactions", foreign_keys=[sender_id])
-    recipients = relationship("PointsRecipient", back_populates="transaction")
+    recipients = relationship(
+        "PointsRecipient",
+        back_populates="transaction",
+        primaryjoin="PointsTransaction.id == foreign(PointsRecipient.transaction_id)",
+    )
     post = relationship("Post", back_populates="transactions")
     comment = relationship("Comment", back_populates="transactions")
 
@@ -56,21 +74,47 @@ class PointsTransaction(Base, TimestampMixin):
             name="valid_transaction_type"
         ),
         CheckConstraint("points > 0", name="positive_points"),
+        Index("ix_points_transactions_sender_id_created_at", "sender_id", text("created_at DESC"), text("id DESC")),
+        Index("ix_points_transactions_post_id", "post_id"),
+        Index("ix_points_transactions_company_id_created_at", "company_id", text("created_at DESC"), "id"),
+        Index(
+            "ix_points_transactions_company_id_type_created_at",
+            "company_id", "transaction_type", text("created_at DESC"), text("id DESC"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 class PointsRecipient(Base, TimestampMixin):
     __tablename__ = "points_recipients"
 
-    id = Column(Integer, primary_key=True)
-    transaction_id = Column(Integer, ForeignKey("points_transactions.id"))
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # No foreign key: the partitioned points_transactions is only unique on (id, created_at)
+    transaction_id = Column(Integer)
     recipient_id = Column(Integer, ForeignKey("users.id"))
     points_amount = Column(Integer, nullable=False)
+    # Writers set it to the transaction's created_at, so both rows land in
+    # the same monthly partition
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, primary_key=True)
 
-    transaction = relationship("PointsTransaction", back_populates="recipients")
+    transaction = relationship(
+        "PointsTransaction",
+        back_populates="recipients",
+        primaryjoin="foreign(PointsRecipient.transaction_id) == PointsTransaction.id",
+    )
     recipient = relationship("User")
 
     __table_args__ = (
         CheckConstraint("points_amount > 0", name="positive_points_amount"),
+        Index(
+            "ix_points_recipients_recipient_id_created_at",
+            "recipient_id", text("created_at DESC"), text("transaction_id DESC"),
+        ),
+        Index(
+            "ix_points_recipients_transaction_id_created_at",
+            "transaction_id", "created_at",
+            postgresql_include=["recipient_id", "points_amount"],
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 class Post(Base, TimestampMixin):
@@ -78,8 +122,15 @@ class Post(Base, TimestampMixin):
 
     id = Column(Integer, primary_key=True)
     author_id = Column(Integer, ForeignKey("users.id"))
+    # Denormalized from the author so tenant reads skip the users join
+    company_id = Column(Integer, ForeignKey("companies.id"))
     content = Column(Text, nullable=False)
     total_points = Column(Integer, nullable=False)
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Weighted likes, comments and points, and the time-decayed rank built
+    # from them (see app.services.trending); both move with each interaction
+    engagement = Column(Integer, nullable=False, default=0, server_default="0")
+    hot_score = Column(Float, nullable=False, default=0, server_default="0")
 
     author = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post")
@@ -88,6 +139,10 @@ class Post(Base, TimestampMixin):
 
     __table_args__ = (
         CheckConstraint("total_points > 0", name="positive_total_points"),
+        CheckConstraint("like_count >= 0", name="non_negative_like_count"),
+        Index("ix_posts_author_id", "author_id"),
+        Index("ix_posts_company_id_created_at", "company_id", text("created_at DESC"), "id"),
+        Index("ix_posts_company_id_hot_score", "company_id", text("hot_score DESC"), text("id DESC")),
     )
 
 class Comment(Base, TimestampMixin):
@@ -96,8 +151,10 @@ class Comment(Base, TimestampMixin):
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey("posts.id"))
     author_id = Column(Integer, ForeignKey("users.id"))
+    company_id = Column(Integer, ForeignKey("companies.id"))
     content = Column(Text, nullable=False)
     total_points = Column(Integer, default=0)
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
@@ -106,6 +163,10 @@ class Comment(Base, TimestampMixin):
 
     __table_args__ = (
         CheckConstraint("total_points >= 0", name="non_negative_total_points"),
+        CheckConstraint("like_count >= 0", name="non_negative_comment_like_count"),
+        Index("ix_comments_author_id", "author_id"),
+        Index("ix_comments_company_id_created_at", "company_id", text("created_at DESC"), "id"),
+        Index("ix_comments_post_id_created_at", "post_id", text("created_at DESC"), text("id DESC")),
     )
 
 class PostLike(Base, TimestampMixin):
@@ -114,6 +175,7 @@ class PostLike(Base, TimestampMixin):
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey("posts.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
+    company_id = Column(Integer, ForeignKey("companies.id"))
 
     post = relationship("Post", back_populates="likes")
     user = relationship("User")
@@ -128,10 +190,116 @@ class CommentLike(Base, TimestampMixin):
     id = Column(Integer, primary_key=True)
     comment_id = Column(Integer, ForeignKey("comments.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
+    company_id = Column(Integer, ForeignKey("companies.id"))
 
     comment = relationship("Comment", back_populates="likes")
     user = relationship("User")
 
     __table_args__ = (
         UniqueConstraint("comment_id", "user_id", name="unique_comment_like"),
-    ) 
\ No newline at end of file
+    )
+
+class UserStats(Base, TimestampMixin):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    points_given = Column(Integer, nullable=False, default=0, server_default="0")
+    points_received = Column(Integer, nullable=False, default=0, server_default="0")
+    posts_authored = Column(Integer, nullable=False, default=0, server_default="0")
+    recognitions_received = Column(Integer, nullable=False, default=0, server_default="0")
+    likes_received = Column(Integer, nullable=False, default=0, server_default="0")
+
+    user = relationship("User")
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("jti IS NOT NULL OR user_id IS NOT NULL", name="revocation_target"),
+    )
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Next attempt; NULL once the event has exhausted its retries
+    available_at = Column(DateTime(timezone=True), server_default=func.now())
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text)
+
+    __table_args__ = (
+        Index("ix_outbox_events_available_at", "available_at", "id", postgresql_where=text("available_at IS NOT NULL")),
+    )
+
+
+class Attachment(Base, TimestampMixin):
+    __tablename__ = "attachments"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    uploader_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Set when a post is created with the attachment
+    post_id = Column(Integer, ForeignKey("posts.id"))
+    filename = Column(Text, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    # Blob store names of the content and of its thumbnail (images only)
+    sha256 = Column(String(64), nullable=False)
+    thumbnail_sha256 = Column(String(64))
+
+    __table_args__ = (
+        Index("ix_attachments_post_id", "post_id", postgresql_where=text("post_id IS NOT NULL")),
+        Index("ix_attachments_sha256", "sha256"),
+    )
+
+class AuditEntry(Base):
+    __tablename__ = "audit_log"
+
+    id = Column(BigInteger, primary_key=True)
+    # No foreign keys: entries outlive anything they mention
+    company_id = Column(Integer, nullable=False)
+    # Position in the company's hash chain, from 1
+    seq = Column(BigInteger, nullable=False)
+    action = Column(String(30), nullable=False)
+    actor_id = Column(Integer)
+    # [user_id, column, delta] for every balance the action moved
+    changes = Column(JSONB, nullable=False)
+    details = Column(JSONB, nullable=False)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    prev_hash = Column(String(64), nullable=False)
+    hash = Column(String(64), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("company_id", "seq", name="uq_audit_log_company_id_seq"),
+    )
+
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    # Ledger time the balances are as of
+    taken_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("company_id", "taken_at", name="uq_balance_snapshots_company_id_taken_at"),
+    )
+
+class BalanceSnapshotEntry(Base):
+    __tablename__ = "balance_snapshot_entries"
+
+    snapshot_id = Column(Integer, ForeignKey("balance_snapshots.id", ondelete="CASCADE"), primary_key=True)
+    # No foreign key, so users can be deleted without touching history
+    user_id = Column(Integer, primary_key=True)
+    redeemable_points = Column(Integer, nullable=False)
@@ -2,7 +2,7 @@ from pydantic import BaseModel, EmailStr, constr, conint, Field
 from typing import Optional, List
 from datetime import datetime
 from .base import BaseDBModel, TimestampModel
-from app.core.constants import UserRole, TransactionType, MAX_POST_LENGTH, MAX_COMMENT_LENGTH
+from app.core.constants import UserRole, TransactionType, MAX_POST_LENGTH, MAX_COMMENT_LENGTH, MAX_ATTACHMENTS_PER_POST
 
 # User schemas
 class UserBase(BaseModel):
@@ -29,6 +29,32 @@ class UserInDB(UserBase, BaseDBModel, TimestampModel):
 class User(UserInDB):
     pass
 
+class UserStats(BaseModel):
+    user_id: int
+    points_given: int = 0
+    points_received: int = 0
+    posts_authored: int = 0
+    recognitions_received: int = 0
+    likes_received: int = 0
+
+class UserInvite(UserBase):
+    full_name: constr(strip_whitespace=True, min_length=1)
+    role: UserRole = UserRole.MEMBER
+    password: Optional[constr(min_length=8)] = None
+
+class InviteResult(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str
+    user_id: Optional[int] = None
+    temporary_password: Optional[str] = None
+    detail: Optional[str] = None
+
+class InviteReport(BaseModel):
+    created: int
+    skipped: int
+    results: List[InviteResult]
+
 # Company schemas
 class CompanyBase(BaseModel):
     name: str
@@ -50,19 +76,38 @@ class TransactionBase(BaseModel):
 
 class PostTransactionCreate(TransactionBase):
     content: constr(max_length=MAX_POST_LENGTH)
+    # Uploaded through /attachments and not yet on a post
+    attachment_ids: List[int] = Field(default_factory=list, max_length=MAX_ATTACHMENTS_PER_POST)
 
 class CommentTransactionCreate(TransactionBase):
     content: constr(max_length=MAX_COMMENT_LENGTH)
     post_id: int
 
+class TransactionRecipient(BaseModel):
+    user_id: int
+    full_name: Optional[str] = None
+    points: int
+
 class Transaction(BaseDBModel, TimestampModel):
     id: int
-    sender_id: int
+    sender_id: Optional[int] = None
     transaction_type: TransactionType
     points: int
     post_id: Optional[int] = None
     comment_id: Optional[int] = None
     admin_notes: Optional[str] = None
+    recipients: List[TransactionRecipient] = Field(default_factory=list)
+
+class UserBalanceAsOf(BaseModel):
+    user_id: int
+    full_name: str
+    redeemable_points: int
+
+class CompanyBalancesAsOf(BaseModel):
+    as_of: datetime
+    # Snapshot the ledger was replayed from (None: from the beginning)
+    snapshot_taken_at: Optional[datetime] = None
+    balances: List[UserBalanceAsOf]
 
 # Post schemas
 class PostBase(BaseModel):
@@ -92,6 +137,42 @@ class Comment(CommentBase, BaseDBModel, TimestampModel):
     total_points: int
     like_count: int = Field(default=0)
 
+# Attachment schemas
+class Attachment(BaseDBModel, TimestampModel):
+    id: int
+    post_id: Optional[int] = None
+    uploader_id: int
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    thumbnail_sha256: Optional[str] = None
+
+# Feed schemas
+class UserSearchResult(BaseModel):
+    id: int
+    full_name: str
+    email: str
+
+class FeedUser(BaseDBModel):
+    id: int
+    full_name: str
+
+class FeedRecipient(BaseModel):
+    user_id: int
+    full_name: str
+    points: int
+
+class FeedComment(Comment):
+    author: FeedUser
+
+class FeedPost(Post):
+    author: FeedUser
+    recipients: List[FeedRecipient] = Field(default_factory=list)
+    liked_by_me: bool = False
+    latest_comments: List[FeedComment] = Field(default_factory=list)
+    attachments: List[Attachment] = Field(default_factory=list)
+
 # Like schemas
 class LikeCreate(BaseModel):
     pass
@@ -104,9 +185,23 @@ class Like(BaseDBModel, TimestampModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 class TokenPayload(BaseModel):
     sub: str  # JWT subject (user ID) as string
     exp: datetime  # JWT expiration time
     iat: datetime  # Token issued at time
+    jti: Optional[str] = None  # Token id, used for revocation
+    type: str = "access"  # "access" or "refresh"
+    cid: Optional[int] = None  # Company ID claim (self-contained tokens)
+    role: Optional[UserRole] = None  # Role claim (self-contained tokens)
+
+# Authenticated caller as far as tenant and role checks need to know
+class Principal(BaseModel):
+    id: int
+    company_id: int
+    role: UserRole
   
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Production entry point running the API in several worker processes.
+
+    python -m app.server [--workers N] [--port PORT]
+
+Workers default to WEB_CONCURRENCY or the CPU count. Send SIGHUP to the
+master process for a graceful rolling restart: new workers are started
+before old ones drain and exit, so for a while twice as many workers hold
+connections. The DB_MAX_CONNECTIONS budget is split between twice the
+worker count, keeping the whole server under the database's connection
+limit during the overlap too; more workers than DB_MAX_CONNECTIONS // 2
+would need more than that, so the worker count is capped there. The
+bcrypt cost is calibrated once here and handed to the workers as
+BCRYPT_ROUNDS.
+"""
+import argparse
+import logging
+import os
+from typing import Any, Dict, Tuple
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from app.core.config import get_settings
+from app.core.security import calibrate_bcrypt_rounds
+
+logger = logging.getLogger(__name__)
+
+class Worker(UvicornWorker):
+    # "auto" picks uvloop and httptools when they are installed
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def capped_workers(workers: int) -> int:
+    """
+    ``workers`` limited to what the connection budget can serve with at
+    least one connection per worker during a rolling restart.
+    """
+    limit = max(1, get_settings().DB_MAX_CONNECTIONS // 2)
+    if workers > limit:
+        logger.warning(
+            "Running %d workers instead of %d: DB_MAX_CONNECTIONS allows one connection per worker "
+            "for at most %d workers across a rolling restart", limit, workers, limit,
+        )
+        return limit
+    return workers
+
+
+def pool_per_worker(workers: int) -> Tuple[int, int]:
+    """
+    Split the connection budget into (pool_size, max_overflow) per worker,
+    keeping the configured ratio between steady and overflow connections.
+    The budget covers the old and new workers of a rolling restart at once.
+    """
+    settings = get_settings()
+    per_worker = max(1, settings.DB_MAX_CONNECTIONS // (2 * workers))
+    steady_share = settings.DB_POOL_SIZE / (settings.DB_POOL_SIZE + settings.DB_POOL_MAX_OVERFLOW)
+    pool_size = max(1, int(per_worker * steady_share))
+    return pool_size, max(0, per_worker - pool_size)
+
+
+class Server(BaseApplication):
+    def __init__(self, options: Dict[str, Any]) -> None:
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import create_app
+        return create_app()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--max-requests", type=int, default=0, help="recycle a worker after this many requests (0 = never)")
+    args = parser.parse_args()
+
+    args.workers = capped_workers(args.workers)
+    pool_size, max_overflow = pool_per_worker(args.workers)
+    # Workers are forked from this process and read their settings from the
+    # inherited environment
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_POOL_MAX_OVERFLOW"] = str(max_overflow)
+    # Calibrated once, here, while the host is idle: workers timing bcrypt
+    # at the same time slow each other down and would each pick a cost
+    if not get_settings().BCRYPT_ROUNDS:
+        rounds, hash_ms = calibrate_bcrypt_rounds(get_settings().PASSWORD_HASH_BUDGET_MS)
+        print(f"bcrypt cost {rounds} ({hash_ms:.0f} ms per hash)")
+        os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    get_settings.cache_clear()
+
+    Server({
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "app.server.Worker",
+        "graceful_timeout": 30,
+        "timeout": 60,
+        "keepalive": 5,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
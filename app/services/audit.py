@@ -0,0 +1,175 @@
+import hashlib
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.core.constants import AUDIT_CHAIN_LOCK_KEY, AuditAction
+from app.models.models import AuditEntry
+from app.services import outbox
+
+AUDIT_TOPIC = "audit.append"
+
+# prev_hash of the first entry of every chain
+GENESIS_HASH = "0" * 64
+
+# (user_id, balance column, delta)
+Change = Tuple[int, str, int]
+
+
+def entry_hash(
+    prev_hash: str,
+    company_id: int,
+    seq: int,
+    action: str,
+    actor_id: Optional[int],
+    changes: Sequence[Sequence[Any]],
+    details: Dict[str, Any],
+    occurred_at: datetime,
+) -> str:
+    """
+    SHA-256 over the previous entry's hash and a canonical JSON encoding of
+    the entry, so changing, removing or reordering an entry breaks every
+    hash after it.
+    """
+    body = json.dumps(
+        [company_id, seq, action, actor_id, changes, details, occurred_at.astimezone(timezone.utc).isoformat()],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(bytes.fromhex(prev_hash) + body.encode()).hexdigest()
+
+
+def recognition_changes(sender_id: int, recipients: Iterable[Tuple[int, int]]) -> List[Change]:
+    recipients = list(recipients)
+    changes: List[Change] = [(sender_id, "giveable_points", -sum(points for _, points in recipients))]
+    changes.extend((recipient_id, "redeemable_points", points) for recipient_id, points in recipients)
+    return changes
+
+
+def record(
+    db: AsyncSession,
+    company_id: int,
+    action: AuditAction,
+    actor_id: Optional[int],
+    changes: Iterable[Change],
+    **details: Any,
+) -> None:
+    """
+    Queue an audit entry for balance ``changes`` in the caller's
+    transaction, so it exists exactly if they commit. The outbox worker
+    chains and writes queued entries in batches after commit.
+    """
+    outbox.enqueue(db, AUDIT_TOPIC, {
+        "company_id": company_id,
+        "action": action.value,
+        "actor_id": actor_id,
+        "changes": [[user_id, column, delta] for user_id, column, delta in changes],
+        "details": details,
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+@outbox.handler(AUDIT_TOPIC)
+async def _append_entries(db: AsyncSession, payloads: List[Dict[str, Any]]) -> None:
+    by_company: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for payload in payloads:
+        by_company[payload["company_id"]].append(payload)
+    company_ids = sorted(by_company)
+
+    # Locks are taken in company order, so concurrent batches cannot deadlock
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(:key, id) FROM (SELECT unnest(CAST(:ids AS int[])) AS id ORDER BY 1) ids"),
+        {"key": AUDIT_CHAIN_LOCK_KEY, "ids": company_ids},
+    )
+    result = await db.execute(
+        text(
+            "SELECT c.id, last.seq, last.hash FROM unnest(CAST(:ids AS int[])) AS c(id) "
+            "LEFT JOIN LATERAL (SELECT seq, hash FROM audit_log WHERE company_id = c.id "
+            "ORDER BY seq DESC LIMIT 1) last ON true"
+        ),
+        {"ids": company_ids},
+    )
+    heads = {company_id: (seq or 0, prev_hash or GENESIS_HASH) for company_id, seq, prev_hash in result.all()}
+
+    rows = []
+    for company_id in company_ids:
+        seq, prev_hash = heads[company_id]
+        for payload in by_company[company_id]:
+            seq += 1
+            occurred_at = datetime.fromisoformat(payload["occurred_at"])
+            entry = {
+                "company_id": company_id,
+                "seq": seq,
+                "action": payload["action"],
+                "actor_id": payload["actor_id"],
+                "changes": payload["changes"],
+                "details": payload["details"],
+                "occurred_at": occurred_at,
+                "prev_hash": prev_hash,
+            }
+            prev_hash = entry["hash"] = entry_hash(
+                prev_hash, company_id, seq, payload["action"], payload["actor_id"],
+                payload["changes"], payload["details"], occurred_at,
+            )
+            rows.append(entry)
+    await db.execute(insert(AuditEntry), rows)
+
+
+class ChainReport(NamedTuple):
+    company_id: int
+    entries: int
+    head_hash: str
+    # First problem found, None if the chain is intact
+    error: Optional[str]
+
+
+async def verify_chains(
+    conn: AsyncConnection, company_ids: Optional[List[int]] = None, batch_size: int = 10000,
+) -> AsyncIterator[ChainReport]:
+    """
+    Walk the audit log in (company, seq) order with a server-side cursor,
+    recomputing every hash, and yield a report per company. Memory use does
+    not depend on the size of the log.
+    """
+    columns = AuditEntry.__table__.c
+    query = (
+        select(
+            columns.company_id, columns.seq, columns.action, columns.actor_id, columns.changes,
+            columns.details, columns.occurred_at, columns.prev_hash, columns.hash,
+        )
+        .order_by(columns.company_id, columns.seq)
+        .execution_options(yield_per=batch_size)
+    )
+    if company_ids:
+        query = query.where(columns.company_id.in_(company_ids))
+
+    company_id: Optional[int] = None
+    entries = 0
+    prev_hash = GENESIS_HASH
+    error: Optional[str] = None
+    result = await conn.stream(query)
+    # Fetched a partition at a time; iterating row by row would switch into
+    # the driver for every entry
+    async for rows in result.partitions():
+        for row in rows:
+            if row.company_id != company_id:
+                if company_id is not None:
+                    yield ChainReport(company_id, entries, prev_hash, error)
+                company_id, entries, prev_hash, error = row.company_id, 0, GENESIS_HASH, None
+            entries += 1
+            if error:
+                continue
+            if row.seq != entries:
+                error = f"seq {row.seq} found where {entries} was expected (entries missing)"
+            elif row.prev_hash != prev_hash:
+                error = f"seq {row.seq} does not link to the entry before it"
+            elif row.hash != entry_hash(
+                row.prev_hash, row.company_id, row.seq, row.action, row.actor_id,
+                row.changes, row.details, row.occurred_at,
+            ):
+                error = f"seq {row.seq} does not match its hash (entry altered)"
+            prev_hash = row.hash
+    if company_id is not None:
+        yield ChainReport(company_id, entries, prev_hash, error)
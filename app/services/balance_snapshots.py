@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.constants import INITIAL_REDEEMABLE_POINTS, SNAPSHOT_SETTLE_SECONDS
+from app.services.ledger_partitions import LEDGER_TABLES, list_partitions
+
+LATEST_SNAPSHOT = text(
+    """
+    SELECT id, taken_at FROM balance_snapshots
+    WHERE company_id = :company_id AND taken_at <= :at
+    ORDER BY taken_at DESC
+    LIMIT 1
+    """
+)
+
+# Every member's redeemable balance at :at: their entry in the snapshot
+# taken at :since (or the initial balance) plus what they were recognized
+# with after it, for the whole company in one pass
+BALANCES = """
+    WITH earned AS (
+        SELECT r.recipient_id AS user_id, sum(r.points_amount) AS points
+        FROM points_transactions t
+        -- Recipients are written with or just after their transaction; the
+        -- bound lets each lookup skip the partitions before it
+        JOIN points_recipients r ON r.transaction_id = t.id AND r.created_at >= t.created_at
+        WHERE t.company_id = :company_id
+          AND t.created_at > COALESCE(CAST(:since AS timestamptz), '-infinity') AND t.created_at <= :at
+          AND t.transaction_type IN ('recognition', 'comment_recognition')
+        GROUP BY r.recipient_id
+    )
+    SELECT
+        u.id AS user_id,
+        u.full_name,
+        COALESCE(s.redeemable_points, :initial) + COALESCE(e.points, 0) AS redeemable_points
+    FROM users u
+    LEFT JOIN balance_snapshot_entries s ON s.snapshot_id = :snapshot_id AND s.user_id = u.id
+    LEFT JOIN earned e ON e.user_id = u.id
+    WHERE u.company_id = :company_id
+      AND u.created_at <= :at
+      AND (u.deleted_at IS NULL OR u.deleted_at > :at)
+"""
+
+# Beyond the retention window only the first snapshot of each month is kept
+COMPACT = text(
+    """
+    WITH old AS (
+        SELECT id, row_number() OVER (
+            PARTITION BY company_id, date_trunc('month', taken_at AT TIME ZONE 'UTC') ORDER BY taken_at
+        ) AS position
+        FROM balance_snapshots
+        WHERE taken_at < :cutoff
+    )
+    DELETE FROM balance_snapshots s USING old
+    WHERE s.id = old.id AND old.position > 1
+    """
+)
+
+
+class LedgerArchived(ValueError):
+    pass
+
+
+class Replay(NamedTuple):
+    # Snapshot the balances start from, None for the initial balances
+    snapshot_id: Optional[int]
+    since: Optional[datetime]
+
+
+class CompanyBalances(NamedTuple):
+    as_of: datetime
+    snapshot_taken_at: Optional[datetime]
+    balances: List[Dict[str, Any]]
+
+
+def settled(now: Optional[datetime] = None) -> datetime:
+    """
+    The latest time a snapshot may be taken at.
+    """
+    return (now or datetime.now(timezone.utc)) - timedelta(seconds=SNAPSHOT_SETTLE_SECONDS)
+
+
+async def _replay_from(conn: AsyncConnection, company_id: int, at: datetime) -> Replay:
+    """
+    The nearest snapshot at or before ``at``. Raises LedgerArchived when
+    the ledger between it and ``at`` has been exported and dropped.
+    """
+    row = (await conn.execute(LATEST_SNAPSHOT, {"company_id": company_id, "at": at})).first()
+    replay = Replay(row.id, row.taken_at) if row else Replay(None, None)
+    if replay.since == at:
+        return replay
+    for table in LEDGER_TABLES:
+        partitions = await list_partitions(conn, table)
+        horizon = partitions[0].start if partitions else None
+        if horizon and (replay.since is None or replay.since < horizon):
+            raise LedgerArchived(
+                f"The ledger before {horizon:%Y-%m} is archived and no snapshot covers {at.isoformat()}"
+            )
+    return replay
+
+
+async def balances_as_of(conn: AsyncConnection, company_id: int, at: datetime) -> CompanyBalances:
+    """
+    Redeemable balances of the company's members at ``at``, from the nearest
+    earlier snapshot plus the ledger since then.
+    """
+    replay = await _replay_from(conn, company_id, at)
+    result = await conn.execute(
+        text(BALANCES + " ORDER BY u.id"),
+        {
+            "company_id": company_id, "at": at, "since": replay.since,
+            "snapshot_id": replay.snapshot_id, "initial": INITIAL_REDEEMABLE_POINTS,
+        },
+    )
+    return CompanyBalances(at, replay.since, [dict(row) for row in result.mappings()])
+
+
+async def take_snapshot(conn: AsyncConnection, company_id: int, at: datetime) -> Optional[int]:
+    """
+    Snapshot the company's balances at ``at`` in the caller's transaction
+    and return the number of members in it, or None when that snapshot
+    already exists. ``at`` must be no later than ``settled()``.
+    """
+    if at > settled():
+        raise ValueError(f"Snapshots must be at least {SNAPSHOT_SETTLE_SECONDS}s old")
+    replay = await _replay_from(conn, company_id, at)
+    snapshot_id = await conn.scalar(
+        text(
+            "INSERT INTO balance_snapshots (company_id, taken_at) VALUES (:company_id, :at) "
+            "ON CONFLICT DO NOTHING RETURNING id"
+        ),
+        {"company_id": company_id, "at": at},
+    )
+    if snapshot_id is None:
+        return None
+    result = await conn.execute(
+        text(
+            "INSERT INTO balance_snapshot_entries (snapshot_id, user_id, redeemable_points) "
+            f"SELECT CAST(:new_snapshot_id AS integer), user_id, redeemable_points FROM ({BALANCES}) balances"
+        ),
+        {
+            "company_id": company_id, "at": at, "since": replay.since,
+            "snapshot_id": replay.snapshot_id, "initial": INITIAL_REDEEMABLE_POINTS,
+            "new_snapshot_id": snapshot_id,
+        },
+    )
+    return result.rowcount
+
+
+async def compact(conn: AsyncConnection, keep_days: int, now: Optional[datetime] = None) -> int:
+    """
+    Delete snapshots older than ``keep_days`` except the first of each
+    month (per company), and return how many were deleted. Their entries
+    go with them.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=keep_days)
+    result = await conn.execute(COMPACT, {"cutoff": cutoff})
+    return result.rowcount
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import AsyncIterator, BinaryIO, NamedTuple
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.core.constants import ATTACHMENT_CHUNK_SIZE
+
+
+class Blob(NamedTuple):
+    sha256: str
+    size: int
+
+
+class BlobWriter(ABC):
+    """
+    One blob being written chunk by chunk and hashed on the way; ``commit``
+    files it under its digest, ``abort`` throws it away.
+    """
+
+    size: int = 0
+
+    @abstractmethod
+    async def write(self, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def commit(self) -> Blob:
+        ...
+
+    @abstractmethod
+    async def abort(self) -> None:
+        ...
+
+
+class BlobStore(ABC):
+    """
+    Content-addressed storage: blobs are named by the SHA-256 of their
+    bytes, so storing the same file twice keeps a single copy and a name
+    always refers to the same content.
+    """
+
+    @abstractmethod
+    async def writer(self) -> BlobWriter:
+        ...
+
+    @abstractmethod
+    async def size(self, sha256: str) -> int:
+        ...
+
+    @abstractmethod
+    def read(self, sha256: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """
+        Bytes ``start`` up to (excluding) ``end`` of a blob, in chunks.
+        """
+
+    @abstractmethod
+    async def local_path(self, sha256: str) -> str:
+        """
+        A local file holding the blob, for tools that need one (thumbnails).
+        """
+
+    async def put(self, data: bytes) -> Blob:
+        writer = await self.writer()
+        try:
+            await writer.write(data)
+            return await writer.commit()
+        except BaseException:
+            await writer.abort()
+            raise
+
+
+class _LocalBlobWriter(BlobWriter):
+    def __init__(self, store: "LocalBlobStore", file: BinaryIO) -> None:
+        self._store = store
+        self._file = file
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def _write(self, data: bytes) -> None:
+        self._hash.update(data)
+        self._file.write(data)
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        await run_in_threadpool(self._write, data)
+
+    def _commit(self) -> Blob:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        digest = self._hash.hexdigest()
+        path = self._store.path(digest)
+        if os.path.exists(path):
+            # Stored before: keep that copy
+            os.unlink(self._file.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._file.name, path)
+        return Blob(digest, self.size)
+
+    async def commit(self) -> Blob:
+        return await run_in_threadpool(self._commit)
+
+    def _abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self._file.name)
+        except FileNotFoundError:
+            pass
+
+    async def abort(self) -> None:
+        await run_in_threadpool(self._abort)
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs as files under ``root``, at ``ab/cd/abcd...`` by digest. Uploads
+    are written to ``root/tmp`` and renamed into place once hashed, so a
+    blob path only ever holds complete content.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._tmp = os.path.join(root, "tmp")
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def _open_temp(self) -> BinaryIO:
+        os.makedirs(self._tmp, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self._tmp, prefix="upload-", delete=False)
+
+    async def writer(self) -> BlobWriter:
+        return _LocalBlobWriter(self, await run_in_threadpool(self._open_temp))
+
+    async def size(self, sha256: str) -> int:
+        return (await run_in_threadpool(os.stat, self.path(sha256))).st_size
+
+    async def read(self, sha256: str, start: int, end: int) -> AsyncIterator[bytes]:
+        file = await run_in_threadpool(open, self.path(sha256), "rb")
+        try:
+            await run_in_threadpool(file.seek, start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = await run_in_threadpool(file.read, min(ATTACHMENT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
+
+    async def local_path(self, sha256: str) -> str:
+        return self.path(sha256)
+
+
+@lru_cache
+def get_blob_store() -> BlobStore:
+    # Other backends (e.g. object storage) plug in here, or per app through
+    # FastAPI's dependency_overrides
+    return LocalBlobStore(get_settings().BLOB_STORE_DIR)
@@ -0,0 +1,148 @@
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.constants import DIGEST_TOP_POSTS
+
+TOP_POSTS = text(
+    """
+    SELECT p.id, p.content, p.like_count, p.total_points, u.full_name AS author
+    FROM posts p JOIN users u ON u.id = p.author_id
+    WHERE p.company_id = :company_id AND p.created_at >= :start AND p.created_at < :end
+    ORDER BY p.like_count DESC, p.total_points DESC, p.id
+    LIMIT :limit
+    """
+)
+
+# Every member's week in one pass: points received, ranked over the whole
+# company before skipping the users an earlier run already wrote
+DIGEST_ROWS = text(
+    """
+    WITH earned AS (
+        SELECT r.recipient_id AS user_id, count(*) AS recognitions, sum(r.points_amount) AS points
+        FROM points_transactions t
+        JOIN points_recipients r ON r.transaction_id = t.id
+        WHERE t.company_id = :company_id
+          AND t.created_at >= :start AND t.created_at < :end
+          AND t.transaction_type IN ('recognition', 'comment_recognition')
+          -- Recipients are written just after their transaction
+          AND r.created_at >= :start AND r.created_at < :recipients_end
+        GROUP BY r.recipient_id
+    ),
+    board AS (
+        SELECT
+            u.id, u.email, u.full_name,
+            COALESCE(e.recognitions, 0) AS recognitions,
+            COALESCE(e.points, 0) AS points,
+            rank() OVER (ORDER BY COALESCE(e.points, 0) DESC) AS position,
+            count(*) OVER () AS colleagues
+        FROM users u LEFT JOIN earned e ON e.user_id = u.id
+        WHERE u.company_id = :company_id AND u.deleted_at IS NULL
+    )
+    SELECT * FROM board WHERE id > :after ORDER BY id
+    """
+)
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class Checkpoint(NamedTuple):
+    chunks: int = 0
+    last_user_id: int = 0
+    digests: int = 0
+    complete: bool = False
+
+
+def week_start(day: date) -> datetime:
+    """
+    Midnight UTC on the Monday of ``day``'s week.
+    """
+    monday = day - timedelta(days=day.weekday())
+    return datetime.combine(monday, time(), tzinfo=timezone.utc)
+
+
+def company_dir(outbox_dir: str, week: datetime, company_id: int) -> str:
+    return os.path.join(outbox_dir, week.strftime("%Y-%m-%d"), f"company-{company_id}")
+
+
+def read_checkpoint(directory: str) -> Checkpoint:
+    try:
+        with open(os.path.join(directory, CHECKPOINT_FILE)) as f:
+            return Checkpoint(**json.load(f))
+    except FileNotFoundError:
+        return Checkpoint()
+
+
+def _write_atomic(path: str, content: str) -> None:
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".part", path)
+
+
+def _flush_chunk(directory: str, checkpoint: Checkpoint, digests: List[Dict[str, Any]], complete: bool) -> Checkpoint:
+    """
+    Write one chunk file, then move the checkpoint past it. A crash in
+    between leaves a chunk the next run rewrites under the same name.
+    """
+    chunks = checkpoint.chunks
+    if digests:
+        chunks += 1
+        _write_atomic(
+            os.path.join(directory, f"chunk-{chunks:05d}.jsonl"),
+            "".join(json.dumps(digest) + "\n" for digest in digests),
+        )
+    checkpoint = Checkpoint(
+        chunks=chunks,
+        last_user_id=digests[-1]["user_id"] if digests else checkpoint.last_user_id,
+        digests=checkpoint.digests + len(digests),
+        complete=complete,
+    )
+    _write_atomic(os.path.join(directory, CHECKPOINT_FILE), json.dumps(checkpoint._asdict()))
+    return checkpoint
+
+
+async def write_company_digests(
+    conn: AsyncConnection, company_id: int, week: datetime, outbox_dir: str, chunk_size: int,
+) -> Checkpoint:
+    """
+    Compute every member's digest for the week starting at ``week`` with two
+    queries and spool them to ``<outbox_dir>/<week>/company-<id>/`` as JSON
+    lines, ``chunk_size`` per file. Progress is checkpointed after each
+    chunk, so an interrupted run resumes after the last user written and a
+    finished company is skipped.
+    """
+    directory = company_dir(outbox_dir, week, company_id)
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = read_checkpoint(directory)
+    if checkpoint.complete:
+        return checkpoint
+
+    params = {"company_id": company_id, "start": week, "end": week + timedelta(days=7)}
+    result = await conn.execute(TOP_POSTS, {**params, "limit": DIGEST_TOP_POSTS})
+    top_posts = [dict(row._mapping) for row in result]
+
+    pending: List[Dict[str, Any]] = []
+    rows = await conn.stream(
+        DIGEST_ROWS,
+        {**params, "recipients_end": params["end"] + timedelta(days=1), "after": checkpoint.last_user_id},
+    )
+    async for row in rows:
+        pending.append({
+            "user_id": row.id,
+            "email": row.email,
+            "full_name": row.full_name,
+            "week_start": week.date().isoformat(),
+            "recognitions_received": row.recognitions,
+            "points_earned": row.points,
+            "leaderboard_position": row.position,
+            "leaderboard_size": row.colleagues,
+            "top_posts": top_posts,
+        })
+        if len(pending) >= chunk_size:
+            checkpoint = _flush_chunk(directory, checkpoint, pending, complete=False)
+            pending = []
+    return _flush_chunk(directory, checkpoint, pending, complete=True)
@@ -0,0 +1,166 @@
+import csv
+import io
+import secrets
+from typing import List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.constants import (
+    INITIAL_GIVEABLE_POINTS,
+    INITIAL_REDEEMABLE_POINTS,
+    INVITE_INSERT_CHUNK,
+    AuditAction,
+    TransactionType,
+)
+from app.models.models import PointsRecipient, PointsTransaction, User
+from app.schemas.schemas import InviteResult, UserInvite
+from app.services import audit
+from app.services.password_hasher import hash_passwords
+
+REQUIRED_COLUMNS = ("email", "full_name")
+
+ParsedInvite = Tuple[int, UserInvite]
+
+
+class InviteFileError(ValueError):
+    pass
+
+
+def parse_invites(data: str) -> Tuple[List[ParsedInvite], List[InviteResult]]:
+    """
+    Parse an invite CSV with an ``email,full_name[,role][,password]`` header.
+    Returns the valid rows with their line numbers and a result for every
+    invalid one.
+    """
+    reader = csv.DictReader(io.StringIO(data))
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise InviteFileError(f"Missing CSV columns: {', '.join(missing)}")
+
+    invites: List[ParsedInvite] = []
+    invalid: List[InviteResult] = []
+    for record in reader:
+        fields = {key: value.strip() for key, value in record.items() if key and value and value.strip()}
+        try:
+            invites.append((reader.line_num, UserInvite(**fields)))
+        except ValidationError as e:
+            error = e.errors()[0]
+            invalid.append(InviteResult(
+                row=reader.line_num,
+                email=fields.get("email"),
+                status="invalid",
+                detail=f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}",
+            ))
+    return invites, invalid
+
+
+async def invite_users(
+    db: AsyncSession,
+    company_id: int,
+    invites: List[ParsedInvite],
+    invited_by: Optional[int] = None,
+) -> List[InviteResult]:
+    """
+    Create the invited users in ``company_id`` and their initial point
+    allocations in one transaction.
+
+    Duplicates (within the file or already registered) are reported and
+    skipped. Rows without a password get a generated temporary one, which
+    is returned in their result.
+    """
+    results: List[InviteResult] = []
+
+    # One round trip for every email already registered
+    emails = [invite.email for _, invite in invites]
+    existing = set()
+    if emails:
+        result = await db.execute(select(User.email).where(User.email.in_(emails)))
+        existing = set(result.scalars().all())
+
+    accepted: List[ParsedInvite] = []
+    seen = set()
+    for line, invite in invites:
+        if invite.email in existing or invite.email in seen:
+            results.append(InviteResult(row=line, email=invite.email, status="duplicate", detail="Email already registered"))
+            continue
+        seen.add(invite.email)
+        accepted.append((line, invite))
+
+    passwords = [invite.password or secrets.token_urlsafe(12) for _, invite in accepted]
+    password_hashes = await hash_passwords(passwords)
+
+    # Multi-row inserts; a concurrent signup for the same email loses nothing,
+    # its row is simply reported as a duplicate
+    created = {}
+    rows = [
+        {
+            "email": invite.email,
+            "full_name": invite.full_name,
+            "password_hash": password_hash,
+            "company_id": company_id,
+            "role": invite.role.value,
+            "giveable_points": INITIAL_GIVEABLE_POINTS,
+            "redeemable_points": INITIAL_REDEEMABLE_POINTS,
+        }
+        for (_, invite), password_hash in zip(accepted, password_hashes)
+    ]
+    for start in range(0, len(rows), INVITE_INSERT_CHUNK):
+        result = await db.execute(
+            insert(User)
+            .values(rows[start:start + INVITE_INSERT_CHUNK])
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User.id, User.email)
+        )
+        created.update((email, user_id) for user_id, email in result.all())
+
+    if created and INITIAL_GIVEABLE_POINTS > 0:
+        await _record_initial_allocation(db, company_id, list(created.values()), invited_by)
+
+    for (line, invite), password in zip(accepted, passwords):
+        user_id = created.get(invite.email)
+        if user_id is None:
+            results.append(InviteResult(row=line, email=invite.email, status="duplicate", detail="Email already registered"))
+        else:
+            results.append(InviteResult(
+                row=line,
+                email=invite.email,
+                status="created",
+                user_id=user_id,
+                temporary_password=None if invite.password else password,
+            ))
+
+    await db.commit()
+    return sorted(results, key=lambda r: r.row)
+
+
+async def _record_initial_allocation(db: AsyncSession, company_id: int, user_ids: List[int], invited_by: Optional[int]) -> None:
+    # One ledger transaction for the whole batch, one recipient row per user
+    result = await db.execute(
+        insert(PointsTransaction)
+        .values(
+            sender_id=invited_by,
+            company_id=company_id,
+            transaction_type=TransactionType.INITIAL_ALLOCATION.value,
+            points=INITIAL_GIVEABLE_POINTS * len(user_ids),
+        )
+        .returning(PointsTransaction.id, PointsTransaction.created_at)
+    )
+    transaction_id, created_at = result.one()
+    for start in range(0, len(user_ids), INVITE_INSERT_CHUNK):
+        await db.execute(
+            insert(PointsRecipient).values([
+                {
+                    "transaction_id": transaction_id,
+                    "recipient_id": user_id,
+                    "points_amount": INITIAL_GIVEABLE_POINTS,
+                    "created_at": created_at,
+                }
+                for user_id in user_ids[start:start + INVITE_INSERT_CHUNK]
+            ])
+        )
+    audit.record(
+        db, company_id, AuditAction.INITIAL_ALLOCATION, invited_by,
+        [(user_id, "giveable_points", INITIAL_GIVEABLE_POINTS) for user_id in user_ids],
+        transaction_id=transaction_id,
+    )
@@ -0,0 +1,189 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.constants import PARTITION_LOCK_KEY
+
+# Monthly range-partitioned ledger tables (see migration e8a91f4c6d27)
+LEDGER_TABLES = ("points_transactions", "points_recipients")
+
+_BOUND = re.compile(r"FROM \((?:MINVALUE|'([^']+)')\) TO \((?:MAXVALUE|'([^']+)')\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[datetime]  # None for MINVALUE
+    end: Optional[datetime]  # None for MAXVALUE
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+
+def _parse_bound(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    # Postgres renders '2026-12-01 00:00:00+00'
+    return datetime.strptime(value + "00", "%Y-%m-%d %H:%M:%S%z")
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Partition]:
+    result = await conn.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            """
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound in result.all():
+        match = _BOUND.search(bound)
+        if match:
+            partitions.append(Partition(name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return sorted(partitions, key=lambda p: p.start or datetime.min.replace(tzinfo=timezone.utc))
+
+
+def _covers(partition: Partition, moment: datetime) -> bool:
+    return (partition.start is None or partition.start <= moment) and (partition.end is None or moment < partition.end)
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the monthly partitions for the current month and ``months_ahead``
+    months after it where no partition covers them yet. Idempotent; returns
+    the names of the partitions created.
+    """
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    for table in LEDGER_TABLES:
+        partitions = await list_partitions(conn, table)
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            if any(_covers(p, start) for p in partitions):
+                continue
+            name = partition_name(table, start)
+            await conn.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{add_months(start, 1):%Y-%m-%d} 00:00:00+00')"
+                )
+            )
+            created.append(name)
+    return created
+
+
+def archive_path(archive_dir: str, table: str, month: datetime) -> str:
+    return os.path.join(archive_dir, table, f"{month:%Y-%m}.jsonl.gz")
+
+
+async def export_partition(conn: AsyncConnection, table: str, partition: Partition, archive_dir: str) -> int:
+    """
+    Stream a partition to ``<archive_dir>/<table>/<YYYY-MM>.jsonl.gz``, one
+    JSON row per line, and return the number of rows written. Partition
+    bounds fall on month boundaries, so each month file comes from exactly
+    one partition and a re-run after a failure just rewrites it.
+    """
+    os.makedirs(os.path.join(archive_dir, table), exist_ok=True)
+    files: Dict[str, Any] = {}
+    rows = 0
+    try:
+        result = await conn.stream(
+            text(f"SELECT date_trunc('month', created_at AT TIME ZONE 'UTC'), row_to_json(t)::text FROM {partition.name} t")
+        )
+        async for month, row in result:
+            path = archive_path(archive_dir, table, month.replace(tzinfo=timezone.utc))
+            if path not in files:
+                files[path] = gzip.open(path + ".part", "wt", encoding="utf-8")
+            files[path].write(row + "\n")
+            rows += 1
+    finally:
+        for handle in files.values():
+            handle.close()
+
+    for path in files:
+        os.replace(path + ".part", path)
+    return rows
+
+
+async def drop_partition(conn: AsyncConnection, table: str, partition: Partition, exported_rows: int) -> None:
+    """
+    Detach and drop an exported partition, refusing if it no longer holds
+    exactly the rows that were exported.
+    """
+    result = await conn.execute(text(f"SELECT count(*) FROM {partition.name}"))
+    if result.scalar_one() != exported_rows:
+        raise RuntimeError(f"{partition.name} changed while it was being archived")
+    await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+    await conn.execute(text(f"DROP TABLE {partition.name}"))
+
+
+def read_archive(archive_dir: str, table: str, month: datetime) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the archived rows of ``table`` for ``month`` (empty if the
+    month was never archived).
+    """
+    path = archive_path(archive_dir, table, month_start(month))
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            yield json.loads(line)
+
+
+def _archived_recipients(archive_dir: str, month: datetime) -> Iterator[Dict[str, Any]]:
+    # Recipient rows are stamped with their transaction's created_at, but
+    # ones written before that could land just past the month boundary
+    yield from read_archive(archive_dir, "points_recipients", month)
+    yield from read_archive(archive_dir, "points_recipients", add_months(month_start(month), 1))
+
+
+def read_archived_transactions(
+    archive_dir: str,
+    month: datetime,
+    company_id: Optional[int] = None,
+    sender_id: Optional[int] = None,
+    recipient_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Archived ledger transactions of one month in ``company_id``, sent by
+    ``sender_id`` and/or received by ``recipient_id``, newest first, each
+    with its ``recipients`` (``user_id``, ``points``). Blocking file IO;
+    call it from a thread.
+    """
+    received = None
+    if recipient_id is not None:
+        received = {
+            row["transaction_id"]
+            for row in _archived_recipients(archive_dir, month)
+            if row["recipient_id"] == recipient_id
+        }
+    rows = [
+        row for row in read_archive(archive_dir, "points_transactions", month)
+        if (company_id is None or row["company_id"] == company_id)
+        and (sender_id is None or row["sender_id"] == sender_id)
+        and (received is None or row["id"] in received)
+    ]
+    recipients: Dict[int, List[Dict[str, Any]]] = {row["id"]: [] for row in rows}
+    for row in _archived_recipients(archive_dir, month):
+        if row["transaction_id"] in recipients:
+            recipients[row["transaction_id"]].append({"user_id": row["recipient_id"], "points": row["points_amount"]})
+    for row in rows:
+        row["recipients"] = recipients[row["id"]]
+    return sorted(rows, key=lambda row: row["created_at"], reverse=True)
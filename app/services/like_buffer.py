@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import Integer, bindparam, delete, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from app.core import metrics
+from app.core.constants import TRENDING_LIKE_WEIGHT
+from app.models.models import Post, PostLike
+from app.services.trending import engagement_bump
+from app.services.user_stats import credit_likes_received
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    """
+    In-process write-coalescing buffer for post likes.
+
+    Likes and unlikes are acknowledged immediately and flushed every few
+    milliseconds as one batched INSERT ... ON CONFLICT DO NOTHING and one
+    DELETE, with the resulting like_count, trending engagement and author
+    likes_received deltas applied once per post.
+    Repeated toggles of the same (post, user) pair within a window collapse
+    to the last state. Entries of failed flushes are retried until they
+    have been failing for ``max_retry_seconds``, then dropped; likes of
+    posts deleted in the meantime are skipped without failing the batch.
+    """
+
+    def __init__(self, flush_interval_ms: int = 5, max_batch_size: int = 500, max_retry_seconds: float = 60) -> None:
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_retry_seconds = max_retry_seconds
+        self._pending: Dict[Tuple[int, int], bool] = {}
+        # When each entry's first failed flush happened
+        self._failing_since: Dict[Tuple[int, int], float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._session_factory = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def like(self, post_id: int, user_id: int) -> None:
+        self._enqueue(post_id, user_id, True)
+
+    def unlike(self, post_id: int, user_id: int) -> None:
+        self._enqueue(post_id, user_id, False)
+
+    def _enqueue(self, post_id: int, user_id: int, liked: bool) -> None:
+        self._pending[(post_id, user_id)] = liked
+        metrics.set_gauge("like_buffer.pending", len(self._pending))
+        if len(self._pending) >= self.max_batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the flush loop after its current flush (cancelling it could
+        lose the batch being written) and write out everything still
+        buffered.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error("Like buffer stopped with %d unwritten entries", len(self._pending))
+            metrics.increment("like_buffer.dropped", len(self._pending))
+            self._pending = {}
+            self._failing_since = {}
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        metrics.set_gauge("like_buffer.pending", 0)
+        started = time.perf_counter()
+        try:
+            await self._write(batch)
+        except Exception:
+            logger.exception("Like buffer flush of %d entries failed, retrying", len(batch))
+            metrics.increment("like_buffer.flush_failures")
+            self._requeue(batch)
+            return
+        for key in batch:
+            self._failing_since.pop(key, None)
+        metrics.observe("like_buffer.batch_size", len(batch))
+        metrics.observe("like_buffer.flush_ms", (time.perf_counter() - started) * 1000)
+
+    def _requeue(self, batch: Dict[Tuple[int, int], bool]) -> None:
+        now = time.monotonic()
+        dropped = 0
+        for key, liked in batch.items():
+            if now - self._failing_since.setdefault(key, now) >= self.max_retry_seconds:
+                dropped += 1
+                self._failing_since.pop(key)
+                continue
+            # Without clobbering toggles that arrived during the flush
+            self._pending.setdefault(key, liked)
+        if dropped:
+            logger.error("Like buffer dropped %d entries failing for over %ss", dropped, self.max_retry_seconds)
+            metrics.increment("like_buffer.dropped", dropped)
+        metrics.set_gauge("like_buffer.pending", len(self._pending))
+
+    async def _write(self, batch: Dict[Tuple[int, int], bool]) -> None:
+        likes = [{"post_id": p, "user_id": u} for (p, u), liked in batch.items() if liked]
+        unlikes = [(p, u) for (p, u), liked in batch.items() if not liked]
+        deltas: Dict[int, int] = defaultdict(int)
+
+        async with self._session_factory() as db:
+            # Only rows that actually changed come back, so counters stay exact
+            # even with several processes buffering the same post.
+            if likes:
+                # Like rows carry their post's tenant
+                result = await db.execute(
+                    select(Post.id, Post.company_id).where(Post.id.in_({like["post_id"] for like in likes}))
+                )
+                companies = dict(result.all())
+                # A post deleted (or without a tenant) since the like was
+                # acknowledged can't take it; the rest of the batch still can
+                skipped = [like for like in likes if companies.get(like["post_id"]) is None]
+                if skipped:
+                    logger.warning("Like buffer skipped %d likes of missing posts", len(skipped))
+                    metrics.increment("like_buffer.skipped", len(skipped))
+                likes = [
+                    {**like, "company_id": companies[like["post_id"]]}
+                    for like in likes if companies.get(like["post_id"]) is not None
+                ]
+            if likes:
+                result = await db.execute(
+                    insert(PostLike)
+                    .values(likes)
+                    .on_conflict_do_nothing(constraint="unique_post_like")
+                    .returning(PostLike.post_id)
+                )
+                for post_id in result.scalars():
+                    deltas[post_id] += 1
+            if unlikes:
+                result = await db.execute(
+                    delete(PostLike)
+                    .where(tuple_(PostLike.post_id, PostLike.user_id).in_(unlikes))
+                    .returning(PostLike.post_id)
+                )
+                for post_id in result.scalars():
+                    deltas[post_id] -= 1
+
+            changed = [{"b_id": p, "delta": d} for p, d in deltas.items() if d]
+            if changed:
+                posts = Post.__table__
+                await db.execute(
+                    update(posts)
+                    .where(posts.c.id == bindparam("b_id"))
+                    .values(
+                        like_count=posts.c.like_count + bindparam("delta"),
+                        **engagement_bump(posts, bindparam("delta") * TRENDING_LIKE_WEIGHT),
+                    ),
+                    changed,
+                )
+                await db.execute(
+                    credit_likes_received(
+                        select(posts.c.author_id, bindparam("delta", type_=Integer))
+                        .where(posts.c.id == bindparam("b_id"))
+                    ),
+                    changed,
+                )
+            await db.commit()
+
+
+like_buffer = LikeBuffer()
@@ -0,0 +1,71 @@
+from sqlalchemy import delete, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.expression import CTE, Select
+from app.services.trending import engagement_bump
+from app.services.user_stats import credit_likes_received
+
+
+def toggle_like(
+    model, like_model, target_column: str, constraint: str, target: CTE, user_id: int, liked: bool,
+    engagement_weight: int = 0,
+) -> Select:
+    """
+    Build a single statement that likes (or unlikes) a post or comment and
+    returns the updated row.
+
+    ``target`` is a CTE yielding ``id``, ``company_id`` and ``same_company``
+    for the liked object; the like row is only written when
+    ``same_company`` holds. The author's ``likes_received`` stat moves with
+    the counter, and so does the object's trending engagement when
+    ``engagement_weight`` is set. The statement returns ``(model, same_company, like_count)``: no row means the
+    object does not exist, and a NULL ``like_count`` means nothing changed
+    (already liked / not liked).
+    """
+    likes = like_model.__table__
+    table = model.__table__
+    allowed = select(target.c.id).where(target.c.same_company)
+
+    if liked:
+        changed = (
+            insert(likes)
+            .from_select(
+                [target_column, "user_id", "company_id"],
+                select(target.c.id, literal(user_id), target.c.company_id).where(target.c.same_company),
+            )
+            .on_conflict_do_nothing(constraint=constraint)
+            .returning(likes.c[target_column].label("id"))
+            .cte("changed")
+        )
+    else:
+        changed = (
+            delete(likes)
+            .where(likes.c[target_column].in_(allowed))
+            .where(likes.c.user_id == user_id)
+            .returning(likes.c[target_column].label("id"))
+            .cte("changed")
+        )
+
+    delta = 1 if liked else -1
+    # Counter bumps are not content edits, so leave updated_at alone
+    values = {"like_count": table.c.like_count + delta, "updated_at": table.c.updated_at}
+    if engagement_weight:
+        values.update(engagement_bump(table, delta * engagement_weight))
+    counted = (
+        update(table)
+        .where(table.c.id.in_(select(changed.c.id)))
+        .values(**values)
+        .returning(table.c.id, table.c.like_count)
+        .cte("counted")
+    )
+    credited = credit_likes_received(
+        select(table.c.author_id, literal(delta)).where(table.c.id.in_(select(changed.c.id)))
+    ).cte("credited")
+
+    # The outer SELECT sees the pre-statement snapshot, so the new counter
+    # value has to come from the UPDATE's RETURNING.
+    return (
+        select(model, target.c.same_company, counted.c.like_count)
+        .join(target, target.c.id == model.id)
+        .outerjoin(counted, counted.c.id == model.id)
+        .add_cte(credited)
+    )
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Dict, Generic, Iterable, List, Optional, Set, Type, TypeVar
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Post, User
+
+T = TypeVar("T")
+
+
+class BatchLoader(Generic[T]):
+    """
+    Request-scoped loader of ``model`` rows by id.
+
+    Every ``load`` issued during one event-loop tick is answered by a single
+    ``IN`` query, and results (misses included) are memoized for the rest
+    of the request, so a handler can look rows up wherever it needs them
+    without paying a round trip each time. Batches run one at a time since
+    they share the request's session.
+    """
+
+    def __init__(self, db: AsyncSession, model: Type[T]) -> None:
+        self.db = db
+        self.model = model
+        self._results: Dict[int, "asyncio.Future[Optional[T]]"] = {}
+        self._queued: List[int] = []
+        # The event loop only keeps weak references to tasks
+        self._fetches: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    async def load(self, key: int) -> Optional[T]:
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[key] = loop.create_future()
+            if not self._queued:
+                # Runs once the current tick's callers have queued their keys
+                loop.call_soon(self._dispatch)
+            self._queued.append(key)
+        # Shielded: one caller giving up must not cancel the shared result
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[int]) -> List[Optional[T]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        keys, self._queued = self._queued, []
+        task = asyncio.ensure_future(self._fetch(keys))
+        self._fetches.add(task)
+        task.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, keys: List[int]) -> None:
+        try:
+            async with self._lock:
+                result = await self.db.execute(select(self.model).where(self.model.id.in_(keys)))
+                found = {row.id: row for row in result.scalars()}
+        except asyncio.CancelledError:
+            for key in keys:
+                self._results.pop(key).cancel()
+            raise
+        except Exception as e:
+            for key in keys:
+                # Not memoized: a later load may retry
+                self._results.pop(key).set_exception(e)
+            return
+        for key in keys:
+            self._results[key].set_result(found.get(key))
+
+
+class Loaders:
+    """
+    The loaders of one request; see ``deps.get_loaders``.
+    """
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.users: BatchLoader[User] = BatchLoader(db, User)
+        self.posts: BatchLoader[Post] = BatchLoader(db, Post)
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.models.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[AsyncSession, List[Dict[str, Any]]], Awaitable[None]]
+
+_handlers: Dict[str, Handler] = {}
+
+class _Claimed(NamedTuple):
+    id: int
+    topic: str
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: datetime
+
+
+# Session.info flag set by enqueue, so a commit can wake the local workers
+_PENDING_KEY = "outbox_pending"
+
+
+def handler(topic: str) -> Callable[[Handler], Handler]:
+    """
+    Register ``fn(db, payloads)`` as the consumer of ``topic``. It gets every
+    claimed payload of the topic at once and runs in the transaction that
+    deletes them, so its database writes happen exactly once.
+    """
+    def register(fn: Handler) -> Handler:
+        _handlers[topic] = fn
+        return fn
+    return register
+
+
+def enqueue(db: AsyncSession, topic: str, payload: Dict[str, Any]) -> None:
+    """
+    Record a side effect in the caller's transaction; it is only processed
+    once that transaction commits.
+    """
+    db.add(OutboxEvent(topic=topic, payload=payload))
+    db.info[_PENDING_KEY] = True
+
+
+class OutboxWorker:
+    """
+    Per-process pool of tasks draining the outbox_events table.
+
+    Each task claims up to ``batch_size`` due events with FOR UPDATE SKIP
+    LOCKED (so workers in every process share the table without stepping on
+    each other), hands them to their topic handlers and deletes them in the
+    same transaction. A failing topic is rolled back to a savepoint and its
+    events are retried with exponential backoff until ``max_attempts``,
+    after which they stay in the table with ``available_at`` NULL.
+
+    Work is pulled, never pushed: the queue lives in the database, so a
+    slow consumer only lets the table grow instead of holding requests or
+    memory, and full batches are drained back to back before a task goes
+    back to waiting for a commit or the poll interval.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        batch_size: int = 100,
+        poll_interval_ms: int = 500,
+        max_attempts: int = 8,
+    ) -> None:
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_ms / 1000
+        self.max_attempts = max_attempts
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._session_factory = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Stop the workers after their current batch; unprocessed events stay
+        in the table.
+        """
+        self._stopping = True
+        self.wake()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                claimed = await self.drain_once()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """
+        Claim and process one batch; returns the number of events claimed.
+        """
+        started = time.perf_counter()
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.available_at <= func.now())
+                .order_by(OutboxEvent.available_at, OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            # Plain tuples: a rolled-back savepoint may expire the ORM objects
+            events = [_Claimed(e.id, e.topic, e.payload, e.attempts, e.created_at) for e in result.scalars()]
+            if not events:
+                await db.commit()
+                return 0
+
+            by_topic: Dict[str, List[_Claimed]] = defaultdict(list)
+            for claimed in events:
+                by_topic[claimed.topic].append(claimed)
+
+            done: List[int] = []
+            for topic, topic_events in by_topic.items():
+                try:
+                    consume = _handlers[topic]
+                    async with db.begin_nested():
+                        await consume(db, [claimed.payload for claimed in topic_events])
+                    done.extend(claimed.id for claimed in topic_events)
+                except Exception as e:
+                    logger.exception("Outbox handler for %r failed on %d events", topic, len(topic_events))
+                    metrics.increment("outbox.failures")
+                    await self._schedule_retry(db, topic_events, repr(e))
+
+            if done:
+                await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(done)))
+            await db.commit()
+
+        now = datetime.now(timezone.utc)
+        metrics.observe("outbox.batch_size", len(events))
+        metrics.observe("outbox.process_ms", (time.perf_counter() - started) * 1000)
+        metrics.observe("outbox.lag_ms", max((now - claimed.created_at).total_seconds() * 1000 for claimed in events))
+        return len(events)
+
+    async def _schedule_retry(self, db: AsyncSession, events: List[_Claimed], error: str) -> None:
+        for claimed in events:
+            attempts = claimed.attempts + 1
+            if attempts >= self.max_attempts:
+                metrics.increment("outbox.dead")
+                available_at = None
+            else:
+                available_at = func.now() + timedelta(seconds=min(2 ** attempts, 600))
+            await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id == claimed.id)
+                .values(attempts=attempts, available_at=available_at, last_error=error[:1000])
+            )
+
+
+outbox_worker = OutboxWorker()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        outbox_worker.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,49 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+from app.core.config import get_settings
+from app.core.security import bcrypt_rounds, get_password_hash, set_bcrypt_rounds
+
+# bcrypt holds the GIL for the whole hash, so bulk hashing goes to worker
+# processes; created on first use so only processes that hash pay for it
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _workers() -> int:
+    return get_settings().PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_workers())
+    return _pool
+
+
+def _hash_chunk(passwords: List[str], rounds: int) -> List[str]:
+    # Workers may predate (or, when spawned, never see) the calibrated cost
+    if bcrypt_rounds() != rounds:
+        set_bcrypt_rounds(rounds)
+    return [get_password_hash(password) for password in passwords]
+
+
+async def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    """
+    Hash ``passwords`` across the worker processes, keeping their order.
+    """
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    size = -(-len(passwords) // _workers())
+    chunks = [list(passwords[i:i + size]) for i in range(0, len(passwords), size)]
+    hashed = await asyncio.gather(*(loop.run_in_executor(pool, _hash_chunk, chunk, bcrypt_rounds()) for chunk in chunks))
+    return [password_hash for chunk in hashed for password_hash in chunk]
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
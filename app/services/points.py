@@ -0,0 +1,43 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import Integer, column, update, values
+from sqlalchemy.sql.expression import Update
+from app.models.models import User
+
+
+def credit_recipients(recipients: Iterable[Tuple[int, int]]) -> Update:
+    """
+    One UPDATE adding ``(user_id, points)`` pairs to the users'
+    redeemable points. The addition happens in the database, so concurrent
+    recognitions of the same user add up, and the recipients never have to
+    be loaded.
+    """
+    totals: Dict[int, int] = defaultdict(int)
+    for user_id, points in recipients:
+        totals[user_id] += points
+    credited = values(
+        column("user_id", Integer), column("points", Integer), name="credited",
+    ).data(sorted(totals.items()))
+    users = User.__table__
+    return (
+        update(users)
+        .where(users.c.id == credited.c.user_id)
+        .values(redeemable_points=users.c.redeemable_points + credited.c.points)
+    )
+
+
+def debit_giveable(user_id: int, points: int) -> Update:
+    """
+    UPDATE taking ``points`` from a user's giveable points in the database,
+    so concurrent recognitions by the same sender all count. It only
+    matches while the user has enough points and returns the new balance,
+    so no row back means the debit was refused.
+    """
+    users = User.__table__
+    return (
+        update(users)
+        .where(users.c.id == user_id)
+        .where(users.c.giveable_points >= points)
+        .values(giveable_points=users.c.giveable_points - points)
+        .returning(users.c.giveable_points)
+    )
@@ -0,0 +1,155 @@
+import asyncio
+import bisect
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import User
+from app.services.loaders import Loaders
+
+
+class RosterEntry(NamedTuple):
+    id: int
+    full_name: str
+    email: str
+
+
+class Roster:
+    """
+    The active members of one company with a sorted prefix index over
+    their names and emails.
+
+    Every member is indexed under their full name, each later word of it
+    (so "smi" finds "Jane Smith") and their email, all casefolded. A search
+    is a binary search to the first key at or after the query plus a walk
+    over the keys that start with it.
+    """
+
+    def __init__(self, members: List[RosterEntry]) -> None:
+        self.members: Dict[int, RosterEntry] = {member.id: member for member in members}
+        keys: List[Tuple[str, int]] = []
+        for member in members:
+            name = member.full_name.casefold()
+            words = name.split()
+            keys.append((name, member.id))
+            keys.extend((" ".join(words[i:]), member.id) for i in range(1, len(words)))
+            keys.append((member.email.casefold(), member.id))
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._ids = [user_id for _, user_id in keys]
+        self.loaded_at = time.monotonic()
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.members
+
+    def search(self, query: str, limit: int) -> List[RosterEntry]:
+        query = " ".join(query.casefold().split())
+        found: Dict[int, RosterEntry] = {}
+        index = bisect.bisect_left(self._keys, query)
+        while index < len(self._keys) and len(found) < limit and self._keys[index].startswith(query):
+            user_id = self._ids[index]
+            found.setdefault(user_id, self.members[user_id])
+            index += 1
+        return list(found.values())
+
+
+class _Load:
+    """
+    A company's roster load and the requests waiting for it; kept only
+    while there are any.
+    """
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+        # Set by invalidate, so a load racing a write is not cached
+        self.invalidated = False
+
+
+class RosterCache:
+    """
+    Per-process cache of company rosters for typeahead and recipient checks.
+
+    A roster is loaded with one query on first use and kept for
+    ``ttl_seconds``, for at most ``max_companies`` companies (least recently
+    used go first). Writes in this process call ``invalidate``; writes in
+    other workers show up once the TTL runs out, so a hit is only
+    authoritative for "this user is a member", and callers fall back to
+    the database for ids the roster does not know. A member deleted through
+    another worker is still a hit here until the TTL runs out.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_companies: int = 1000) -> None:
+        self.ttl = ttl_seconds
+        self.max_companies = max_companies
+        self._rosters: "OrderedDict[int, Roster]" = OrderedDict()
+        self._loads: Dict[int, _Load] = {}
+
+    def _fresh(self, company_id: int) -> Optional[Roster]:
+        roster = self._rosters.get(company_id)
+        if roster is None or time.monotonic() - roster.loaded_at >= self.ttl:
+            return None
+        self._rosters.move_to_end(company_id)
+        return roster
+
+    async def get(self, db: AsyncSession, company_id: int) -> Roster:
+        roster = self._fresh(company_id)
+        if roster is not None:
+            return roster
+        # One load per company at a time; concurrent requests wait for it
+        load = self._loads.get(company_id)
+        if load is None:
+            load = self._loads[company_id] = _Load()
+        load.users += 1
+        try:
+            async with load.lock:
+                roster = self._fresh(company_id)
+                if roster is not None:
+                    return roster
+                load.invalidated = False
+                result = await db.execute(
+                    select(User.id, User.full_name, User.email)
+                    .where(User.company_id == company_id)
+                    .where(User.deleted_at.is_(None))
+                )
+                # Indexing a large company takes a while; keep it off the event loop
+                roster = await run_in_threadpool(Roster, [RosterEntry(*row) for row in result.all()])
+                if not load.invalidated:
+                    self._rosters[company_id] = roster
+                    self._rosters.move_to_end(company_id)
+                    while len(self._rosters) > self.max_companies:
+                        self._rosters.popitem(last=False)
+                return roster
+        finally:
+            load.users -= 1
+            if not load.users:
+                del self._loads[company_id]
+
+    async def non_members(
+        self, db: AsyncSession, loaders: Loaders, company_id: int, user_ids: Iterable[int],
+    ) -> List[int]:
+        """
+        The ``user_ids`` that are not active members of ``company_id``. The
+        roster vouches for the members it knows; the others are looked up,
+        as they may have joined after it was loaded.
+        """
+        roster = await self.get(db, company_id)
+        unknown = [user_id for user_id in user_ids if user_id not in roster]
+        if not unknown:
+            return []
+        users = await loaders.users.load_many(unknown)
+        return [
+            user_id for user_id, user in zip(unknown, users)
+            if not user or user.company_id != company_id or user.deleted_at
+        ]
+
+    def invalidate(self, company_id: int) -> None:
+        self._rosters.pop(company_id, None)
+        load = self._loads.get(company_id)
+        if load is not None:
+            load.invalidated = True
+
+
+roster_cache = RosterCache()
@@ -0,0 +1,68 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from app.core.config import get_settings
+from app.core.constants import THUMBNAIL_MAX_PIXELS, THUMBNAIL_SIZE
+
+# Decoding and resizing photos holds the GIL for tens of milliseconds, so
+# it happens in worker processes; created on first use so only processes
+# that receive images pay for it
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(get_settings().THUMBNAIL_WORKERS, 1))
+    return _pool
+
+
+def _render(path: str, size: int, max_pixels: int) -> Optional[bytes]:
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as image:
+            # Opening only reads the header, so oversized images stop here
+            if image.width * image.height > max_pixels:
+                return None
+            # JPEGs can be decoded straight at a fraction of their size
+            image.draft("RGB", (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+                image = image.convert("RGBA")
+                flattened = Image.new("RGB", image.size, "white")
+                flattened.paste(image, mask=image.getchannel("A"))
+                image = flattened
+            else:
+                image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=85, optimize=True)
+            return out.getvalue()
+    except Exception:
+        # Not an image Pillow can read; the upload is kept without a thumbnail
+        return None
+
+
+async def make_thumbnail(path: str) -> Optional[bytes]:
+    """
+    A JPEG thumbnail, at most THUMBNAIL_SIZE pixels a side, of the image
+    file at ``path``; None if it is not a readable image.
+    """
+    global _pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), _render, path, THUMBNAIL_SIZE, THUMBNAIL_MAX_PIXELS)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        _pool = None
+        return None
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
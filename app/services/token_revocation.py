@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
+from app.models.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    In-memory view of the revoked_tokens table.
+
+    Individual tokens are revoked by ``jti``; revoking a user invalidates
+    every token issued to them up to that moment. Entries only live until
+    the tokens they cover would have expired anyway, which keeps the list
+    small enough to check on every request without a database round trip.
+    Revocations made by other workers are picked up by the periodic sync.
+    """
+
+    def __init__(self) -> None:
+        self._tokens: Dict[str, datetime] = {}
+        self._users: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        jti = payload.get("jti")
+        if jti and jti in self._tokens:
+            return True
+        revoked_before = self._users.get(int(payload["sub"]))
+        if revoked_before is None:
+            return False
+        issued_at = datetime.fromtimestamp(payload["iat"], tz=timezone.utc)
+        return issued_at <= revoked_before
+
+    async def revoke_token(self, db: AsyncSession, jti: str, expires_at: datetime) -> bool:
+        """
+        Revoke the token ``jti`` and return whether this call did. False
+        means it was already revoked, possibly by another worker whose
+        revocation this one hasn't synced yet, i.e. the token is being
+        reused.
+        """
+        result = await db.execute(
+            insert(RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            .returning(RevokedToken.jti)
+        )
+        revoked = result.scalar_one_or_none() is not None
+        await db.commit()
+        self._tokens[jti] = expires_at
+        return revoked
+
+    async def revoke_user(self, db: AsyncSession, user_id: int) -> None:
+        """
+        Invalidate all tokens issued to ``user_id`` so far. Commits with the
+        caller's pending changes.
+        """
+        now = datetime.now(timezone.utc)
+        # No token issued before now outlives the longest token lifetime
+        expires_at = now + timedelta(days=get_settings().REFRESH_TOKEN_EXPIRE_DAYS)
+        db.add(RevokedToken(user_id=user_id, revoked_at=now, expires_at=expires_at))
+        await db.commit()
+        self._users[user_id] = now
+
+    async def sync(self, db: AsyncSession) -> None:
+        now = datetime.now(timezone.utc)
+        await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+        await db.commit()
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at, RevokedToken.expires_at)
+        )
+        tokens: Dict[str, datetime] = {}
+        users: Dict[int, datetime] = {}
+        for jti, user_id, revoked_at, expires_at in result.all():
+            if jti:
+                tokens[jti] = expires_at
+            else:
+                users[user_id] = max(revoked_at, users.get(user_id, revoked_at))
+        self._tokens, self._users = tokens, users
+
+    async def start(self, session_factory) -> None:
+        async with session_factory() as db:
+            await self.sync(db)
+        self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, session_factory) -> None:
+        while True:
+            await asyncio.sleep(get_settings().REVOCATION_SYNC_SECONDS)
+            try:
+                async with session_factory() as db:
+                    await self.sync(db)
+            except Exception:
+                logger.exception("Revocation list sync failed")
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,81 @@
+import math
+from typing import Any, Dict
+from sqlalchemy import Float, cast, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql.expression import ColumnElement
+from app.core.constants import (
+    TRENDING_COMMENT_WEIGHT, TRENDING_HALF_LIFE_HOURS, TRENDING_LIKE_WEIGHT, TRENDING_POINT_WEIGHT,
+)
+from app.models.models import Comment, Post
+
+# Score gained per second of post age: one half-life is worth a doubling of engagement
+_SCORE_PER_SECOND = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def hot_score(engagement: Any, created_at: Any) -> ColumnElement:
+    """
+    ``ln(engagement) + created_at / tau``: ordering by it is ordering by
+    ``engagement * 2 ** (-age / half-life)``, but the value never changes
+    as time passes, so it can live in an indexed column and only moves
+    when the post's engagement does.
+    """
+    return (
+        func.ln(cast(func.greatest(engagement, 1), Float))
+        + func.extract("epoch", created_at) * _SCORE_PER_SECOND
+    )
+
+
+def engagement_bump(posts, delta: Any) -> Dict[str, Any]:
+    """
+    UPDATE values adding ``delta`` to a posts row's engagement and moving
+    its hot_score with it.
+    """
+    engagement = posts.c.engagement + delta
+    return {
+        "engagement": engagement,
+        "hot_score": hot_score(engagement, posts.c.created_at),
+        # Counter bumps are not content edits, so leave updated_at alone
+        "updated_at": posts.c.updated_at,
+    }
+
+
+def comment_engagement(points: int) -> int:
+    return TRENDING_COMMENT_WEIGHT + points * TRENDING_POINT_WEIGHT
+
+
+async def rescore(conn: AsyncConnection, *criteria: Any) -> int:
+    """
+    Recompute engagement and hot_score from the like counter, points and
+    comments of the posts matching ``criteria``. Returns the number of
+    posts that had drifted, or that moved because the weights changed;
+    rows already right are not rewritten.
+    """
+    posts = Post.__table__
+    comments = (
+        select(
+            func.count() * TRENDING_COMMENT_WEIGHT
+            + func.coalesce(func.sum(Comment.total_points), 0) * TRENDING_POINT_WEIGHT
+        )
+        .where(Comment.post_id == posts.c.id)
+        .scalar_subquery()
+    )
+    scored = (
+        select(
+            posts.c.id,
+            (
+                posts.c.like_count * TRENDING_LIKE_WEIGHT
+                + posts.c.total_points * TRENDING_POINT_WEIGHT
+                + comments
+            ).label("engagement"),
+        )
+        .where(*criteria)
+        .cte("scored")
+    )
+    score = hot_score(scored.c.engagement, posts.c.created_at)
+    result = await conn.execute(
+        update(posts)
+        .where(posts.c.id == scored.c.id)
+        .where(or_(posts.c.engagement != scored.c.engagement, posts.c.hot_score != score))
+        .values(engagement=scored.c.engagement, hot_score=score, updated_at=posts.c.updated_at)
+    )
+    return result.rowcount
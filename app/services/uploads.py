@@ -0,0 +1,128 @@
+from typing import Callable, Dict, List, NamedTuple, Optional
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from app.services.blob_store import Blob, BlobStore
+
+# Room for the multipart framing and small fields around the file
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(ValueError):
+    pass
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+class ReceivedFile(NamedTuple):
+    filename: str
+    content_type: str
+    blob: Blob
+
+
+class _FilePart:
+    """
+    python-multipart callbacks picking the first ``field`` file part out
+    of a body. Its data is queued on ``pending`` for the caller to write.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field.encode()
+        self.filename: Optional[str] = None
+        self.content_type = "application/octet-stream"
+        self.pending: List[bytes] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._receiving = False
+        # Set once the file part's closing boundary arrived
+        self.complete = False
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        disposition, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._receiving = (
+            self.filename is None
+            and disposition == b"form-data"
+            and options.get(b"name") == self.field
+            and b"filename" in options
+        )
+        if self._receiving:
+            # Some clients send the full client-side path
+            filename = options[b"filename"].decode("utf-8", "replace")
+            self.filename = filename.replace("\\", "/").rsplit("/", 1)[-1][:255]
+            content_type = self._headers.get(b"content-type")
+            if content_type:
+                self.content_type = content_type.decode("latin-1").strip()
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._receiving:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self._receiving:
+            self.complete = True
+        self._receiving = False
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            name: getattr(self, name)
+            for name in (
+                "on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                "on_headers_finished", "on_part_data", "on_part_end",
+            )
+        }
+
+
+async def receive_file(request: Request, store: BlobStore, field: str, max_bytes: int) -> ReceivedFile:
+    """
+    Stream the ``field`` file of a multipart/form-data request into
+    ``store`` as it arrives. Only the network chunk being parsed is held in
+    memory, and the upload is hashed while it is written, so its size only
+    matters to the ``max_bytes`` limit.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise UploadError("Expected a multipart/form-data body")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes + _MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f"Files are limited to {max_bytes} bytes")
+
+    part = _FilePart(field)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+    writer = await store.writer()
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise UploadError("Malformed multipart body")
+            for data in part.pending:
+                if writer.size + len(data) > max_bytes:
+                    raise UploadTooLarge(f"Files are limited to {max_bytes} bytes")
+                await writer.write(data)
+            part.pending.clear()
+        parser.finalize()
+        if part.filename is None:
+            raise UploadError(f"Missing '{field}' file")
+        if not part.complete:
+            raise UploadError("Incomplete multipart body")
+        blob = await writer.commit()
+    except BaseException:
+        await writer.abort()
+        raise
+    return ReceivedFile(part.filename, part.content_type, blob)
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import Insert, Select
+from app.models.models import UserStats
+from app.services import outbox
+
+STAT_COLUMNS = (
+    "points_given",
+    "points_received",
+    "posts_authored",
+    "recognitions_received",
+    "likes_received",
+)
+
+StatsDeltas = Dict[int, Dict[str, int]]
+
+RECOGNITION_TOPIC = "user_stats.recognition"
+
+
+def recognition_deltas(
+    sender_id: int,
+    recipients: Iterable[Tuple[int, int]],
+    authored_post: bool = False,
+) -> StatsDeltas:
+    """
+    Stat changes for a recognition sent by ``sender_id`` to
+    ``(recipient_id, points)`` pairs, optionally as a new post.
+    """
+    deltas: StatsDeltas = defaultdict(lambda: dict.fromkeys(STAT_COLUMNS, 0))
+    for recipient_id, points in recipients:
+        deltas[sender_id]["points_given"] += points
+        deltas[recipient_id]["points_received"] += points
+        deltas[recipient_id]["recognitions_received"] += 1
+    if authored_post:
+        deltas[sender_id]["posts_authored"] += 1
+    return deltas
+
+
+def apply_deltas(deltas: StatsDeltas) -> Insert:
+    """
+    Multi-row upsert adding ``deltas`` to the users' stats rows, creating rows
+    that do not exist yet. Rows are written in user id order so concurrent
+    writers lock them consistently.
+    """
+    rows = [
+        {"user_id": user_id, **{column: delta.get(column, 0) for column in STAT_COLUMNS}}
+        for user_id, delta in sorted(deltas.items())
+    ]
+    stmt = insert(UserStats).values(rows)
+    set_ = {column: getattr(UserStats, column) + getattr(stmt.excluded, column) for column in STAT_COLUMNS}
+    set_["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=[UserStats.user_id], set_=set_)
+
+
+def credit_likes_received(authors: Select) -> Insert:
+    """
+    INSERT ... SELECT adding likes to the authors produced by ``authors``,
+    a select of ``(user_id, delta)`` rows.
+    """
+    stats = UserStats.__table__
+    stmt = insert(stats).from_select(["user_id", "likes_received"], authors, include_defaults=False)
+    return stmt.on_conflict_do_update(
+        index_elements=[stats.c.user_id],
+        set_={
+            "likes_received": stats.c.likes_received + stmt.excluded.likes_received,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def enqueue_recognition(
+    db: AsyncSession,
+    sender_id: int,
+    recipients: Iterable[Tuple[int, int]],
+    authored_post: bool = False,
+) -> None:
+    """
+    Queue the stat changes of a recognition in the caller's transaction;
+    the outbox worker applies them after commit.
+    """
+    outbox.enqueue(db, RECOGNITION_TOPIC, {
+        "sender_id": sender_id,
+        "recipients": [[recipient_id, points] for recipient_id, points in recipients],
+        "authored_post": authored_post,
+    })
+
+
+@outbox.handler(RECOGNITION_TOPIC)
+async def _apply_recognitions(db: AsyncSession, payloads: List[Dict[str, Any]]) -> None:
+    # Merge the whole batch into a single upsert
+    merged: StatsDeltas = defaultdict(lambda: dict.fromkeys(STAT_COLUMNS, 0))
+    for payload in payloads:
+        deltas = recognition_deltas(
+            payload["sender_id"],
+            [tuple(recipient) for recipient in payload["recipients"]],
+            authored_post=payload["authored_post"],
+        )
+        for user_id, delta in deltas.items():
+            for column, value in delta.items():
+                merged[user_id][column] += value
+    await db.execute(apply_deltas(merged))
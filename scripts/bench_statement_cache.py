@@ -0,0 +1,293 @@
+"""
+Measure per-query latency for each DB_CONNECTION_MODE, directly against
+Postgres and through a transaction-pooling proxy standing in for PgBouncer.
+
+    python scripts/bench_statement_cache.py [--dsn postgresql://postgres@localhost/app]
+        [--cache-sizes 0 100 500] [--concurrency 16] [--server-connections 4]
+        [--duration 10]
+
+Every query runs in its own transaction on a pooled connection, the way a
+request does. The stand-in hands each client transaction to whichever of
+``--server-connections`` server connections is free, like PgBouncer's
+pool_mode=transaction, so statements cached by one transaction are usually
+missing in the next; errors are counted instead of aborting the run.
+
+Meant for a local database: no TLS, and the stand-in logs in to Postgres
+with trust, password or md5 authentication (not SCRAM).
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.constants import DBConnectionMode  # noqa: E402
+from app.db.session import statement_cache_args  # noqa: E402
+from app.models.models import Comment, PointsRecipient, PointsTransaction, Post, User  # noqa: E402
+
+SSL_REQUEST = 80877103
+GSSENC_REQUEST = 80877104
+CANCEL_REQUEST = 80877102
+PROTOCOL_VERSION = 196608
+
+Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+def message(kind: bytes, body: bytes = b"") -> bytes:
+    return kind + struct.pack("!i", len(body) + 4) + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+    header = await reader.readexactly(5)
+    length = struct.unpack("!i", header[1:])[0]
+    return header[:1], await reader.readexactly(length - 4)
+
+
+class TransactionPoolStandIn:
+    """
+    Minimal PgBouncer pool_mode=transaction: clients are accepted without
+    authentication and each of their transactions is forwarded to a free
+    server connection, which is returned to the pool as soon as the server
+    reports the session idle again.
+    """
+
+    def __init__(self, dsn: str, server_connections: int) -> None:
+        url = urlparse(dsn)
+        self.host = url.hostname or "localhost"
+        self.port = url.port or 5432
+        self.user = url.username or "postgres"
+        self.password = url.password or ""
+        self.database = url.path.lstrip("/") or self.user
+        self.server_connections = server_connections
+        self._idle: "asyncio.Queue[Streams]" = asyncio.Queue()
+        self._parameters: Dict[str, str] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._closing = False
+        self.port_listening = 0
+
+    async def start(self) -> None:
+        for _ in range(self.server_connections):
+            self._idle.put_nowait(await self._connect_server())
+        self._server = await asyncio.start_server(self._serve_client, "127.0.0.1", 0)
+        self.port_listening = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._closing = True
+        self._server.close()
+        # Closing the sockets ends each client loop on its next read
+        for writer in self._clients.values():
+            writer.close()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        while not self._idle.empty():
+            _, writer = self._idle.get_nowait()
+            writer.write(message(b"X"))
+            writer.close()
+
+    async def _connect_server(self) -> Streams:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        params = b"".join(
+            key.encode() + b"\0" + value.encode() + b"\0"
+            for key, value in (("user", self.user), ("database", self.database), ("client_encoding", "UTF8"))
+        ) + b"\0"
+        writer.write(struct.pack("!ii", len(params) + 8, PROTOCOL_VERSION) + params)
+        while True:
+            kind, body = await read_message(reader)
+            if kind == b"R":
+                code = struct.unpack("!i", body[:4])[0]
+                if code == 3:
+                    writer.write(message(b"p", self.password.encode() + b"\0"))
+                elif code == 5:
+                    inner = hashlib.md5((self.password + self.user).encode()).hexdigest()
+                    outer = hashlib.md5(inner.encode() + body[4:8]).hexdigest()
+                    writer.write(message(b"p", b"md5" + outer.encode() + b"\0"))
+                elif code != 0:
+                    raise RuntimeError(f"stand-in cannot do authentication method {code}")
+            elif kind == b"S":
+                key, value = body.split(b"\0")[:2]
+                self._parameters[key.decode()] = value.decode()
+            elif kind == b"E":
+                raise RuntimeError(f"server rejected stand-in connection: {body!r}")
+            elif kind == b"Z":
+                return reader, writer
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        server: Optional[Streams] = None
+        relay: Optional[asyncio.Task] = None
+        self._clients[asyncio.current_task()] = writer
+        try:
+            while True:
+                length, code = struct.unpack("!ii", await reader.readexactly(8))
+                await reader.readexactly(length - 8)
+                if code in (SSL_REQUEST, GSSENC_REQUEST):
+                    writer.write(b"N")
+                    continue
+                if code == CANCEL_REQUEST:
+                    return
+                break
+
+            writer.write(message(b"R", struct.pack("!i", 0)))
+            for key, value in self._parameters.items():
+                writer.write(message(b"S", key.encode() + b"\0" + value.encode() + b"\0"))
+            writer.write(message(b"K", struct.pack("!ii", os.getpid(), random.getrandbits(31))))
+            writer.write(message(b"Z", b"I"))
+            await writer.drain()
+
+            released = asyncio.Event()
+            while True:
+                kind, body = await read_message(reader)
+                if kind == b"X":
+                    return
+                if server is None or released.is_set():
+                    server = await self._idle.get()
+                    released = asyncio.Event()
+                    relay = asyncio.create_task(self._relay(server, writer, released))
+                server[1].write(message(kind, body))
+                await server[1].drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.pop(asyncio.current_task(), None)
+            if relay is not None and not relay.done():
+                # Client left mid-transaction: the server connection is dirty
+                relay.cancel()
+                server[1].close()
+                if not self._closing:
+                    self._idle.put_nowait(await self._connect_server())
+            writer.close()
+
+    async def _relay(self, server: Streams, client: asyncio.StreamWriter, released: asyncio.Event) -> None:
+        reader, _ = server
+        while True:
+            kind, body = await read_message(reader)
+            if kind == b"Z" and body == b"I":
+                # Back to the pool before the client can start its next transaction
+                released.set()
+                self._idle.put_nowait(server)
+                client.write(message(kind, body))
+                await client.drain()
+                return
+            client.write(message(kind, body))
+            await client.drain()
+
+
+# A request's worth of typical reads, each with the parameter it takes
+QUERIES = [
+    (select(User).where(User.id == bindparam("user_id")), "user_id"),
+    (
+        select(Post)
+        .where(Post.company_id == bindparam("company_id"))
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(20),
+        "company_id",
+    ),
+    (
+        select(Comment)
+        .where(Comment.post_id == bindparam("post_id"))
+        .order_by(Comment.created_at.desc())
+        .limit(20),
+        "post_id",
+    ),
+    (
+        select(PointsTransaction)
+        .join(PointsRecipient, PointsRecipient.transaction_id == PointsTransaction.id)
+        .where(PointsRecipient.recipient_id == bindparam("user_id"))
+        .order_by(PointsTransaction.created_at.desc())
+        .limit(20),
+        "user_id",
+    ),
+]
+
+
+async def run(url: str, mode: DBConnectionMode, cache_size: int, concurrency: int, duration: float) -> Tuple[List[float], int]:
+    engine = create_async_engine(
+        url,
+        pool_size=concurrency,
+        max_overflow=0,
+        connect_args=statement_cache_args(mode, cache_size),
+    )
+    latencies: List[float] = []
+    errors = 0
+
+    async def client_loop(deadline: float, record: bool) -> None:
+        nonlocal errors
+        rng = random.Random()
+        while time.monotonic() < deadline:
+            query, param = rng.choice(QUERIES)
+            started = time.perf_counter()
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(query, {param: rng.randint(1, 1000)})
+                    await conn.commit()
+            except Exception:
+                if record:
+                    errors += 1
+                continue
+            if record:
+                latencies.append(time.perf_counter() - started)
+
+    try:
+        # Warm-up opens the pool and fills the statement caches
+        await asyncio.gather(*(client_loop(time.monotonic() + 1, False) for _ in range(concurrency)))
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(client_loop(deadline, True) for _ in range(concurrency)))
+    finally:
+        await engine.dispose()
+    return latencies, errors
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def bench(args: argparse.Namespace) -> None:
+    standin = TransactionPoolStandIn(args.dsn, args.server_connections)
+    await standin.start()
+    url = urlparse(args.dsn)
+    targets = {
+        "postgres": args.dsn,
+        "stand-in": url._replace(netloc=f"{url.username or 'postgres'}@127.0.0.1:{standin.port_listening}").geturl(),
+    }
+    runs = [(DBConnectionMode.DIRECT, size) for size in args.cache_sizes] + [(DBConnectionMode.PGBOUNCER, 0)]
+
+    print(f"{'mode':>10} {'cache':>6} {'target':>9} {'queries':>8} {'errors':>7} {'mean ms':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    try:
+        for mode, cache_size in runs:
+            for target, dsn in targets.items():
+                async_url = dsn.replace("postgresql://", "postgresql+asyncpg://", 1)
+                latencies, errors = await run(async_url, mode, cache_size, args.concurrency, args.duration)
+                mean = sum(latencies) / len(latencies) if latencies else float("nan")
+                print(
+                    f"{mode.value:>10} {cache_size:>6} {target:>9} {len(latencies):>8} {errors:>7} "
+                    f"{mean * 1000:>8.2f} {percentile(latencies, 0.50) * 1000:>7.2f} {percentile(latencies, 0.99) * 1000:>7.2f}"
+                )
+    finally:
+        await standin.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL", "postgresql://postgres@localhost:5432/app"))
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[0, 100, 500])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--server-connections", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure API throughput for different worker counts of app.server.
+
+    python scripts/bench_workers.py [--workers 1 2 4 8] [--path /health/live]
+        [--token ACCESS_TOKEN] [--concurrency 64] [--duration 15]
+
+Starts the server once per worker count, drives it with a fixed number of
+concurrent keep-alive clients and prints requests/s, latency percentiles and
+failed connections.
+Needs the same environment (.env) as the application itself.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+import httpx
+
+
+async def wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+async def drive(url: str, token: Optional[str], concurrency: int, duration: float) -> Tuple[List[float], int]:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+        async def client_loop() -> None:
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                except httpx.TransportError:
+                    # Mostly keep-alive connections the server closed just
+                    # as they were reused
+                    errors += 1
+                    continue
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--path", default="/health/live")
+    parser.add_argument("--token")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    print(f"{'workers':>7} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.port)],
+            env=os.environ.copy(),
+        )
+        try:
+            asyncio.run(wait_until_up(f"{base}/health/ready"))
+            latencies, errors = asyncio.run(drive(base + args.path, args.token, args.concurrency, args.duration))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        print(
+            f"{workers:>7} {len(latencies) / args.duration:>10.0f} "
+            f"{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
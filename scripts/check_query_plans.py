@@ -0,0 +1,410 @@
+"""
+Query-plan regression check for every API endpoint.
+
+    python scripts/check_query_plans.py [--skip-seed] [--max-buffers 20000]
+        [--max-rows 100000] [--large-table-rows 10000] [--snapshot-dir query_plans]
+
+Runs against a disposable local Postgres at DATABASE_URL that has been
+migrated with alembic (set DB_SSL=false if it has no TLS):
+
+1. Seeds it with ``app.commands.generate_data`` unless ``--skip-seed``.
+2. Calls every route under /api/v1 in-process as a user of the largest
+   generated company; a route without a scenario below is an error.
+3. Runs ``EXPLAIN (ANALYZE, BUFFERS)`` on every statement each call
+   emitted. Data-changing statements are analyzed in a transaction that
+   is rolled back.
+4. Fails on a sequential scan of a table with more than
+   ``--large-table-rows`` rows, a statement touching more than
+   ``--max-buffers`` shared buffers, or a plan node producing more than
+   ``--max-rows`` rows.
+5. Writes each endpoint's plans (COSTS OFF) to ``--snapshot-dir``, so a
+   plan change shows up in ``git diff``.
+
+Exits with status 1 when a check fails.
+"""
+import argparse
+import asyncio
+import contextvars
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Statements from background workers would land in whichever scenario runs
+os.environ.setdefault("OUTBOX_WORKERS", "0")
+os.environ.setdefault("BLOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "plan-check-blobs"))
+
+import asyncpg  # noqa: E402
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.session import get_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import balance_snapshots  # noqa: E402
+
+SEED_ARGS = ["--companies", "20", "--users", "5000", "--posts", "100000", "--seed", "7"]
+SEED_PASSWORD = "loadtest-password"
+EXPLAINED = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+class Statement(NamedTuple):
+    sql: str
+    params: Tuple[Any, ...]
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    route: str
+    # Builds the request from the context: (path, request kwargs)
+    request: Callable[[Dict[str, Any]], Tuple[str, Dict[str, Any]]]
+
+
+_captured: contextvars.ContextVar[Optional[List[Statement]]] = contextvars.ContextVar("captured", default=None)
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany) -> None:
+    captured = _captured.get()
+    if captured is not None and EXPLAINED.match(statement):
+        # Batched inserts ("insertmanyvalues") arrive as one flat statement
+        if executemany and parameters and isinstance(parameters[0], (list, tuple)):
+            parameters = parameters[0]
+        captured.append(Statement(statement, tuple(parameters or ())))
+
+
+def _png() -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (640, 480), (46, 139, 87)).save(out, "PNG")
+    return out.getvalue()
+
+
+def _auth(ctx: Dict[str, Any], who: str = "admin") -> Dict[str, str]:
+    return {"Authorization": f"Bearer {ctx[who + '_token']}"}
+
+
+SCENARIOS = [
+    Scenario("auth_signup", "POST", "/api/v1/auth/signup", lambda ctx: ("/api/v1/auth/signup", {"json": {
+        "full_name": "Plan Check", "email": f"plan-{uuid.uuid4().hex[:8]}@example.com",
+        "password": SEED_PASSWORD, "company_name": ctx["company_name"],
+    }})),
+    Scenario("auth_login", "POST", "/api/v1/auth/login", lambda ctx: ("/api/v1/auth/login", {
+        "data": {"username": ctx["admin_email"], "password": SEED_PASSWORD},
+    })),
+    Scenario("auth_refresh", "POST", "/api/v1/auth/refresh", lambda ctx: ("/api/v1/auth/refresh", {
+        "json": {"refresh_token": ctx["refresh_token"]},
+    })),
+    Scenario("auth_test_token", "POST", "/api/v1/auth/test-token", lambda ctx: ("/api/v1/auth/test-token", {
+        "headers": _auth(ctx),
+    })),
+    Scenario("users_me", "GET", "/api/v1/users/me", lambda ctx: ("/api/v1/users/me", {"headers": _auth(ctx)})),
+    Scenario("users_update_me", "PUT", "/api/v1/users/me", lambda ctx: ("/api/v1/users/me", {
+        "headers": _auth(ctx), "json": {"full_name": f"Plan Check Admin {uuid.uuid4().hex[:8]}"},
+    })),
+    Scenario("users_batch", "GET", "/api/v1/users/batch", lambda ctx: ("/api/v1/users/batch", {
+        "headers": _auth(ctx), "params": {"ids": ",".join(map(str, ctx["user_ids"]))},
+    })),
+    Scenario("users_search", "GET", "/api/v1/users/search", lambda ctx: ("/api/v1/users/search", {
+        "headers": _auth(ctx), "params": {"q": "syn"},
+    })),
+    Scenario("users_company", "GET", "/api/v1/users/company/{company_id}", lambda ctx: (
+        f"/api/v1/users/company/{ctx['company_id']}", {"headers": _auth(ctx)},
+    )),
+    Scenario("users_invite", "POST", "/api/v1/users/invite", lambda ctx: ("/api/v1/users/invite", {
+        "headers": _auth(ctx),
+        "files": {"file": ("invites.csv", "email,full_name\n" + "".join(
+            f"plan-{uuid.uuid4().hex[:8]}@example.com,Invited {i}\n" for i in range(5)
+        ), "text/csv")},
+    })),
+    Scenario("users_stats", "GET", "/api/v1/users/{user_id}/stats", lambda ctx: (
+        f"/api/v1/users/{ctx['member_id']}/stats", {"headers": _auth(ctx)},
+    )),
+    Scenario("users_giveable_points", "PUT", "/api/v1/users/{user_id}/giveable-points", lambda ctx: (
+        f"/api/v1/users/{ctx['member_id']}/giveable-points", {"headers": _auth(ctx), "params": {"points": 500}},
+    )),
+    Scenario("posts_create", "POST", "/api/v1/posts", lambda ctx: ("/api/v1/posts", {
+        "headers": _auth(ctx),
+        "json": {"content": "Plan check", "points": 1, "recipients": [{"user_id": ctx["member_id"], "points": 1}]},
+    })),
+    Scenario("posts_batch", "GET", "/api/v1/posts/batch", lambda ctx: ("/api/v1/posts/batch", {
+        "headers": _auth(ctx), "params": {"ids": ",".join(map(str, ctx["post_ids"]))},
+    })),
+    Scenario("posts_company", "GET", "/api/v1/posts/company/{company_id}", lambda ctx: (
+        f"/api/v1/posts/company/{ctx['company_id']}", {"headers": _auth(ctx), "params": {"limit": 20}},
+    )),
+    Scenario("posts_feed", "GET", "/api/v1/posts/company/{company_id}/feed", lambda ctx: (
+        f"/api/v1/posts/company/{ctx['company_id']}/feed", {"headers": _auth(ctx), "params": {"limit": 20}},
+    )),
+    Scenario("posts_company_top", "GET", "/api/v1/posts/company/{company_id}", lambda ctx: (
+        f"/api/v1/posts/company/{ctx['company_id']}", {"headers": _auth(ctx), "params": {"limit": 20, "sort": "top"}},
+    )),
+    Scenario("posts_feed_top", "GET", "/api/v1/posts/company/{company_id}/feed", lambda ctx: (
+        f"/api/v1/posts/company/{ctx['company_id']}/feed", {"headers": _auth(ctx), "params": {"limit": 20, "sort": "top"}},
+    )),
+    Scenario("posts_like", "POST", "/api/v1/posts/{post_id}/like", lambda ctx: (
+        f"/api/v1/posts/{ctx['post_id']}/like", {"headers": _auth(ctx)},
+    )),
+    Scenario("posts_unlike", "DELETE", "/api/v1/posts/{post_id}/like", lambda ctx: (
+        f"/api/v1/posts/{ctx['post_id']}/like", {"headers": _auth(ctx)},
+    )),
+    Scenario("comments_create", "POST", "/api/v1/comments", lambda ctx: ("/api/v1/comments", {
+        "headers": _auth(ctx),
+        "json": {
+            "content": "Plan check", "post_id": ctx["post_id"], "points": 1,
+            "recipients": [{"user_id": ctx["member_id"], "points": 1}],
+        },
+    })),
+    Scenario("comments_post", "GET", "/api/v1/comments/post/{post_id}", lambda ctx: (
+        f"/api/v1/comments/post/{ctx['post_id']}", {"headers": _auth(ctx), "params": {"limit": 20}},
+    )),
+    Scenario("comments_like", "POST", "/api/v1/comments/{comment_id}/like", lambda ctx: (
+        f"/api/v1/comments/{ctx['comment_id']}/like", {"headers": _auth(ctx)},
+    )),
+    Scenario("comments_unlike", "DELETE", "/api/v1/comments/{comment_id}/like", lambda ctx: (
+        f"/api/v1/comments/{ctx['comment_id']}/like", {"headers": _auth(ctx)},
+    )),
+    Scenario("attachments_upload", "POST", "/api/v1/attachments", lambda ctx: ("/api/v1/attachments", {
+        "headers": _auth(ctx), "files": {"file": ("plan-check.png", _png(), "image/png")},
+    })),
+    Scenario("attachments_download", "GET", "/api/v1/attachments/{attachment_id}", lambda ctx: (
+        f"/api/v1/attachments/{ctx['attachment_id']}", {"headers": {**_auth(ctx), "Range": "bytes=0-1023"}},
+    )),
+    Scenario("attachments_thumbnail", "GET", "/api/v1/attachments/{attachment_id}/thumbnail", lambda ctx: (
+        f"/api/v1/attachments/{ctx['attachment_id']}/thumbnail", {"headers": _auth(ctx)},
+    )),
+    Scenario("points_balance", "GET", "/api/v1/points/balance", lambda ctx: (
+        "/api/v1/points/balance", {"headers": _auth(ctx, "member")},
+    )),
+    Scenario("points_history_sent", "GET", "/api/v1/points/history/sent", lambda ctx: (
+        "/api/v1/points/history/sent", {"headers": _auth(ctx, "member"), "params": {"limit": 20}},
+    )),
+    Scenario("points_history_received", "GET", "/api/v1/points/history/received", lambda ctx: (
+        "/api/v1/points/history/received", {"headers": _auth(ctx, "member"), "params": {"limit": 20}},
+    )),
+    Scenario("points_company_transactions", "GET", "/api/v1/points/company/{company_id}/transactions", lambda ctx: (
+        f"/api/v1/points/company/{ctx['company_id']}/transactions", {"headers": _auth(ctx), "params": {"limit": 20}},
+    )),
+    # A week of ledger replayed on top of the snapshot taken in run_checks
+    Scenario("points_company_balances", "GET", "/api/v1/points/company/{company_id}/balances", lambda ctx: (
+        f"/api/v1/points/company/{ctx['company_id']}/balances",
+        {"headers": _auth(ctx), "params": {"as_of": (ctx["snapshot_at"] + timedelta(days=7)).isoformat()}},
+    )),
+    Scenario("points_admin_adjustment", "POST", "/api/v1/points/admin-adjustment", lambda ctx: (
+        "/api/v1/points/admin-adjustment",
+        {"headers": _auth(ctx), "params": {"user_id": ctx["member_id"], "points": 5, "notes": "plan check"}},
+    )),
+    Scenario("metrics", "GET", "/api/v1/metrics", lambda ctx: ("/api/v1/metrics", {"headers": _auth(ctx)})),
+    Scenario("auth_logout", "POST", "/api/v1/auth/logout", lambda ctx: ("/api/v1/auth/logout", {
+        "json": {"refresh_token": ctx["refresh_token"]},
+    })),
+    Scenario("users_delete", "DELETE", "/api/v1/users/{user_id}", lambda ctx: (
+        f"/api/v1/users/{ctx['invited_id']}", {"headers": _auth(ctx)},
+    )),
+]
+
+
+def missing_scenarios() -> List[str]:
+    covered = {(scenario.method, scenario.route) for scenario in SCENARIOS}
+    missing = []
+    for route in app.routes:
+        if not route.path.startswith(get_settings().API_V1_STR) or route.path.endswith("openapi.json"):
+            continue
+        for method in sorted(route.methods or ()):
+            if (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+async def load_context(conn: asyncpg.Connection) -> Dict[str, Any]:
+    company_id = await conn.fetchval(
+        "SELECT company_id FROM users WHERE deleted_at IS NULL GROUP BY company_id ORDER BY count(*) DESC, company_id LIMIT 1"
+    )
+    company_name = await conn.fetchval("SELECT name FROM companies WHERE id = $1", company_id)
+    admin_email = await conn.fetchval(
+        "SELECT email FROM users WHERE company_id = $1 AND role = 'admin' AND deleted_at IS NULL ORDER BY id LIMIT 1",
+        company_id,
+    )
+    # The most active member and the most liked post make the worst cases
+    member = await conn.fetchrow(
+        """
+        SELECT u.id, u.email FROM users u JOIN posts p ON p.author_id = u.id
+        WHERE u.company_id = $1 AND u.role = 'member' AND u.deleted_at IS NULL
+        GROUP BY u.id ORDER BY count(*) DESC LIMIT 1
+        """,
+        company_id,
+    )
+    post_id = await conn.fetchval(
+        "SELECT id FROM posts WHERE company_id = $1 ORDER BY like_count DESC, id LIMIT 1", company_id,
+    )
+    comment_id = await conn.fetchval(
+        "SELECT id FROM comments WHERE post_id = $1 ORDER BY id LIMIT 1", post_id,
+    )
+    user_ids = [row["id"] for row in await conn.fetch(
+        "SELECT id FROM users WHERE company_id = $1 ORDER BY id LIMIT 50", company_id,
+    )]
+    post_ids = [row["id"] for row in await conn.fetch(
+        "SELECT id FROM posts WHERE company_id = $1 ORDER BY id DESC LIMIT 50", company_id,
+    )]
+    if not (admin_email and member and post_id and comment_id):
+        raise SystemExit("Database has no seeded company with posts and comments; run without --skip-seed")
+    return {
+        "company_id": company_id,
+        "company_name": company_name,
+        "admin_email": admin_email,
+        "member_id": member["id"],
+        "member_email": member["email"],
+        "post_id": post_id,
+        "comment_id": comment_id,
+        "user_ids": user_ids,
+        "post_ids": post_ids,
+    }
+
+
+def _plan_nodes(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+async def explain(conn: asyncpg.Connection, statement: Statement) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Return the analyzed JSON plan (None if the statement could not be
+    re-run) and the generic COSTS OFF text plan.
+    """
+    analyzed = None
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        result = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement.sql}", *statement.params)
+        analyzed = json.loads(result)[0]
+    except asyncpg.PostgresError:
+        # e.g. re-inserting a row that is now a duplicate
+        pass
+    finally:
+        await transaction.rollback()
+    # The generic plan is what cached prepared statements settle on, and it
+    # keeps parameter values out of the snapshot
+    args = ", ".join(["NULL"] * len(statement.params))
+    async with conn.transaction():
+        await conn.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        await conn.execute(f"PREPARE plan_check AS {statement.sql}")
+        try:
+            rows = await conn.fetch(f"EXPLAIN (COSTS OFF) EXECUTE plan_check{f'({args})' if args else ''}")
+        finally:
+            await conn.execute("DEALLOCATE plan_check")
+    return analyzed, "\n".join(row[0] for row in rows)
+
+
+def check_plan(plan: Dict[str, Any], table_rows: Dict[str, float], args: argparse.Namespace) -> List[str]:
+    problems = []
+    top = plan["Plan"]
+    buffers = top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0)
+    if buffers > args.max_buffers:
+        problems.append(f"{buffers} shared buffers (limit {args.max_buffers})")
+    for node in _plan_nodes(top):
+        relation = node.get("Relation Name")
+        if node["Node Type"] == "Seq Scan" and table_rows.get(relation, 0) > args.large_table_rows:
+            problems.append(f"Seq Scan on {relation} ({table_rows[relation]:.0f} rows)")
+        produced = node.get("Actual Rows", 0) * node.get("Actual Loops", 1)
+        if produced > args.max_rows:
+            problems.append(f"{node['Node Type']} produced {produced} rows (limit {args.max_rows})")
+    return problems
+
+
+async def run_checks(args: argparse.Namespace) -> int:
+    dsn = get_settings().sync_database_url
+    explain_conn = await asyncpg.connect(dsn, ssl="require" if get_settings().DB_SSL else False)
+    event.listen(get_engine().sync_engine, "before_cursor_execute", _capture)
+    failures = 0
+    try:
+        ctx = await load_context(explain_conn)
+        ctx["snapshot_at"] = balance_snapshots.settled().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=8)
+        async with get_engine().begin() as conn:
+            await balance_snapshots.take_snapshot(conn, ctx["company_id"], ctx["snapshot_at"])
+        table_rows = {
+            row["relname"]: row["reltuples"]
+            for row in await explain_conn.fetch("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+        }
+        os.makedirs(args.snapshot_dir, exist_ok=True)
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://plan-check") as client:
+                for who in ("admin", "member"):
+                    response = await client.post(
+                        "/api/v1/auth/login", data={"username": ctx[f"{who}_email"], "password": SEED_PASSWORD},
+                    )
+                    response.raise_for_status()
+                    ctx[f"{who}_token"] = response.json()["access_token"]
+                    ctx.setdefault("refresh_token", response.json()["refresh_token"])
+
+                for scenario in SCENARIOS:
+                    path, kwargs = scenario.request(ctx)
+                    captured: List[Statement] = []
+                    token = _captured.set(captured)
+                    try:
+                        response = await client.request(scenario.method, path, **kwargs)
+                    finally:
+                        _captured.reset(token)
+                    if response.status_code >= 500:
+                        print(f"FAIL {scenario.name}: HTTP {response.status_code}")
+                        failures += 1
+                    if scenario.name == "auth_refresh" and response.status_code == 200:
+                        ctx["refresh_token"] = response.json()["refresh_token"]
+                    if scenario.name == "attachments_upload" and response.status_code == 201:
+                        ctx["attachment_id"] = response.json()["id"]
+                    if scenario.name == "users_invite" and response.status_code == 200:
+                        ctx["invited_id"] = next(
+                            result["user_id"] for result in response.json()["results"] if result["user_id"]
+                        )
+
+                    snapshot = [f"-- {scenario.method} {scenario.route}"]
+                    for index, statement in enumerate(captured, 1):
+                        analyzed, plan_text = await explain(explain_conn, statement)
+                        problems = check_plan(analyzed, table_rows, args) if analyzed else []
+                        for problem in problems:
+                            print(f"FAIL {scenario.name} statement {index}: {problem}")
+                        failures += len(problems)
+                        snapshot += ["", f"-- statement {index}", statement.sql.strip(), plan_text]
+                    with open(os.path.join(args.snapshot_dir, f"{scenario.name}.txt"), "w") as f:
+                        f.write("\n".join(snapshot) + "\n")
+                    print(f"{'ok' if response.status_code < 500 else '!!'} {scenario.name}: {len(captured)} statements")
+    finally:
+        await explain_conn.close()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse data from an earlier run")
+    parser.add_argument("--max-buffers", type=int, default=20000)
+    parser.add_argument("--max-rows", type=int, default=100000)
+    parser.add_argument("--large-table-rows", type=int, default=10000)
+    parser.add_argument("--snapshot-dir", default=os.path.join(os.path.dirname(__file__), "..", "query_plans"))
+    args = parser.parse_args()
+
+    missing = missing_scenarios()
+    if missing:
+        raise SystemExit(f"Routes without a plan-check scenario: {', '.join(missing)}")
+    if not args.skip_seed:
+        subprocess.run(
+            [sys.executable, "-m", "app.commands.generate_data", *SEED_ARGS, "--password", SEED_PASSWORD],
+            check=True,
+            cwd=os.path.join(os.path.dirname(__file__), ".."),
+        )
+
+    failures = asyncio.run(run_checks(args))
+    print(f"{failures} plan problems" if failures else "All plans within limits")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
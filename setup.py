@@ -6,13 +6,15 @@ setup(
     packages=find_packages(),
     install_requires=[
         "fastapi",
-        "uvicorn",
+        "uvicorn[standard]",
+        "gunicorn",
         "sqlalchemy",
         "pydantic",
         "pydantic-settings",
         "python-jose[cryptography]",
         "passlib[bcrypt]",
         "python-multipart",
+        "Pillow",
         "email-validator",
         "asyncpg",
         "alembic",
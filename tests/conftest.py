@@ -0,0 +1,57 @@
+"""
+Tests run the app in-process against the Postgres database in DATABASE_URL,
+migrated with ``alembic upgrade heads``:
+
+    DATABASE_URL=postgresql://postgres@localhost:5432/app_test DB_SSL=false pytest
+
+Every test signs up its own companies, so they can share a database with
+other data. Without DATABASE_URL the tests are skipped.
+"""
+import asyncio
+import os
+import uuid
+from typing import Any, Awaitable, Callable
+import httpx
+import pytest
+
+# Settings the app requires but the tests don't use; a fixed bcrypt cost
+# skips the startup calibration
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+os.environ.setdefault("SUPABASE_KEY", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("BCRYPT_ROUNDS", "10")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.getenv("DATABASE_URL"):
+        return
+    skip = pytest.mark.skip(reason="needs a migrated Postgres database in DATABASE_URL")
+    for item in items:
+        item.add_marker(skip)
+
+
+@pytest.fixture
+def run_app() -> Callable[[Callable[[httpx.AsyncClient], Awaitable[Any]]], Any]:
+    """
+    Run ``scenario(client)`` against a fresh app (with its lifespan) in an
+    event loop of its own and return its result.
+    """
+    def run(scenario: Callable[[httpx.AsyncClient], Awaitable[Any]]) -> Any:
+        from app.main import create_app
+
+        async def main() -> Any:
+            app = create_app()
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def company_name() -> str:
+    return f"Test Company {uuid.uuid4().hex[:12]}"
+
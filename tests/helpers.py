@@ -0,0 +1,20 @@
+import uuid
+from typing import Any, Dict, Optional
+import httpx
+
+PASSWORD = "test-password"
+
+
+async def signup(client: httpx.AsyncClient, company_name: str, email: Optional[str] = None) -> Dict[str, Any]:
+    email = email or f"{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post("/api/v1/auth/signup", json={
+        "email": email, "password": PASSWORD, "full_name": email.split("@")[0], "company_name": company_name,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def login(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,42 @@
+import asyncio
+from sqlalchemy import func, select, text
+from app.db.session import get_engine
+from app.models.models import AuditEntry
+from app.services import audit
+from tests.helpers import login, signup
+
+
+def test_verify_detects_an_altered_entry(run_app, company_name):
+    async def scenario(client):
+        sender = await signup(client, company_name)
+        recipient = await signup(client, company_name)
+        headers = await login(client, sender["email"])
+        for points in (1, 2):
+            response = await client.post("/api/v1/posts", headers=headers, json={
+                "content": "thanks", "points": points, "recipients": [{"user_id": recipient["id"], "points": points}],
+            })
+            assert response.status_code == 200, response.text
+
+        company_id = sender["company_id"]
+        async with get_engine().connect() as conn:
+            # Entries are appended by the outbox worker
+            while await conn.scalar(select(func.count()).where(AuditEntry.company_id == company_id)) < 2:
+                await conn.rollback()
+                await asyncio.sleep(0.05)
+            intact = [report async for report in audit.verify_chains(conn, [company_id])]
+
+            # Tamper inside a transaction that is rolled back; the
+            # append-only trigger has to be bypassed to do it at all
+            await conn.execute(text("SET LOCAL session_replication_role = replica"))
+            await conn.execute(
+                text("UPDATE audit_log SET changes = '[]' WHERE company_id = :company_id AND seq = 1"),
+                {"company_id": company_id},
+            )
+            altered = [report async for report in audit.verify_chains(conn, [company_id])]
+            await conn.rollback()
+        return intact, altered
+
+    intact, altered = run_app(scenario)
+    assert [(report.entries, report.error) for report in intact] == [(intact[0].entries, None)]
+    assert intact[0].entries >= 2
+    assert len(altered) == 1 and altered[0].error == "seq 1 does not match its hash (entry altered)"
@@ -0,0 +1,61 @@
+from typing import List
+from sqlalchemy import event
+from app.db.session import get_engine
+from tests.helpers import login, signup
+
+POSTS = 5
+
+
+def test_feed_query_count_does_not_depend_on_page_size(run_app, company_name):
+    async def scenario(client):
+        author = await signup(client, company_name)
+        member = await signup(client, company_name)
+        author_headers = await login(client, author["email"])
+        member_headers = await login(client, member["email"])
+        for i in range(POSTS):
+            response = await client.post("/api/v1/posts", headers=author_headers, json={
+                "content": f"post {i}", "points": 1, "recipients": [{"user_id": member["id"], "points": 1}],
+            })
+            assert response.status_code == 200, response.text
+            post_id = response.json()["id"]
+        response = await client.post(
+            "/api/v1/comments", headers=member_headers, json={
+                "content": "thanks", "post_id": post_id, "points": 1,
+                "recipients": [{"user_id": author["id"], "points": 1}],
+            },
+        )
+        assert response.status_code == 200, response.text
+        response = await client.post(f"/api/v1/posts/{post_id}/like", headers=member_headers)
+        assert response.status_code == 200, response.text
+
+        statements: List[str] = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = get_engine().sync_engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            pages = {}
+            for limit in (1, POSTS):
+                statements.clear()
+                response = await client.get(
+                    f"/api/v1/posts/company/{author['company_id']}/feed",
+                    params={"limit": limit}, headers=member_headers,
+                )
+                assert response.status_code == 200, response.text
+                pages[limit] = (len(statements), response.json())
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        return pages
+
+    pages = run_app(scenario)
+    (single_count, single), (full_count, full) = pages[1], pages[POSTS]
+    assert len(single) == 1 and len(full) == POSTS
+    assert single_count == full_count
+
+    newest = full[0]
+    assert newest["like_count"] == 1 and newest["liked_by_me"]
+    assert newest["comment_count"] == 1 and len(newest["latest_comments"]) == 1
+    assert [recipient["points"] for recipient in newest["recipients"]] == [1]
+    assert all(card["like_count"] == 0 and not card["liked_by_me"] for card in full[1:])
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import select
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import Post, PostLike
+from app.services.like_buffer import LikeBuffer
+from tests.helpers import login, signup
+
+
+@pytest.fixture
+def like_buffer_enabled(monkeypatch):
+    monkeypatch.setenv("LIKE_BUFFER_ENABLED", "true")
+    # Long enough that the likes are still buffered when the response is built
+    monkeypatch.setenv("LIKE_BUFFER_FLUSH_MS", "60000")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+async def _post(client, headers, recipient_id):
+    response = await client.post("/api/v1/posts", headers=headers, json={
+        "content": "thanks", "points": 1, "recipients": [{"user_id": recipient_id, "points": 1}],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_buffered_like_counts_itself(run_app, company_name, like_buffer_enabled):
+    async def scenario(client):
+        author = await signup(client, company_name)
+        member = await signup(client, company_name)
+        post_id = await _post(client, await login(client, author["email"]), member["id"])
+        headers = await login(client, member["email"])
+        liked = await client.post(f"/api/v1/posts/{post_id}/like", headers=headers)
+        unliked = await client.delete(f"/api/v1/posts/{post_id}/like", headers=headers)
+        return liked, unliked
+
+    liked, unliked = run_app(scenario)
+    assert liked.status_code == 200 and liked.json()["like_count"] == 1
+    assert unliked.status_code == 200 and unliked.json()["like_count"] == 0
+
+
+def test_flush_skips_likes_of_missing_posts(run_app, company_name):
+    async def scenario(client):
+        author = await signup(client, company_name)
+        member = await signup(client, company_name)
+        post_id = await _post(client, await login(client, author["email"]), member["id"])
+        async with AsyncSessionLocal() as db:
+            missing_id = (await db.scalar(select(Post.id).order_by(Post.id.desc()).limit(1))) + 1000
+
+        buffer = LikeBuffer()
+        buffer._session_factory = AsyncSessionLocal
+        buffer.like(post_id, member["id"])
+        buffer.like(missing_id, member["id"])
+        await buffer.flush()
+
+        async with AsyncSessionLocal() as db:
+            like_count = await db.scalar(select(Post.like_count).where(Post.id == post_id))
+            likes = (await db.execute(
+                select(PostLike.post_id).where(PostLike.user_id == member["id"])
+            )).scalars().all()
+        return buffer, post_id, like_count, likes
+
+    buffer, post_id, like_count, likes = run_app(scenario)
+    assert like_count == 1 and likes == [post_id]
+    assert buffer._pending == {} and buffer._failing_since == {}
@@ -0,0 +1,55 @@
+import asyncio
+import gc
+from app.models.models import User
+from app.services.loaders import BatchLoader
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self.rows
+
+
+class _Row:
+    def __init__(self, id):
+        self.id = id
+
+
+class _Session:
+    def __init__(self, error=None):
+        self.error = error
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        # Give the garbage collector a chance at an unreferenced fetch task
+        gc.collect()
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return _Result([_Row(1), _Row(2)])
+
+
+def test_one_tick_of_loads_is_one_query():
+    async def main():
+        db = _Session()
+        loader = BatchLoader(db, User)
+        rows = await asyncio.wait_for(loader.load_many([1, 2, 3]), 5)
+        return db, loader, rows
+
+    db, loader, rows = asyncio.run(main())
+    assert db.queries == 1
+    assert [row and row.id for row in rows] == [1, 2, None]
+    assert loader._fetches == set()
+
+
+def test_fetch_errors_reach_every_waiting_load():
+    async def main():
+        loader = BatchLoader(_Session(RuntimeError("database went away")), User)
+        return await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ["database went away"] * 2
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from sqlalchemy import text
+from app.db.session import get_engine
+from app.services.ledger_partitions import archive_path, read_archived_transactions
+from tests.helpers import login, signup
+
+
+def test_recipients_share_their_transactions_created_at(run_app, company_name):
+    async def scenario(client):
+        admin = await signup(client, company_name)
+        member = await signup(client, company_name)
+        admin_headers = await login(client, admin["email"])
+        member_headers = await login(client, member["email"])
+        response = await client.post("/api/v1/posts", headers=admin_headers, json={
+            "content": "thanks", "points": 2, "recipients": [{"user_id": member["id"], "points": 2}],
+        })
+        assert response.status_code == 200, response.text
+        response = await client.post("/api/v1/comments", headers=member_headers, json={
+            "content": "thank you", "post_id": response.json()["id"], "points": 1,
+            "recipients": [{"user_id": admin["id"], "points": 1}],
+        })
+        assert response.status_code == 200, response.text
+        response = await client.post(
+            "/api/v1/points/admin-adjustment", headers=admin_headers,
+            params={"user_id": member["id"], "points": 5, "notes": "bonus"},
+        )
+        assert response.status_code == 200, response.text
+        response = await client.get(
+            f"/api/v1/points/company/{admin['company_id']}/transactions",
+            params={"archived_month": "2000-01"}, headers=admin_headers,
+        )
+        assert response.status_code == 200, response.text
+        assert response.json() == []
+
+        async with get_engine().connect() as conn:
+            result = await conn.execute(
+                text(
+                    """
+                    SELECT t.transaction_type, t.created_at = r.created_at
+                    FROM points_transactions t JOIN points_recipients r ON r.transaction_id = t.id
+                    WHERE t.company_id = :company_id
+                    """
+                ),
+                {"company_id": admin["company_id"]},
+            )
+            return result.all()
+
+    rows = run_app(scenario)
+    assert {transaction_type for transaction_type, _ in rows} >= {
+        "recognition", "comment_recognition", "admin_adjustment",
+    }
+    assert all(same for _, same in rows)
+
+
+def _write_archive(archive_dir, table, month, rows):
+    path = archive_path(archive_dir, table, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row) + "\n")
+
+
+def test_archived_transactions_find_recipients_past_the_month_boundary(tmp_path):
+    november = datetime(2024, 11, 1, tzinfo=timezone.utc)
+    december = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    _write_archive(str(tmp_path), "points_transactions", november, [
+        {"id": 1, "company_id": 1, "sender_id": 10, "transaction_type": "recognition",
+         "created_at": "2024-11-30T23:59:59.999+00:00"},
+        {"id": 2, "company_id": 2, "sender_id": 20, "transaction_type": "recognition",
+         "created_at": "2024-11-15T12:00:00+00:00"},
+    ])
+    _write_archive(str(tmp_path), "points_recipients", november, [
+        {"transaction_id": 2, "recipient_id": 21, "points_amount": 3, "created_at": "2024-11-15T12:00:00+00:00"},
+    ])
+    # Written after its transaction with its own now()
+    _write_archive(str(tmp_path), "points_recipients", december, [
+        {"transaction_id": 1, "recipient_id": 11, "points_amount": 4, "created_at": "2024-12-01T00:00:00.002+00:00"},
+    ])
+
+    rows = read_archived_transactions(str(tmp_path), november, company_id=1)
+    assert [row["id"] for row in rows] == [1]
+    assert rows[0]["recipients"] == [{"user_id": 11, "points": 4}]
+    assert [row["id"] for row in read_archived_transactions(str(tmp_path), november, recipient_id=11)] == [1]
@@ -0,0 +1,37 @@
+import asyncio
+from sqlalchemy import func, select
+from app.db.session import AsyncSessionLocal
+from app.models.models import PointsTransaction, Post, User
+from tests.helpers import login, signup
+
+
+def test_concurrent_recognitions_cannot_overdraw(run_app, company_name):
+    async def scenario(client):
+        sender = await signup(client, company_name)
+        recipient = await signup(client, company_name)
+        headers = await login(client, sender["email"])
+        points = sender["giveable_points"] // 2 + 1
+
+        async def recognize():
+            return await client.post("/api/v1/posts", headers=headers, json={
+                "content": "thanks", "points": points, "recipients": [{"user_id": recipient["id"], "points": points}],
+            })
+
+        responses = await asyncio.gather(recognize(), recognize())
+        async with AsyncSessionLocal() as db:
+            balances = dict((await db.execute(
+                select(User.id, User.giveable_points).where(User.id.in_([sender["id"], recipient["id"]]))
+            )).all())
+            posts = await db.scalar(select(func.count()).where(Post.author_id == sender["id"]))
+            transactions = await db.scalar(
+                select(func.count()).where(PointsTransaction.sender_id == sender["id"]).where(PointsTransaction.post_id.is_not(None))
+            )
+        return sender, points, responses, balances, posts, transactions
+
+    sender, points, responses, balances, posts, transactions = run_app(scenario)
+    assert sorted(response.status_code for response in responses) == [200, 400]
+    refused = next(response for response in responses if response.status_code == 400)
+    assert refused.json()["detail"] == "Not enough points available"
+    assert balances[sender["id"]] == sender["giveable_points"] - points
+    # Nothing of the refused recognition was committed
+    assert posts == 1 and transactions == 1
@@ -0,0 +1,37 @@
+import asyncio
+from app.db.session import AsyncSessionLocal
+from app.services.roster import RosterCache
+from tests.helpers import signup
+
+
+def test_evicted_companies_leave_nothing_behind(run_app, company_name):
+    async def scenario(client):
+        first = await signup(client, company_name)
+        second = await signup(client, company_name + " second")
+        cache = RosterCache(max_companies=1)
+        async with AsyncSessionLocal() as db:
+            rosters = await asyncio.gather(*(cache.get(db, first["company_id"]) for _ in range(3)))
+            await cache.get(db, second["company_id"])
+        return cache, first, second, rosters
+
+    cache, first, second, rosters = run_app(scenario)
+    # Concurrent misses share one load
+    assert rosters[0] is rosters[1] is rosters[2] and first["id"] in rosters[0]
+    assert list(cache._rosters) == [second["company_id"]]
+    assert cache._loads == {}
+
+
+def test_invalidate_during_a_load_is_not_cached(run_app, company_name):
+    async def scenario(client):
+        user = await signup(client, company_name)
+        cache = RosterCache()
+        async with AsyncSessionLocal() as db:
+            load = asyncio.ensure_future(cache.get(db, user["company_id"]))
+            while user["company_id"] not in cache._loads:
+                await asyncio.sleep(0)
+            cache.invalidate(user["company_id"])
+            await load
+        return cache
+
+    cache = run_app(scenario)
+    assert cache._rosters == {} and cache._loads == {}
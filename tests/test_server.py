@@ -0,0 +1,30 @@
+import pytest
+from app.core.config import get_settings
+from app.server import capped_workers, pool_per_worker
+
+
+@pytest.fixture
+def connection_budget(monkeypatch):
+    monkeypatch.setenv("DB_MAX_CONNECTIONS", "48")
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.setenv("DB_POOL_MAX_OVERFLOW", "1")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4, 8])
+def test_pools_fit_the_budget_during_a_rolling_restart(connection_budget, workers):
+    pool_size, max_overflow = pool_per_worker(workers)
+    # Old and new workers overlap while a SIGHUP restart rolls over
+    assert 2 * workers * (pool_size + max_overflow) <= 48
+    assert pool_size == 2 * max_overflow
+
+
+@pytest.mark.parametrize("workers", [1, 8, 15, 16, 64])
+def test_worker_count_stays_within_the_budget(connection_budget, monkeypatch, workers):
+    monkeypatch.setenv("DB_MAX_CONNECTIONS", "30")
+    get_settings.cache_clear()
+    workers = capped_workers(workers)
+    pool_size, max_overflow = pool_per_worker(workers)
+    assert 2 * workers * (pool_size + max_overflow) <= 30
@@ -0,0 +1,35 @@
+import asyncio
+import uuid
+from sqlalchemy import select
+from app.db.session import AsyncSessionLocal
+from app.models.models import User
+from tests.helpers import signup
+
+SIGNUPS = 5
+
+
+def test_concurrent_first_signups_make_exactly_one_admin(run_app, company_name):
+    async def scenario(client):
+        users = await asyncio.gather(*(signup(client, company_name) for _ in range(SIGNUPS)))
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(User.role).where(User.company_id == users[0]["company_id"]))
+            return users, result.scalars().all()
+
+    users, roles = run_app(scenario)
+    assert len({user["company_id"] for user in users}) == 1
+    assert sorted(user["role"] for user in users) == ["admin"] + ["member"] * (SIGNUPS - 1)
+    assert sorted(roles) == ["admin"] + ["member"] * (SIGNUPS - 1)
+
+
+def test_company_names_differing_in_case_and_whitespace_join_one_company(run_app):
+    words = uuid.uuid4().hex[:12], uuid.uuid4().hex[:12]
+
+    async def scenario(client):
+        return [
+            await signup(client, name)
+            for name in (f"{words[0]} {words[1]}", f"\t{words[0].upper()}\n {words[1]}\n", f"  {words[0]}\t\t{words[1]}  ")
+        ]
+
+    users = run_app(scenario)
+    assert len({user["company_id"] for user in users}) == 1
+    assert [user["role"] for user in users] == ["admin", "member", "member"]
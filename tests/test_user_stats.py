@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+from app.commands.backfill_user_stats import rebuild_chunk
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import OutboxEvent, UserStats
+from app.services.outbox import OutboxWorker
+from app.services.user_stats import RECOGNITION_TOPIC
+from tests.helpers import login, signup
+
+
+@pytest.fixture
+def outbox_paused(monkeypatch):
+    # The test drains the outbox itself, after the rebuild
+    monkeypatch.setenv("OUTBOX_WORKERS", "0")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def test_backfill_leaves_pending_recognitions_to_the_outbox(run_app, company_name, outbox_paused):
+    async def pending(sender_id: int) -> int:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(func.count())
+                .where(OutboxEvent.topic == RECOGNITION_TOPIC)
+                .where(OutboxEvent.payload["sender_id"].as_integer() == sender_id)
+            )
+
+    async def scenario(client):
+        sender = await signup(client, company_name)
+        recipient = await signup(client, company_name)
+        headers = await login(client, sender["email"])
+        response = await client.post("/api/v1/posts", headers=headers, json={
+            "content": "thanks", "points": 3, "recipients": [{"user_id": recipient["id"], "points": 3}],
+        })
+        assert response.status_code == 200, response.text
+        assert await pending(sender["id"]) == 1
+
+        async with AsyncSessionLocal() as db:
+            await rebuild_chunk(db, sender["id"], recipient["id"] + 1)
+            await db.commit()
+
+        worker = OutboxWorker(workers=1, poll_interval_ms=50)
+        await worker.start(AsyncSessionLocal)
+        try:
+            while await pending(sender["id"]):
+                await asyncio.sleep(0.05)
+        finally:
+            await worker.stop()
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(UserStats).where(UserStats.user_id.in_([sender["id"], recipient["id"]]))
+            )
+            return {stats.user_id: stats for stats in result.scalars()}, sender["id"], recipient["id"]
+
+    stats, sender_id, recipient_id = run_app(scenario)
+    assert (stats[sender_id].points_given, stats[sender_id].posts_authored) == (3, 1)
+    assert (stats[recipient_id].points_received, stats[recipient_id].recognitions_received) == (3, 1)